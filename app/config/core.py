@@ -6,19 +6,76 @@ from app.config.settings import settings, AppMode
 
 class DocumentServiceConfig:
 	documents_path: Path = settings.app_root / 'data'
-	allowed_extensions: tuple = (".txt", ".md", ".json")
+	allowed_extensions: tuple = (".txt", ".md", ".json", ".jsonl")
 	chunk_size: int = 500
 	chunk_overlap: int = 50
 	batch_size: int = 50
-	sleep_timer: int = 120
+	# Characters read and split at a time by the streaming loaders, bounds memory per file
+	stream_window_size: int = 256_000
+	# Process pool used to load and split files in parallel (0 or 1 = sequential)
+	parallel_workers: int = 0
+	# Files submitted to the pool ahead of the consumer, bounds memory held in results
+	prefetch: int = 8
+	# Yield chunks in file order (True) or as soon as any file is done (False)
+	ordered: bool = True
 
 
+class EmbeddingBackend(str, Enum):
+	MISTRAL = "mistral"
+	# Local hashed character n-gram embedder, deterministic and offline
+	HASHING = "hashing"
+
 class EmbeddingServiceConfig:
+	backend: str = settings.embedding_backend
 	embedding_model_name: str = settings.mistral_model_embed_name
 	api_key: str = settings.mistral_api_key
 	batch_size: int = 50
-	sleep_timer: int = 120
-
+	# Request packing limits, kept under the provider's per-request and per-input limits
+	max_tokens_per_request: int = 16_000
+	max_items_per_request: int = 128
+	max_tokens_per_text: int = 8_000
+	# Hashing backend, same output dimension as mistral-embed
+	hashing_dimension: int = 1024
+	hashing_ngram_sizes: tuple = (3, 4, 5)
+	# Failed requests are retried with jittered exponential backoff, then bisected so one bad chunk
+	# does not sink the others (halves get bisect_attempts tries), chunks that still fail are dead-lettered
+	max_attempts: int = 4
+	retry_base_delay: float = 0.5
+	retry_max_delay: float = 30.0
+	bisect_attempts: int = 2
+
+
+class AsyncEmbeddingConfig:
+	enabled: bool = False
+	base_url: str = 'https://api.mistral.ai/v1'
+	max_in_flight: int = 4
+	requests_per_second: float = 5.0
+	tokens_per_minute: int = 500_000
+	request_batch_size: int = 16
+	max_retries: int = 5
+	timeout: float = 30.0
+
+
+class EmbeddingCacheConfig:
+	enabled: bool = True
+	cache_path: Path = settings.app_root / 'state' / 'embedding_cache.sqlite3'
+	max_entries: int = 500_000
+
+
+class DedupMode(str, Enum):
+	# Near-duplicate chunks are not embedded or stored
+	DROP = "drop"
+	# Near-duplicate chunks are stored with the canonical chunk's embedding and a link to it
+	LINK = "link"
+
+class DedupConfig:
+	enabled: bool = False
+	mode: str = DedupMode.LINK
+	index_path: Path = settings.app_root / 'state' / 'dedup_index.sqlite3'
+	# Estimated Jaccard similarity of character shingles above which a chunk is a near-duplicate
+	threshold: float = 0.85
+	num_perm: int = 128
+	shingle_size: int = 5
 
 class VectorDBMode(str, Enum):
 	LOCAL = "local"
@@ -32,31 +89,137 @@ class VectorDBServiceConfig:
 	ssl: bool = True if settings.app_env == AppMode.PRODUCTION else False
 	collection_name: str = settings.vectordb_collection_name
 	batch_size: int = 50
-	sleep_timer: int = 120
+	# Write-behind buffer: popped batches are coalesced into writes of up to write_batch_size
+	# chunks (0 = the client's max batch size) or until the oldest buffered chunk is write_linger old
+	write_batch_size: int = 0
+	write_linger: float = 0.5
+	# Writes in flight per VectorDB worker
+	writers: int = 2
+
+
+class VectorQuantization(str, Enum):
+	FLOAT32 = "float32"
+	FLOAT16 = "float16"
+	# Symmetric scalar quantization, one float32 scale per vector
+	INT8 = "int8"
+
+class VectorCompressionConfig:
+	# Encoding of the vectors on the embedding queue (float32 is lossless)
+	quantization: str = VectorQuantization.FLOAT32
+	# Dimension the vectors are reduced to by PCA before storage (0 = store full vectors)
+	pca_dimension: int = 0
+	# Vectors the VectorDB stage buffers to fit the projection when none is persisted yet
+	fit_sample_size: int = 2_048
+	# Fitted projection, queries must be transformed with it as well
+	projection_path: Path = settings.app_root / 'state' / 'pca_projection.npz'
+
+
+class ManifestConfig:
+	enabled: bool = True
+	manifest_path: Path = settings.app_root / 'state' / 'manifest.json'
+
+
+class SyncConfig:
+	# Remove chunks of deleted files and move chunks of renamed files before ingesting
+	enabled: bool = False
+
+
+class WatcherConfig:
+	# Keep the document stage running and ingest files as they change on disk
+	enabled: bool = False
+	# Seconds a file must stay quiet before it is ingested
+	debounce: float = 1.0
+	# Seconds between two stat passes when inotify is unavailable
+	poll_interval: float = 2.0
+	use_inotify: bool = True
+
+
+class MetricsConfig:
+	enabled: bool = True
+	# Local /metrics endpoint in the Prometheus text format (port 0 = disabled)
+	host: str = '127.0.0.1'
+	port: int = 9108
+	snapshot_path: Path = settings.app_root / 'state' / 'metrics.json'
+	snapshot_interval: float = 15.0
 
 ############################################
 
 class RedisConfig:
 	max_retries: int = 3
-	sleep_timer: int = 3
+	# Must stay below the client socket_timeout (5s) for blocking pops
+	pop_timeout: float = 2.0
+	pop_linger: float = 0.05
+
+class RedisStreamConfig:
+	# Pending entries idle for longer than this are reclaimed from their consumer
+	claim_idle_ms: int = 60_000
+	# Trim acknowledged entries from the stream after this many acks
+	trim_every: int = 500
+
+class QueueBackend(str, Enum):
+	REDIS_LIST = "redis_list"
+	REDIS_STREAM = "redis_stream"
+	# In-process queue, only for runs where every stage lives in one process
+	MEMORY = "memory"
 
 class DocumentQueueConfig:
 	queue_url: str = settings.document_queue_url
 	queue_name: str = 'document_queue'
+	group_name: str = 'embedding_workers'
+	# Producers pause once the queue holds high_watermark items and resume at low_watermark
+	high_watermark: int = 2_000
+	low_watermark: int = 500
+	# Hard bound of the in-memory backend, pushes block beyond it
+	memory_max_size: int = 10_000
 
 class EmbeddingQueueConfig:
 	queue_url: str = settings.embedding_queue_url
 	queue_name: str = 'embedding_queue'
+	group_name: str = 'vectordb_workers'
+	high_watermark: int = 2_000
+	low_watermark: int = 500
+	# Hard bound of the in-memory backend, pushes block beyond it
+	memory_max_size: int = 10_000
+
+class DeadLetterQueueConfig:
+	# Chunks the embedding stage gave up on, with the error attached, until replayed (--replay-dlq)
+	enabled: bool = True
+	queue_url: str = settings.document_queue_url
+	queue_name: str = 'dead_letter_queue'
+	group_name: str = 'dead_letter_replay'
+	# Unbounded, dead letters must never block the embedding workers
+	memory_max_size: int = 0
+
+class PipelineStage(str, Enum):
+	DOCUMENT = "document"
+	EMBEDDING = "embedding"
+	VECTORDB = "vectordb"
 
 class PipelineConfig:
-	worker_delay: int = 3
+	queue_backend: str = QueueBackend.REDIS_LIST
+	# Total number of workers per stage across every process/host of the pipeline
+	embedding_workers: int = 1
+	vectordb_workers: int = 1
+	# Stages run by this process
+	stages: tuple = (PipelineStage.DOCUMENT, PipelineStage.EMBEDDING, PipelineStage.VECTORDB)
+	# Workers start once the queues and the vector database answer, failed checks are retried with backoff
+	readiness_timeout: float = 30.0
 
 
 pipeline_config: PipelineConfig = PipelineConfig()
 redis_config: RedisConfig = RedisConfig()
+redis_stream_config: RedisStreamConfig = RedisStreamConfig()
 document_queue_config = DocumentQueueConfig()
 embedding_queue_config = EmbeddingQueueConfig()
+dead_letter_queue_config = DeadLetterQueueConfig()
 document_service_config = DocumentServiceConfig()
 embedding_service_config = EmbeddingServiceConfig()
+embedding_cache_config = EmbeddingCacheConfig()
+dedup_config = DedupConfig()
+async_embedding_config = AsyncEmbeddingConfig()
 vectordb_service_config = VectorDBServiceConfig()
-
+vector_compression_config = VectorCompressionConfig()
+manifest_config = ManifestConfig()
+sync_config = SyncConfig()
+watcher_config = WatcherConfig()
+metrics_config = MetricsConfig()
@@ -5,7 +5,6 @@ from logging.config import dictConfig
 from app.config.settings import settings
 
 LOG_DIR = settings.app_root / "logs"
-LOG_DIR.mkdir(exist_ok=True)
 LOG_DATE = datetime.now().strftime("%Y-%m-%d")
 LOG_FILE_NAME = f"{LOG_DATE}.jarvis-etl.{settings.app_env}.log"
 LOG_FILE = LOG_DIR / LOG_FILE_NAME
@@ -18,6 +17,8 @@ def configure_logging() -> None:
 			- Rotating file logging
 			- Module-level log format
 	"""
+	# Created here rather than at import time, importing the app has no side effects
+	LOG_DIR.mkdir(exist_ok=True)
 	dictConfig(
 		{
 			"version": 1,
@@ -21,9 +21,10 @@ class Settings(BaseSettings):
 	app_root: Path = APP_ROOT
 	app_env: str = get_env()
 
-	# Mistral
-	mistral_api_key: str
-	mistral_model_embed_name: str
+	# Embeddings, only the mistral backend needs an API key
+	embedding_backend: str = "mistral"
+	mistral_api_key: str = ""
+	mistral_model_embed_name: str = "mistral-embed"
 
 	# Queue
 	document_queue_url: str
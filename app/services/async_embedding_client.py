@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+
+from email.utils import parsedate_to_datetime
+from threading import Lock, Thread
+from typing import Any, Dict, List
+
+import httpx
+
+from app.config.core import embedding_service_config, async_embedding_config
+from app.utils.retry import backoff_delay
+from app.utils.token_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+	"""
+  Token bucket rate limiter usable from any thread or event loop.
+
+  acquire() reserves tokens immediately (the balance may go negative) and
+  sleeps for as long as it takes the bucket to refill the reserved amount.
+  pause() empties the bucket and holds every acquire() back for a while, e.g.
+  while the provider asks clients to back off.
+  """
+
+	def __init__(self, rate_per_second: float, capacity: float) -> None:
+		self.rate_per_second = rate_per_second
+		self.capacity = capacity
+		self.tokens = capacity
+		self.updated_at = time.monotonic()
+		self.paused_until = 0.0
+		self._lock = Lock()
+
+	def _reserve(self, amount: float) -> float:
+		with self._lock:
+			now = time.monotonic()
+			self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+			self.updated_at = now
+			self.tokens -= min(amount, self.capacity)
+			return max(0.0, -self.tokens / self.rate_per_second, self.paused_until - now)
+
+	def pause(self, seconds: float) -> None:
+		"""Drop the balance to zero and make acquire() wait at least `seconds` from now."""
+		with self._lock:
+			now = time.monotonic()
+			self.tokens = min(self.tokens, 0.0)
+			self.updated_at = now
+			self.paused_until = max(self.paused_until, now + seconds)
+
+	async def acquire(self, amount: float = 1.0) -> None:
+		"""Wait until `amount` tokens are available."""
+		delay = self._reserve(amount)
+		if delay > 0:
+			await asyncio.sleep(delay)
+
+
+class AsyncEmbeddingClient:
+	"""
+  Asyncio embedding client for Mistral-compatible /embeddings endpoints.
+
+  Texts are split into requests of request_batch_size texts, which are sent
+  concurrently on one event loop thread and HTTP client per instance, created
+  on first use: connections are kept alive across calls, and at most
+  max_in_flight requests are outstanding across all calling threads. Requests
+  are paced by a requests/second and a tokens/minute token bucket, and vectors
+  are returned in input order. A 429 response pauses the shared request bucket
+  for its Retry-After delay, so every request of the client backs off, and is
+  retried after that delay plus a jittered exponential backoff.
+
+  Exposes embed_documents() so it can stand in for MistralAIEmbeddings.
+  """
+
+	def __init__(self,
+	             api_key: str = embedding_service_config.api_key,
+	             model_name: str = embedding_service_config.embedding_model_name,
+	             base_url: str = async_embedding_config.base_url,
+	             max_in_flight: int = async_embedding_config.max_in_flight,
+	             requests_per_second: float = async_embedding_config.requests_per_second,
+	             tokens_per_minute: int = async_embedding_config.tokens_per_minute,
+	             request_batch_size: int = async_embedding_config.request_batch_size,
+	             max_retries: int = async_embedding_config.max_retries,
+	             retry_base_delay: float = embedding_service_config.retry_base_delay,
+	             retry_max_delay: float = embedding_service_config.retry_max_delay,
+	             timeout: float = async_embedding_config.timeout) -> None:
+		self.api_key = api_key
+		self.model_name = model_name
+		self.url = base_url.rstrip("/") + "/embeddings"
+		self.max_in_flight = max_in_flight
+		self.request_batch_size = request_batch_size
+		self.max_retries = max_retries
+		self.retry_base_delay = retry_base_delay
+		self.retry_max_delay = retry_max_delay
+		self.timeout = timeout
+		# Shared by every call, so the limits hold across all worker threads
+		self.request_bucket = TokenBucket(requests_per_second, capacity=max(1.0, requests_per_second))
+		self.token_bucket = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute)
+		self._loop: asyncio.AbstractEventLoop | None = None
+		self._client: httpx.AsyncClient | None = None
+		self._semaphore: asyncio.Semaphore | None = None
+		self._loop_lock = Lock()
+		logger.info("[AsyncEmbeddingClient] Initialized (url=%s, max_in_flight=%d, rps=%.1f, tpm=%d)",
+		            self.url, max_in_flight, requests_per_second, tokens_per_minute)
+
+	@staticmethod
+	def _get_retry_after(response: httpx.Response) -> float:
+		"""Return the delay requested by a 429 response in seconds, 0 without a valid Retry-After."""
+		retry_after = response.headers.get("Retry-After")
+		if retry_after:
+			try:
+				return max(0.0, float(retry_after))
+			except ValueError:
+				try:
+					return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+				except (TypeError, ValueError):
+					pass
+		return 0.0
+
+	async def _embed_request(self,
+	                         client: httpx.AsyncClient,
+	                         semaphore: asyncio.Semaphore,
+	                         texts: List[str]) -> List[List[float]]:
+		tokens = sum(estimate_tokens(text) for text in texts)
+		payload: Dict[str, Any] = {"model": self.model_name, "input": texts}
+
+		attempt = 0
+		while True:
+			await self.request_bucket.acquire(1)
+			await self.token_bucket.acquire(tokens)
+
+			async with semaphore:
+				response = await client.post(self.url, json=payload)
+
+			if response.status_code == 429 and attempt < self.max_retries:
+				retry_after = self._get_retry_after(response)
+				# Every request of the client backs off, not only this one
+				self.request_bucket.pause(retry_after)
+				# Jitter on top of Retry-After, so throttled requests do not come back in lockstep
+				delay = retry_after + backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay)
+				logger.warning("[AsyncEmbeddingClient] Throttled (429), retrying in %.2fs", delay)
+				await asyncio.sleep(delay)
+				attempt += 1
+				continue
+
+			response.raise_for_status()
+			data = sorted(response.json()["data"], key=lambda item: item["index"])
+			return [item["embedding"] for item in data]
+
+	async def _open(self) -> None:
+		"""Create the HTTP client and the in-flight limit on the background loop they belong to."""
+		self._client = httpx.AsyncClient(headers={"Authorization": f"Bearer {self.api_key}"}, timeout=self.timeout,
+		                                 limits=httpx.Limits(max_connections=self.max_in_flight))
+		self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+	def _get_loop(self) -> asyncio.AbstractEventLoop:
+		"""Return the background event loop, starting it and the client on first use."""
+		with self._loop_lock:
+			if self._loop is None:
+				loop = asyncio.new_event_loop()
+				Thread(target=loop.run_forever, daemon=True, name="AsyncEmbeddingLoopThread").start()
+				asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+				self._loop = loop
+				logger.info("[AsyncEmbeddingClient] Started event loop thread")
+			return self._loop
+
+	async def _embed_all(self, texts: List[str]) -> List[List[float]]:
+		requests = [texts[i:i + self.request_batch_size] for i in range(0, len(texts), self.request_batch_size)]
+		# gather() keeps results in request order whatever order they complete in
+		results = await asyncio.gather(*(self._embed_request(self._client, self._semaphore, request)
+		                                 for request in requests))
+		return [vector for result in results for vector in result]
+
+	async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+		"""Embed texts concurrently and return the vectors in input order."""
+		if not texts:
+			return []
+		# The client lives on the background loop, whatever loop the caller runs on
+		return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._embed_all(texts), self._get_loop()))
+
+	def embed_documents(self, texts: List[str]) -> List[List[float]]:
+		"""Synchronous entry point, blocks the calling thread until the background loop embedded the texts."""
+		if not texts:
+			return []
+		return asyncio.run_coroutine_threadsafe(self._embed_all(texts), self._get_loop()).result()
+
+	def close(self) -> None:
+		"""Close the HTTP client and stop the background loop, a later call starts them again."""
+		with self._loop_lock:
+			if self._loop is None:
+				return
+			asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+			self._loop.call_soon_threadsafe(self._loop.stop)
+			self._loop, self._client, self._semaphore = None, None, None
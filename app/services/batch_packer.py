@@ -0,0 +1,93 @@
+import logging
+
+from langchain_core.documents import Document
+from typing import List
+
+from app.config.core import embedding_service_config
+from app.utils.token_utils import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBatchPacker:
+	"""
+  Groups chunks into embedding requests by estimated token count.
+
+  Each request stays under max_tokens_per_request and max_items_per_request.
+  Chunks longer than max_tokens_per_text are isolated in their own request, and
+  split_text() cuts their text into pieces the model accepts.
+  """
+
+	def __init__(self,
+	             max_tokens_per_request: int = embedding_service_config.max_tokens_per_request,
+	             max_items_per_request: int = embedding_service_config.max_items_per_request,
+	             max_tokens_per_text: int = embedding_service_config.max_tokens_per_text) -> None:
+		self.max_tokens_per_request = max_tokens_per_request
+		self.max_items_per_request = max_items_per_request
+		self.max_tokens_per_text = min(max_tokens_per_text, max_tokens_per_request)
+
+	def is_oversized(self, text: str) -> bool:
+		"""Return True if a single text exceeds the per-text token limit."""
+		return estimate_tokens(text) > self.max_tokens_per_text
+
+	def pack(self, docs: List[Document]) -> List[List[Document]]:
+		"""
+    Pack documents into request-sized groups, keeping their order.
+
+    Args:
+        docs: Documents popped from the document queue
+
+    Returns:
+        Groups of documents, each one sized for a single embedding request.
+    """
+		groups: List[List[Document]] = []
+		current: List[Document] = []
+		current_tokens = 0
+
+		for doc in docs:
+			tokens = estimate_tokens(doc.page_content)
+
+			if tokens > self.max_tokens_per_text:
+				logger.warning("[TokenBatchPacker] Isolating oversized chunk (~%d tokens) from %s",
+				               tokens, doc.metadata.get('source'))
+				groups.append([doc])
+				continue
+
+			if current and (current_tokens + tokens > self.max_tokens_per_request
+			                or len(current) >= self.max_items_per_request):
+				groups.append(current)
+				current = []
+				current_tokens = 0
+
+			current.append(doc)
+			current_tokens += tokens
+
+		if current:
+			groups.append(current)
+
+		logger.debug("[TokenBatchPacker] Packed %d chunks into %d requests", len(docs), len(groups))
+		return groups
+
+	def split_text(self, text: str) -> List[str]:
+		"""
+    Split an oversized text into consecutive pieces under max_tokens_per_text,
+    preferring to cut on whitespace.
+    """
+		pieces: List[str] = []
+		window = self.max_tokens_per_text * CHARS_PER_TOKEN
+		start = 0
+
+		while start < len(text):
+			end = min(len(text), start + window)
+			if end < len(text):
+				whitespace = text.rfind(" ", start, end)
+				if whitespace > start:
+					end = whitespace
+
+			while end - start > 1 and estimate_tokens(text[start:end]) > self.max_tokens_per_text:
+				end = start + (end - start) // 2
+
+			pieces.append(text[start:end])
+			start = end
+
+		return pieces
@@ -0,0 +1,93 @@
+import logging
+import time
+
+from langchain_core.documents import Document
+from typing import List
+
+from app.services.queue_protocol import QueueProtocol
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Metadata attached to dead-lettered chunks, removed again when they are replayed
+DEAD_LETTER_ERROR_KEY = "dead_letter_error"
+DEAD_LETTER_ERROR_TYPE_KEY = "dead_letter_error_type"
+DEAD_LETTER_ATTEMPTS_KEY = "dead_letter_attempts"
+DEAD_LETTER_FAILED_AT_KEY = "dead_letter_failed_at"
+DEAD_LETTER_KEYS = (DEAD_LETTER_ERROR_KEY, DEAD_LETTER_ERROR_TYPE_KEY, DEAD_LETTER_ATTEMPTS_KEY, DEAD_LETTER_FAILED_AT_KEY)
+
+# Long provider error bodies are cut, the type and the start of the message identify the failure
+MAX_ERROR_LENGTH = 1_000
+
+
+class DeadLetterService:
+	"""
+  Dead-letter queue for chunks the embedding stage could not embed.
+
+  Chunks are stored as regular Documents on their own queue (any queue backend,
+  Redis by default) with the error, its type, the number of attempts and the
+  time of failure in their metadata, so they can be inspected and replayed once
+  the cause is fixed. replay() strips that metadata and pushes the chunks back
+  onto the document queue.
+  """
+
+	def __init__(self, queue: QueueProtocol) -> None:
+		self.queue = queue
+		self._dead_lettered_metric = metrics.DEAD_LETTERS.labels(operation="dead_lettered")
+		self._replayed_metric = metrics.DEAD_LETTERS.labels(operation="replayed")
+		logger.info("[DeadLetterService] Initialized")
+
+	def push(self, docs: List[Document], error: BaseException, attempts: int) -> None:
+		"""
+    Dead-letter chunks with the error that made them fail.
+
+    Args:
+        docs: Chunks that could not be processed.
+        error: The last error they failed with.
+        attempts: Number of attempts made before giving up.
+    """
+		if not docs:
+			return
+		failure = {
+			DEAD_LETTER_ERROR_KEY: str(error)[:MAX_ERROR_LENGTH],
+			DEAD_LETTER_ERROR_TYPE_KEY: type(error).__name__,
+			DEAD_LETTER_ATTEMPTS_KEY: attempts,
+			DEAD_LETTER_FAILED_AT_KEY: time.time(),
+		}
+		self.queue.push_batch([Document(page_content=doc.page_content, metadata={**doc.metadata, **failure})
+		                       for doc in docs])
+		self._dead_lettered_metric.inc(len(docs))
+		logger.error("[DeadLetterService] Dead-lettered %d chunks after %d attempts: %s: %s",
+		             len(docs), attempts, type(error).__name__, error)
+
+	def replay(self, target_queue: QueueProtocol, batch_size: int = 100) -> int:
+		"""
+    Move every dead-lettered chunk back to the document queue.
+
+    Args:
+        target_queue: Queue the chunks are pushed to, normally the document queue.
+        batch_size: Chunks moved per pop/push round trip.
+
+    Returns:
+        The number of replayed chunks.
+    """
+		replayed = 0
+		while True:
+			batch = self.queue.pop_batch(batch_size, timeout=0.1, linger=0.0)
+			if not batch:
+				break
+			docs = []
+			for doc in batch:
+				metadata = {key: value for key, value in doc.metadata.items() if key not in DEAD_LETTER_KEYS}
+				docs.append(Document(page_content=doc.page_content, metadata=metadata))
+			target_queue.push_batch(docs)
+			# Acknowledged only once the chunks are back on the document queue
+			self.queue.ack()
+			replayed += len(docs)
+			self._replayed_metric.inc(len(docs))
+
+		logger.info("[DeadLetterService] Replayed %d chunks", replayed)
+		return replayed
+
+	def size(self) -> int:
+		return self.queue.size()
@@ -0,0 +1,380 @@
+import hashlib
+import logging
+import sqlite3
+
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from langchain_core.documents import Document
+
+from app.config.core import DedupMode, dedup_config
+from app.utils import metrics, service_utils
+from app.utils.ngram_hashing import concat_texts, mix64, ngram_hashes, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Metadata of linked duplicates. CANONICAL_TEXT_KEY is only carried to the embedding
+# stage, which embeds the canonical text instead, and is not stored in the vector database
+DUPLICATE_OF_KEY = "duplicate_of"
+CANONICAL_SOURCE_KEY = "canonical_source"
+CANONICAL_TEXT_KEY = "canonical_text"
+# Positions of a file dropped as near-duplicates in drop mode, comma separated on its last chunk,
+# so the vector database deletes what an earlier version stored there. Not stored either
+DROPPED_CHUNKS_KEY = "dropped_chunks"
+
+# Keep IN (...) clauses well below SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+_ROW_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def optimal_bands(threshold: float, num_perm: int, false_positive_weight: float = 0.25) -> Tuple[int, int]:
+	"""
+	Choose the LSH banding for a similarity threshold.
+
+	Minimizes the weighted probability mass of false positives (pairs below the
+	threshold that share a bucket) and false negatives (pairs above it that share
+	none). Candidates are verified against their signatures, so false negatives
+	are weighted higher.
+
+	Returns:
+	    (bands, rows per band) with bands * rows <= num_perm
+	"""
+	similarities = np.linspace(0.0, 1.0, 1001)
+	below = similarities <= threshold
+	best: Tuple[float, int, int] | None = None
+	for bands in range(1, num_perm + 1):
+		for rows in range(1, num_perm // bands + 1):
+			candidate = 1 - (1 - similarities ** rows) ** bands
+			false_positive = np.trapezoid(candidate[below], similarities[below])
+			false_negative = np.trapezoid(1 - candidate[~below], similarities[~below])
+			error = false_positive_weight * false_positive + (1 - false_positive_weight) * false_negative
+			if best is None or error < best[0]:
+				best = (error, bands, rows)
+	return best[1], best[2]
+
+
+class DedupService:
+	"""
+  Near-duplicate chunk detection with MinHash signatures and an LSH index.
+
+  Each chunk gets a MinHash signature over its character shingles. Signatures are
+  cut into bands, every band is hashed into a bucket, and chunks sharing a bucket
+  with an indexed chunk are compared on their full signatures. A chunk whose
+  estimated Jaccard similarity to an indexed chunk reaches the threshold is a
+  near-duplicate of it, otherwise it becomes a canonical chunk and is indexed.
+
+  The index is kept in SQLite, so duplicates are also found across runs. An entry
+  is replaced when its (source, chunk_index) position is re-indexed, and entries
+  past the last chunk of a re-ingested file are removed. Indexed chunks of the
+  incoming chunk's own source are never its canonical chunk: they belong to the
+  previous version of the file, which the vector database replaces. The entry at
+  the position of a dropped or linked chunk is removed as well, since the chunk
+  stored there by the previous version is deleted.
+
+  In drop mode near-duplicates are removed from the batch and their positions are
+  listed on the last chunk of their file, so the vector database deletes what was
+  stored there. In link mode they are kept with duplicate_of/canonical_source
+  metadata and the canonical text, which the embedding stage embeds instead, so
+  the canonical vector is reused (from the embedding cache) rather than paid for again.
+  """
+
+	def __init__(self,
+	             index_path: Path = dedup_config.index_path,
+	             mode: str = dedup_config.mode,
+	             threshold: float = dedup_config.threshold,
+	             num_perm: int = dedup_config.num_perm,
+	             shingle_size: int = dedup_config.shingle_size) -> None:
+		if mode not in (DedupMode.DROP, DedupMode.LINK):
+			raise ValueError(f"invalid dedup mode: {mode}")
+		if not 0.0 < threshold <= 1.0:
+			raise ValueError(f"invalid dedup threshold: {threshold}")
+
+		self.index_path = index_path
+		self.mode = mode
+		self.threshold = threshold
+		self.num_perm = num_perm
+		self.shingle_size = shingle_size
+		self.bands, self.rows = optimal_bands(threshold, num_perm)
+		# Multiply-shift hash family (a * x + b) >> 32 with odd a, fixed so signatures are stable across runs
+		seed_bytes = hashlib.sha256(b"jarvis-minhash").digest()
+		rng = np.random.default_rng(int.from_bytes(seed_bytes[:8], "little"))
+		self._multipliers = (rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1))[:, None]
+		self._increments = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)[:, None]
+		self._unique_metric = metrics.DEDUP_CHUNKS.labels(outcome="unique")
+		self._duplicate_metric = metrics.DEDUP_CHUNKS.labels(outcome="duplicate")
+		# Dropped positions of files whose last chunk was not filtered yet
+		self._dropped: Dict[str, List[int]] = {}
+		self._lock = Lock()
+
+		logger.info("[DedupService] Opening index at %s (mode=%s, threshold=%.2f, bands=%d, rows=%d)",
+		            index_path, mode, threshold, self.bands, self.rows)
+		self.index_path.parent.mkdir(parents=True, exist_ok=True)
+		self.connection = sqlite3.connect(str(self.index_path), check_same_thread=False)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("PRAGMA synchronous=NORMAL")
+		self._create_schema()
+		size = self.connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+		logger.info("[DedupService] Initialized with %d indexed chunks", size)
+
+	def _create_schema(self) -> None:
+		"""Create the index tables, resetting them if they were built with other parameters."""
+		fingerprint = f"num_perm={self.num_perm},bands={self.bands},rows={self.rows},shingle={self.shingle_size}"
+		self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+		row = self.connection.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+		if row is not None and row[0] != fingerprint:
+			logger.warning("[DedupService] Index was built with %s, rebuilding for %s", row[0], fingerprint)
+			self.connection.execute("DROP TABLE IF EXISTS chunks")
+			self.connection.execute("DROP TABLE IF EXISTS buckets")
+
+		self.connection.execute(
+			"CREATE TABLE IF NOT EXISTS chunks ("
+			"id INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL, source TEXT NOT NULL, chunk_index INTEGER NOT NULL, "
+			"text TEXT NOT NULL, signature BLOB NOT NULL, UNIQUE (source, chunk_index))"
+		)
+		self.connection.execute("CREATE TABLE IF NOT EXISTS buckets (bucket INTEGER NOT NULL, chunk INTEGER NOT NULL)")
+		self.connection.execute("CREATE INDEX IF NOT EXISTS buckets_bucket ON buckets (bucket)")
+		self.connection.execute("CREATE INDEX IF NOT EXISTS buckets_chunk ON buckets (chunk)")
+		self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+		self.connection.commit()
+
+	def signatures(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+		"""
+    Compute the MinHash signatures of a batch of texts at once.
+
+    Args:
+        texts: Texts to sign.
+
+    Returns:
+        (uint32 signatures of shape (len(texts), num_perm), mask of texts that have at
+        least one shingle; texts shorter than a shingle have no meaningful signature)
+    """
+		data, owners = concat_texts([normalize_text(text) for text in texts])
+		shingles = ngram_hashes(data, self.shingle_size)
+		inside = owners[:len(shingles)] == owners[self.shingle_size - 1:]
+		shingles, shingle_owners = shingles[inside], owners[:len(shingles)][inside]
+
+		signatures = np.full((len(texts), self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+		has_shingles = np.zeros(len(texts), dtype=bool)
+		if not len(shingles):
+			return signatures, has_shingles
+
+		# Every hash function applied to every shingle, then the minimum per text
+		with np.errstate(over="ignore"):
+			hashed = ((shingles[None, :] * self._multipliers + self._increments) >> np.uint64(32)).astype(np.uint32)
+		owners_present, starts = np.unique(shingle_owners, return_index=True)
+		signatures[owners_present] = np.minimum.reduceat(hashed, starts, axis=1).T
+		has_shingles[owners_present] = True
+		return signatures, has_shingles
+
+	def _band_buckets(self, signatures: np.ndarray) -> np.ndarray:
+		"""Hash each band of each signature into a signed 64-bit bucket key, shape (n, bands)."""
+		buckets = np.empty((len(signatures), self.bands), dtype=np.uint64)
+		with np.errstate(over="ignore"):
+			for band in range(self.bands):
+				key = np.full(len(signatures), band + 1, dtype=np.uint64)
+				for row in range(band * self.rows, (band + 1) * self.rows):
+					key = mix64(key * _ROW_MULTIPLIER + signatures[:, row].astype(np.uint64))
+				buckets[:, band] = key
+		return buckets.view(np.int64)
+
+	def _lookup(self, buckets: np.ndarray) -> Tuple[Dict[int, Set[int]], Dict[int, tuple]]:
+		"""
+    Find indexed chunks sharing any of the given buckets.
+
+    Returns:
+        (bucket -> chunk row ids, chunk row id -> (chunk_id, source, chunk_index, text, signature))
+    """
+		keys = list({int(bucket) for bucket in buckets.ravel()})
+		members: Dict[int, Set[int]] = {}
+		for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+			part = keys[start:start + LOOKUP_CHUNK_SIZE]
+			rows = self.connection.execute(
+				f"SELECT bucket, chunk FROM buckets WHERE bucket IN ({','.join('?' * len(part))})", part
+			).fetchall()
+			for bucket, chunk in rows:
+				members.setdefault(bucket, set()).add(chunk)
+
+		chunk_ids = list(set().union(*members.values())) if members else []
+		chunks: Dict[int, tuple] = {}
+		for start in range(0, len(chunk_ids), LOOKUP_CHUNK_SIZE):
+			part = chunk_ids[start:start + LOOKUP_CHUNK_SIZE]
+			rows = self.connection.execute(
+				"SELECT id, chunk_id, source, chunk_index, text, signature FROM chunks "
+				f"WHERE id IN ({','.join('?' * len(part))})", part
+			).fetchall()
+			for row_id, chunk_id, source, chunk_index, text, signature in rows:
+				chunks[row_id] = (chunk_id, source, chunk_index, text, np.frombuffer(signature, dtype=np.uint32))
+		return members, chunks
+
+	def _remove_position(self, source: str, chunk_index: int) -> None:
+		"""Remove the entry indexed at a position of a source, if any."""
+		self.connection.execute(
+			"DELETE FROM buckets WHERE chunk IN (SELECT id FROM chunks WHERE source = ? AND chunk_index = ?)",
+			(source, chunk_index)
+		)
+		self.connection.execute("DELETE FROM chunks WHERE source = ? AND chunk_index = ?", (source, chunk_index))
+
+	def _index(self, doc: Document, chunk_id: str, signature: np.ndarray, buckets: np.ndarray) -> None:
+		"""Index a canonical chunk, replacing the previous entry at its position."""
+		source, chunk_index = doc.metadata["source"], doc.metadata.get("chunk_index", 0)
+		self._remove_position(source, chunk_index)
+		cursor = self.connection.execute(
+			"INSERT INTO chunks (chunk_id, source, chunk_index, text, signature) VALUES (?, ?, ?, ?, ?)",
+			(chunk_id, source, chunk_index, doc.page_content, signature.tobytes())
+		)
+		self.connection.executemany(
+			"INSERT INTO buckets (bucket, chunk) VALUES (?, ?)",
+			[(int(bucket), cursor.lastrowid) for bucket in buckets]
+		)
+
+	def _truncate(self, source: str, last_index: int, chunks: Dict[int, tuple]) -> None:
+		"""Remove the entries of a source past its last chunk, from the index and from the loaded candidates."""
+		self.connection.execute(
+			"DELETE FROM buckets WHERE chunk IN (SELECT id FROM chunks WHERE source = ? AND chunk_index > ?)",
+			(source, last_index)
+		)
+		self.connection.execute("DELETE FROM chunks WHERE source = ? AND chunk_index > ?", (source, last_index))
+		for row_id in [row_id for row_id, entry in chunks.items() if entry[1] == source and entry[2] > last_index]:
+			del chunks[row_id]
+
+	def _drop_replaced(self, docs: List[Document], chunks: Dict[int, tuple]) -> None:
+		"""
+    Forget loaded entries that this batch replaces before any chunk is matched.
+
+    An entry is replaced when its position is re-ingested with other content or
+    lies past the last chunk of its re-ingested file. The vector database deletes
+    those chunks, so no chunk of the batch may be linked to them.
+    """
+		incoming: Dict[Tuple[str, int], str] = {}
+		for doc in docs:
+			source, chunk_index = doc.metadata["source"], doc.metadata.get("chunk_index", 0)
+			incoming[(source, chunk_index)] = service_utils.get_chunk_id(source, chunk_index, doc.page_content)
+			if doc.metadata.get("last_chunk"):
+				self._truncate(source, chunk_index, chunks)
+		for row_id in [row_id for row_id, entry in chunks.items()
+		               if incoming.get((entry[1], entry[2]), entry[0]) != entry[0]]:
+			del chunks[row_id]
+
+	def filter_batch(self, docs: List[Document]) -> List[Document]:
+		"""
+    Detect near-duplicates in a batch, against the index and within the batch.
+
+    Args:
+        docs: Chunks with source/chunk_index metadata, in ingestion order.
+
+    Returns:
+        The chunks to push downstream: canonical chunks, plus linked duplicates in link mode.
+    """
+		if not docs:
+			return []
+
+		signatures, has_shingles = self.signatures([doc.page_content for doc in docs])
+		buckets = self._band_buckets(signatures)
+
+		kept: List[Document] = []
+		duplicates = 0
+		with self._lock:
+			members, chunks = self._lookup(buckets)
+			self._drop_replaced(docs, chunks)
+			# Canonical chunks of this batch, indexed in memory until the batch is committed
+			pending: Dict[int, tuple] = {}
+			next_pending = -1
+
+			for position, doc in enumerate(docs):
+				source, chunk_index = doc.metadata["source"], doc.metadata.get("chunk_index", 0)
+				chunk_id = service_utils.get_chunk_id(source, chunk_index, doc.page_content)
+				if not has_shingles[position]:
+					kept.append(doc)
+					continue
+
+				candidates = set().union(*(members.get(int(bucket), ()) for bucket in buckets[position]))
+				best: tuple | None = None
+				best_similarity = self.threshold
+				for candidate in candidates:
+					entry = pending.get(candidate)
+					if entry is None:
+						entry = chunks.get(candidate)
+						# Indexed chunks of the same file are its previous version, replaced by this ingestion
+						if entry is None or entry[1] == source:
+							continue
+					similarity = float(np.mean(entry[4] == signatures[position]))
+					if similarity >= best_similarity:
+						best, best_similarity = entry, similarity
+
+				if best is None:
+					self._index(doc, chunk_id, signatures[position], buckets[position])
+					pending[next_pending] = (chunk_id, source, chunk_index, doc.page_content, signatures[position])
+					for bucket in buckets[position]:
+						members.setdefault(int(bucket), set()).add(next_pending)
+					next_pending -= 1
+					kept.append(doc)
+					continue
+
+				logger.debug("[DedupService] %s#%s is a near-duplicate (%.2f) of %s#%s",
+				             source, chunk_index, best_similarity, best[1], best[2])
+				# The chunk stored there by the previous version is replaced or deleted, nothing may link to it
+				self._remove_position(source, chunk_index)
+				if self.mode == DedupMode.LINK:
+					doc.metadata[DUPLICATE_OF_KEY] = best[0]
+					doc.metadata[CANONICAL_SOURCE_KEY] = best[1]
+					doc.metadata[CANONICAL_TEXT_KEY] = best[3]
+					kept.append(doc)
+				elif doc.metadata.get("last_chunk"):
+					# The vector database deletes stored chunks past the last one, the flag must reach it
+					previous = next((kept_doc for kept_doc in reversed(kept) if kept_doc.metadata["source"] == source), None)
+					if previous is None:
+						kept.append(doc)
+						continue
+					previous.metadata["last_chunk"] = True
+					self._truncate(source, previous.metadata.get("chunk_index", 0), chunks)
+				else:
+					self._dropped.setdefault(source, []).append(chunk_index)
+				duplicates += 1
+
+			for doc in kept:
+				if doc.metadata.get("last_chunk"):
+					dropped = self._dropped.pop(doc.metadata["source"], None)
+					if dropped:
+						doc.metadata[DROPPED_CHUNKS_KEY] = ",".join(map(str, dropped))
+
+			self.connection.commit()
+
+		self._unique_metric.inc(len(docs) - duplicates)
+		self._duplicate_metric.inc(duplicates)
+		if duplicates:
+			logger.info("[DedupService] %d of %d chunks are near-duplicates (%s)", duplicates, len(docs), self.mode)
+		return kept
+
+	def remove_sources(self, sources: List[str]) -> None:
+		"""Drop every indexed chunk of the given sources."""
+		with self._lock:
+			for start in range(0, len(sources), LOOKUP_CHUNK_SIZE):
+				part = sources[start:start + LOOKUP_CHUNK_SIZE]
+				placeholders = ','.join('?' * len(part))
+				self.connection.execute(
+					f"DELETE FROM buckets WHERE chunk IN (SELECT id FROM chunks WHERE source IN ({placeholders}))", part
+				)
+				self.connection.execute(f"DELETE FROM chunks WHERE source IN ({placeholders})", part)
+			self.connection.commit()
+
+	def rename_source(self, old_source: str, new_source: str) -> None:
+		"""Move the indexed chunks of a renamed file to its new path, keeping their signatures."""
+		with self._lock:
+			rows = self.connection.execute(
+				"SELECT id, chunk_index, text FROM chunks WHERE source = ?", (old_source,)
+			).fetchall()
+			# Chunk ids are derived from the source, so they change with it
+			self.connection.executemany(
+				"UPDATE chunks SET source = ?, chunk_id = ? WHERE id = ?",
+				[(new_source, service_utils.get_chunk_id(new_source, chunk_index, text), row_id)
+				 for row_id, chunk_index, text in rows]
+			)
+			self.connection.commit()
+
+	def close(self) -> None:
+		with self._lock:
+			self.connection.close()
@@ -1,13 +1,18 @@
 import logging
+import multiprocessing
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
 from threading import Event
 
-from langchain_community.document_loaders import TextLoader
+from langchain_core.document_loaders import BaseLoader
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from pathlib import Path
-from typing import Generator, List, Set
+from typing import Callable, Deque, Dict, Generator, Iterable, Iterator, List, Set, Tuple
 
 from app.config.core import document_service_config
+from app.services.text_splitter import OffsetTextSplitter
+from app.utils.streaming_loaders import StreamingJSONLinesLoader, StreamingJSONLoader, StreamingTextLoader
 
 logger = logging.getLogger(__name__)
 
@@ -21,33 +26,94 @@ class DocumentService:
     - Filtering by allowed extensions
     - Pluggable file loaders
     - Batch or single-file processing
+
+  Files are read through streaming loaders and split window by window, so
+  memory per file is bounded by the window size rather than the file size.
+  Every chunk records its character offsets in the file ('start_index',
+  'end_index').
   """
 
 	EXTENSION_LOADERS = {
-		".txt": TextLoader
+		".txt": StreamingTextLoader,
+		".md": StreamingTextLoader,
+		".json": StreamingJSONLoader,
+		".jsonl": StreamingJSONLinesLoader,
 	}
 
 	def __init__(self,
 	             documents_path: Path = document_service_config.documents_path,
 	             allowed_extensions: Set[str] = document_service_config.allowed_extensions):
-		logger.info("[DocumentService] Initializing RecursiveCharacterTextSplitter (chunk_size=%d, chunk_overlap=%d)",
+		logger.info("[DocumentService] Initializing OffsetTextSplitter (chunk_size=%d, chunk_overlap=%d)",
 		            document_service_config.chunk_size, document_service_config.chunk_overlap)
 		self.documents_path = documents_path
 		self.allowed_extensions = allowed_extensions
-		self.splitter = RecursiveCharacterTextSplitter(
+		self.splitter = OffsetTextSplitter(
 			chunk_size=document_service_config.chunk_size,
 			chunk_overlap=document_service_config.chunk_overlap,
 		)
 		logger.info("[DocumentService] Intialized")
 
+	@staticmethod
+	def index_chunks(chunks: Iterable[Document]) -> Generator[Document, None, None]:
+		"""
+    Annotate the chunks of a single file with their position.
+
+    Every chunk gets a 'chunk_index' and a 'last_chunk' flag, which VectorDBService
+    uses to build stable chunk ids and to find chunks left over from a previous
+    version of the file. Uses one chunk of lookahead so it also works on streams.
+    """
+		iterator: Iterator[Document] = iter(chunks)
+		previous: Document | None = next(iterator, None)
+		index = 0
+		while previous is not None:
+			current = next(iterator, None)
+			previous.metadata['chunk_index'] = index
+			previous.metadata['last_chunk'] = current is None
+			yield previous
+			previous = current
+			index += 1
+
 	def is_valid_file(self, file: Path) -> bool:
 		"""Return True if file is a real file and extension is allowed."""
 		return file.is_file() and file.suffix.lower() in self.allowed_extensions
 
-	def get_file_loader(self, file_path: Path) -> type[TextLoader] | None:
+	def get_file_loader(self, file_path: Path) -> type[BaseLoader] | None:
 		"""Return the file loader class for a given file, or None if unsupported."""
 		return self.EXTENSION_LOADERS.get(file_path.suffix.lower(), None)
 
+	def _split_windows(self, windows: Iterable[Document]) -> Generator[Document, None, None]:
+		for window in windows:
+			window_start = window.metadata.pop("window_start", 0)
+			text = window.page_content
+			# Chunks are only materialized here, offsets are relative to the window
+			for start, end in self.splitter.split_offsets(text):
+				yield Document(
+					page_content=text[start:end],
+					metadata={**window.metadata, "start_index": window_start + start, "end_index": window_start + end}
+				)
+
+	def iter_file_chunks(self, file_path: Path) -> Generator[Document, None, None]:
+		"""Lazily load and split one file into indexed chunks, raising on failure."""
+		file_loader = self.get_file_loader(file_path)
+		loader = file_loader(str(file_path))
+		logger.info("[DocumentService] Streaming chunks from %s", file_path)
+		return self.index_chunks(self._split_windows(loader.lazy_load()))
+
+	def split_file(self, file_path: Path) -> List[Document]:
+		"""Load and split one file into indexed chunks, raising on failure."""
+		chunks = list(self.iter_file_chunks(file_path))
+		logger.info("[DocumentService] Produced %d chunks from %s", len(chunks), file_path)
+		return chunks
+
+	def _is_loadable(self, file_path: Path) -> bool:
+		if not self.is_valid_file(file_path):
+			logger.info("[DocumentService] Skipping invalid file: %s", file_path)
+			return False
+		if self.get_file_loader(file_path) is None:
+			logger.warning("[DocumentService] No loader registered for file: %s", file_path)
+			return False
+		return True
+
 	def load_and_split_file(self, file_path: Path) -> List[Document]:
 		"""
     Load and split a single valid file into many chunked Document objects.
@@ -59,68 +125,137 @@ class DocumentService:
         A list of chunked Document objects.
     """
 
-		if not self.is_valid_file(file_path):
-			logger.debug("[DocumentService] Skipping invalid file: %s", file_path)
+		if not self._is_loadable(file_path):
 			return []
 
-		file_loader_class = self.get_file_loader(file_path)
-		if not file_loader_class:
-			logger.warning("[DocumentService] No loader registered for file: %s", file_path)
+		try:
+			return self.split_file(file_path)
+		except Exception as ex:
+			logger.exception("[DocumentService] Failed to process %s: %s", file_path, ex)
 			return []
 
+	def scan_files(self) -> Generator[Path, None, None]:
+		"""Yield every valid file under the documents directory."""
+		logger.info("[DocumentService] Scanning directory for documents: %s", self.documents_path)
+		for file_path in self.documents_path.rglob('*'):
+			if not self.is_valid_file(file_path):
+				logger.info("[DocumentService] Skipping invalid file: %s", file_path)
+				continue
+			yield file_path
+
+	def _split_sequential(self, files: Iterable[Path]) -> Generator[Tuple[Path, Iterable[Document]], None, None]:
+		for file_path in files:
+			yield file_path, self.iter_file_chunks(file_path)
+
+	def _split_parallel(self,
+	                    files: Iterable[Path],
+	                    workers: int,
+	                    prefetch: int,
+	                    ordered: bool) -> Generator[Tuple[Path, List[Document]], None, None]:
+		"""
+    Fan files out to a process pool, keeping at most `prefetch` files in flight.
+
+    Args:
+        files: Loadable files to split
+        workers: Number of worker processes
+        prefetch: Maximum number of submitted files whose chunks were not yet consumed
+        ordered: Yield results in submission order instead of completion order
+
+    Yields:
+        (file path, chunks) for every file that was split successfully
+    """
+		# spawn: forking a process that already runs Redis clients and worker threads is unsafe
+		executor = ProcessPoolExecutor(max_workers=workers,
+		                               mp_context=multiprocessing.get_context("spawn"),
+		                               initializer=_init_split_worker,
+		                               initargs=(self.documents_path, self.allowed_extensions))
+		logger.info("[DocumentService] Started process pool (workers=%d, prefetch=%d, ordered=%s)",
+		            workers, prefetch, ordered)
+
+		files = iter(files)
+		in_flight: Dict[Future, Path] = {}
+		submitted: Deque[Future] = deque()
+
+		def submit_next() -> bool:
+			file_path = next(files, None)
+			if file_path is None:
+				return False
+			future = executor.submit(_split_file_in_worker, file_path)
+			in_flight[future] = file_path
+			if ordered:
+				submitted.append(future)
+			return True
+
 		try:
-			loader = file_loader_class(str(file_path))
-			documents = loader.load()
-			logger.info("[DocumentService] Loaded %d raw docs from %s", len(documents), file_path)
+			while len(in_flight) < prefetch and submit_next():
+				pass
 
-			chunks: List[Document] = []
-			for doc in documents:
-				splits = self.splitter.split_documents([doc])
-				chunks.extend(splits)
+			while in_flight:
+				if ordered:
+					done = [submitted.popleft()]
+				else:
+					done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
 
-			logger.info("[DocumentService] Produced %d chunks from %s", len(chunks), file_path)
-			return chunks
+				for future in done:
+					file_path = in_flight.pop(future)
+					try:
+						chunks = future.result()
+					except Exception as ex:
+						logger.error("[DocumentService] Failed to process %s: %s", file_path, ex)
+						chunks = None
 
-		except Exception as ex:
-			logger.exception("[DocumentService] Failed to process %s: %s", file_path, ex)
-			return []
+					# Refill before handing the result over so the pool stays busy while the consumer works
+					submit_next()
+					if chunks is not None:
+						yield file_path, chunks
+		finally:
+			executor.shutdown(wait=True, cancel_futures=True)
 
-	def load_and_split_batch(self, batch_size: int | None) -> Generator[List[Document], None, None]:
+	def load_and_split_batch(self,
+	                         batch_size: int | None,
+	                         files: Iterable[Path] | None = None,
+	                         on_file_done: Callable[[Path], None] | None = None,
+	                         parallel_workers: int | None = None,
+	                         prefetch: int | None = None,
+	                         ordered: bool | None = None) -> Generator[List[Document], None, None]:
 		"""
     Load & split documents in a directory **in batches**.
 
+    Files are split on the calling thread, or in a process pool when
+    parallel_workers is greater than 1.
+
     Args:
         batch_size: Number of raw documents before triggering split+yield
+        files: Files to process, defaults to every valid file under documents_path
+        on_file_done: Called with each file path once all its chunks were added to a batch
+        parallel_workers: Worker processes used to split files, defaults to the config
+        prefetch: Files in flight in the pool, defaults to the config
+        ordered: Keep the file order of the input in the output, defaults to the config
 
     Yields:
         A list of Document chunks (each chunk already split)
     """
 		if batch_size is None:
 			batch_size = document_service_config.batch_size
-		directory: Path = self.documents_path
-		batch: List[Document] = []
-
-		logger.info("[DocumentService] Scanning directory for documents: %s", directory)
-
-		for file_path in directory.rglob('*'):
-			if not self.is_valid_file(file_path):
-				logger.info("[DocumentService] Skipping invalid file: %s", file_path)
-				continue
+		if files is None:
+			files = self.scan_files()
+		if parallel_workers is None:
+			parallel_workers = document_service_config.parallel_workers
+		if prefetch is None:
+			prefetch = document_service_config.prefetch
+		if ordered is None:
+			ordered = document_service_config.ordered
 
-			file_loader = self.get_file_loader(file_path)
-			if file_loader is None:
-				logger.warning("[DocumentService] No loader registered for file: %s", file_path)
-				continue
+		loadable = (file_path for file_path in files if self._is_loadable(file_path))
+		if parallel_workers > 1:
+			results = self._split_parallel(loadable, parallel_workers, max(prefetch, parallel_workers), ordered)
+		else:
+			results = self._split_sequential(loadable)
 
+		batch: List[Document] = []
+		for file_path, chunks in results:
 			try:
-				loader = file_loader(str(file_path))
-				logger.info("[DocumentService] Loaded raw docs from %s", file_path)
-
-				raw = loader.load()
-				splits = self.splitter.split_documents(raw)
-				logger.info("[DocumentService] Produced %d splits from %s", len(splits), file_path)
-
-				for split in splits:
+				for split in chunks:
 					batch.append(split)
 					if len(batch) >= batch_size:
 						logger.info("[DocumentService] Yield batch of %d from %s", len(batch), file_path)
@@ -131,7 +266,23 @@ class DocumentService:
 				logger.exception("[DocumentService] Failed to process %s: %s", file_path, ex)
 				continue
 
+			if on_file_done is not None:
+				on_file_done(file_path)
+
 		# Process any remaining documents in batch
 		if batch:
 			logger.info("[DocumentService] Yielding final batch of %d chunks", len(batch))
 			yield batch
+
+
+# Per-process DocumentService used by the pool workers of DocumentService._split_parallel
+_worker_service: DocumentService | None = None
+
+
+def _init_split_worker(documents_path: Path, allowed_extensions: Set[str]) -> None:
+	global _worker_service
+	_worker_service = DocumentService(documents_path, allowed_extensions)
+
+
+def _split_file_in_worker(file_path: Path) -> List[Document]:
+	return _worker_service.split_file(file_path)
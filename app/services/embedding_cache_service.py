@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import sqlite3
+import time
+import unicodedata
+
+from array import array
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Sequence
+
+from app.config.core import embedding_cache_config
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) clauses well below SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+class EmbeddingCacheService:
+	"""
+  Local on-disk cache of embedding vectors, backed by SQLite.
+
+  Entries are keyed on (model name, hash of the normalized text) and stored as
+  compact float32 blobs. The cache is bounded to max_entries and evicts the
+  least recently used entries once the bound is exceeded.
+  """
+
+	def __init__(self,
+	             cache_path: Path = embedding_cache_config.cache_path,
+	             max_entries: int = embedding_cache_config.max_entries) -> None:
+		logger.info("[EmbeddingCacheService] Opening cache at %s (max_entries=%d)", cache_path, max_entries)
+		self.cache_path = cache_path
+		self.max_entries = max_entries
+		self.hits = 0
+		self.misses = 0
+		self._lock = Lock()
+
+		self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+		self.connection = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+		self.connection.execute("PRAGMA journal_mode=WAL")
+		self.connection.execute("PRAGMA synchronous=NORMAL")
+		self.connection.execute(
+			"CREATE TABLE IF NOT EXISTS embeddings ("
+			"key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+		)
+		self.connection.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+		self.connection.commit()
+		self._size = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+		logger.info("[EmbeddingCacheService] Initialized with %d cached embeddings", self._size)
+
+	@staticmethod
+	def normalize_text(text: str) -> str:
+		"""Normalize unicode and collapse whitespace so trivially different texts share a key."""
+		return " ".join(unicodedata.normalize("NFC", text).split())
+
+	@classmethod
+	def get_key(cls, model_name: str, text: str) -> str:
+		"""Return the cache key of a text for a given embedding model."""
+		digest = hashlib.sha256()
+		digest.update(model_name.encode("utf-8"))
+		digest.update(b"\x00")
+		digest.update(cls.normalize_text(text).encode("utf-8"))
+		return digest.hexdigest()
+
+	@staticmethod
+	def _encode(vector: Sequence[float]) -> bytes:
+		return array("f", vector).tobytes()
+
+	@staticmethod
+	def _decode(blob: bytes) -> List[float]:
+		vector = array("f")
+		vector.frombytes(blob)
+		return vector.tolist()
+
+	def get_many(self, model_name: str, texts: List[str]) -> List[List[float] | None]:
+		"""
+    Look up the embeddings of many texts at once.
+
+    Args:
+        model_name: Embedding model the vectors were produced with
+        texts: Texts to look up
+
+    Returns:
+        A list aligned with texts, holding the cached vector or None on a miss.
+    """
+		keys = [self.get_key(model_name, text) for text in texts]
+		found: Dict[str, bytes] = {}
+		unique_keys = list(dict.fromkeys(keys))
+
+		with self._lock:
+			for start in range(0, len(unique_keys), LOOKUP_CHUNK_SIZE):
+				chunk = unique_keys[start:start + LOOKUP_CHUNK_SIZE]
+				placeholders = ",".join("?" * len(chunk))
+				rows = self.connection.execute(
+					f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+				).fetchall()
+				found.update(rows)
+
+			if found:
+				now = time.time()
+				self.connection.executemany(
+					"UPDATE embeddings SET last_access = ? WHERE key = ?",
+					[(now, key) for key in found]
+				)
+				self.connection.commit()
+
+			hits = sum(1 for key in keys if key in found)
+			self.hits += hits
+			self.misses += len(keys) - hits
+
+		return [self._decode(found[key]) if key in found else None for key in keys]
+
+	def put_many(self, model_name: str, texts: List[str], vectors: List[List[float]]) -> None:
+		"""Store the embeddings of many texts at once, evicting LRU entries if the cache is full."""
+		if not texts:
+			return
+
+		now = time.time()
+		rows = [
+			(self.get_key(model_name, text), self._encode(vector), now)
+			for text, vector in zip(texts, vectors)
+		]
+		with self._lock:
+			before = self.connection.total_changes
+			self.connection.executemany(
+				"INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows
+			)
+			self._size += self.connection.total_changes - before
+			if self._size > self.max_entries:
+				self._evict()
+			self.connection.commit()
+
+	def _evict(self) -> None:
+		# Evict down to 90% of the bound so eviction is not triggered on every write
+		excess = self._size - int(self.max_entries * 0.9)
+		self.connection.execute(
+			"DELETE FROM embeddings WHERE key IN ("
+			"SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)", (excess,)
+		)
+		self._size -= excess
+		logger.info("[EmbeddingCacheService] Evicted %d least recently used embeddings", excess)
+
+	def stats(self) -> Dict[str, int]:
+		"""Return hit/miss counters and the current number of cached embeddings."""
+		return {"hits": self.hits, "misses": self.misses, "size": self._size}
+
+	def close(self) -> None:
+		"""Close the underlying SQLite connection."""
+		with self._lock:
+			self.connection.close()
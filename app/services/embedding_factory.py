@@ -0,0 +1,89 @@
+import logging
+
+from typing import Callable, Dict
+
+from langchain_core.embeddings import Embeddings
+
+from app.config.core import EmbeddingBackend, async_embedding_config, embedding_service_config
+
+logger = logging.getLogger(__name__)
+
+EmbeddingModelFactory = Callable[[str], Embeddings]
+
+
+def _create_mistral(model_name: str) -> Embeddings:
+	if not embedding_service_config.api_key:
+		raise ValueError("the mistral embedding backend requires MISTRAL_API_KEY")
+
+	# Backend dependencies are imported by their factory, so only the selected backend pays for them
+	if async_embedding_config.enabled:
+		from app.services.async_embedding_client import AsyncEmbeddingClient
+		logger.info("[EmbeddingFactory] Initializing AsyncEmbeddingClient")
+		return AsyncEmbeddingClient(api_key=embedding_service_config.api_key, model_name=model_name)
+
+	from langchain_mistralai import MistralAIEmbeddings
+	logger.info("[EmbeddingFactory] Initializing MistralAIEmbeddingsModel")
+	return MistralAIEmbeddings(api_key=embedding_service_config.api_key, model=model_name)
+
+
+def _create_hashing(model_name: str) -> Embeddings:
+	from app.services.hashing_embeddings import HashingEmbeddings
+	return HashingEmbeddings(
+		dimension=embedding_service_config.hashing_dimension,
+		ngram_sizes=embedding_service_config.hashing_ngram_sizes
+	)
+
+
+EMBEDDING_BACKENDS: Dict[str, EmbeddingModelFactory] = {
+	EmbeddingBackend.MISTRAL: _create_mistral,
+	EmbeddingBackend.HASHING: _create_hashing,
+}
+
+
+def register_embedding_backend(backend: str, factory: EmbeddingModelFactory) -> None:
+	"""
+	Register (or replace) an embedding backend.
+
+	Args:
+	    backend: Name selected by EmbeddingServiceConfig.backend
+	    factory: Called with the configured model name, returns a LangChain Embeddings
+	"""
+	EMBEDDING_BACKENDS[backend] = factory
+
+
+def get_embedding_model_name(backend: str = embedding_service_config.backend,
+                             model_name: str = embedding_service_config.embedding_model_name) -> str:
+	"""
+	Name of the vector space a backend produces, without creating its model.
+
+	Lets processes that do not embed (e.g. a document-only stage) record which
+	model their files are embedded with, so switching backends re-ingests them.
+
+	Args:
+	    backend: One of EMBEDDING_BACKENDS (EmbeddingBackend or a registered name)
+	    model_name: Model requested from remote backends, ignored by local ones
+	"""
+	if backend == EmbeddingBackend.HASHING:
+		from app.services.hashing_embeddings import HashingEmbeddings
+		return HashingEmbeddings.get_model_name(embedding_service_config.hashing_dimension,
+		                                        embedding_service_config.hashing_ngram_sizes)
+	if backend == EmbeddingBackend.MISTRAL:
+		return model_name
+	return f"{backend}:{model_name}"
+
+
+def create_embedding_model(backend: str = embedding_service_config.backend,
+                           model_name: str = embedding_service_config.embedding_model_name) -> Embeddings:
+	"""
+	Create the embedding model of the configured backend.
+
+	Args:
+	    backend: One of EMBEDDING_BACKENDS (EmbeddingBackend or a registered name)
+	    model_name: Model requested from remote backends, ignored by local ones
+	"""
+	factory = EMBEDDING_BACKENDS.get(backend)
+	if factory is None:
+		raise ValueError(f"invalid embedding backend: {backend}")
+
+	logger.info("[EmbeddingFactory] Creating %s embedding model", backend)
+	return factory(model_name)
@@ -1,10 +1,17 @@
 import logging
 
+import numpy as np
+
 from langchain_core.documents import Document
-from langchain_mistralai import MistralAIEmbeddings
-from typing import List
+from langchain_core.embeddings import Embeddings
+from typing import Dict, List
 
 from app.config.core import embedding_service_config
+from app.services.batch_packer import TokenBatchPacker
+from app.services.dedup_service import CANONICAL_TEXT_KEY
+from app.services.embedding_cache_service import EmbeddingCacheService
+from app.services.embedding_factory import create_embedding_model, get_embedding_model_name
+from app.utils import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -13,22 +20,115 @@ class EmbeddingService:
 	"""
   Service responsible for converting batches of LangChain Document objects
   into embedding vectors using the configured embedding model.
+
+  The model comes from the backend registry (EmbeddingServiceConfig.backend),
+  unless an embedding_model (any LangChain Embeddings) is injected, e.g. a fake
+  model for offline benchmarks.
+  When a cache is given, only texts missing from the cache are sent to the model.
+  Texts over the model's per-input token limit are embedded in pieces and averaged.
   """
 
-	def __init__(self) -> None:
-		logger.info("[EmbeddingService] Initializing MistralAIEmbeddingsModel")
-		self.embedding_model = MistralAIEmbeddings(
-			api_key=embedding_service_config.api_key,
-			model=embedding_service_config.embedding_model_name
-		)
-		logger.info("[EmbeddingService] Initialized")
+	def __init__(self,
+	             cache: EmbeddingCacheService | None = None,
+	             batch_packer: TokenBatchPacker | None = None,
+	             embedding_model: Embeddings | None = None,
+	             model_name: str | None = None,
+	             backend: str = embedding_service_config.backend) -> None:
+		if embedding_model is not None:
+			logger.info("[EmbeddingService] Using injected embedding model %s", type(embedding_model).__name__)
+			self.embedding_model = embedding_model
+		else:
+			self.embedding_model = create_embedding_model(
+				backend=backend,
+				model_name=model_name or embedding_service_config.embedding_model_name
+			)
+		# Names the vector space, cache entries of different models never mix
+		self.model_name = model_name or getattr(self.embedding_model, "model_name", None) \
+			or get_embedding_model_name(backend)
+		self.cache = cache
+		self.batch_packer = batch_packer if batch_packer is not None else TokenBatchPacker()
+		self._model_texts_metric = metrics.EMBED_TEXTS.labels(source="model")
+		self._cache_texts_metric = metrics.EMBED_TEXTS.labels(source="cache")
+		self._errors_metric = metrics.STAGE_ERRORS.labels(stage="embedding_service")
+		logger.info("[EmbeddingService] Initialized (cache=%s)", "enabled" if cache else "disabled")
+
+	def _embed_oversized(self, text: str) -> List[float]:
+		"""Embed a text over the per-input limit as the length-weighted mean of its pieces."""
+		pieces = self.batch_packer.split_text(text)
+		# Each piece is up to the per-text limit, several of them would overflow one request
+		groups = self.batch_packer.pack([Document(page_content=piece) for piece in pieces])
+		logger.info("[EmbeddingService] Embedding oversized text in %d pieces over %d requests", len(pieces), len(groups))
+		piece_vectors = np.asarray([vector for group in groups
+		                            for vector in self._call_model([doc.page_content for doc in group])],
+		                           dtype=np.float32)
+		vector = np.average(piece_vectors, axis=0, weights=[len(piece) for piece in pieces])
+		norm = np.linalg.norm(vector)
+		return (vector / norm if norm else vector).tolist()
+
+	def _call_model(self, texts: List[str]) -> List[List[float]]:
+		with metrics.EMBED_REQUEST_SECONDS.time():
+			return self.embedding_model.embed_documents(texts)
+
+	def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+		"""Send texts to the model, routing oversized texts through _embed_oversized()."""
+		oversized = [position for position, text in enumerate(texts) if self.batch_packer.is_oversized(text)]
+		self._model_texts_metric.inc(len(texts))
+		if not oversized:
+			return self._call_model(texts)
+
+		oversized_positions = set(oversized)
+		regular = [position for position in range(len(texts)) if position not in oversized_positions]
+		vectors: List[List[float] | None] = [None] * len(texts)
+		if regular:
+			for position, vector in zip(regular, self._call_model([texts[i] for i in regular])):
+				vectors[position] = vector
+		for position in oversized:
+			vectors[position] = self._embed_oversized(texts[position])
+		return vectors
+
+	def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+		"""
+    Embed texts, serving cache hits locally and sending only the misses to the model.
+
+    Args:
+        texts: Texts to embed.
+
+    Returns:
+        Vectors in the same order as texts.
+    """
+		if self.cache is None:
+			return self._embed_uncached(texts)
+
+		vectors: List[List[float] | None] = self.cache.get_many(self.model_name, texts)
+
+		# Deduplicate misses so repeated texts within a batch are embedded once
+		missing: Dict[str, List[int]] = {}
+		for position, (text, vector) in enumerate(zip(texts, vectors)):
+			if vector is None:
+				missing.setdefault(text, []).append(position)
+
+		if missing:
+			missing_texts = list(missing)
+			missing_vectors = self._embed_uncached(missing_texts)
+			self.cache.put_many(self.model_name, missing_texts, missing_vectors)
+			for text, vector in zip(missing_texts, missing_vectors):
+				for position in missing[text]:
+					vectors[position] = vector
+
+		served = len(texts) - sum(len(positions) for positions in missing.values())
+		self._cache_texts_metric.inc(served)
+		logger.info("[EmbeddingService] Cache served %d of %d texts, %d sent to the model",
+		            served, len(texts), len(missing))
+		return vectors
 
-	def embed_batch(self, docs: List[Document]) -> List[List[float]]:
+	def embed_batch(self, docs: List[Document], raise_errors: bool = False) -> List[List[float]]:
 		"""
     Generate embeddings for a batch of Document objects.
 
     Args:
         docs: A list of Document objects to embed.
+        raise_errors: Re-raise model errors instead of returning an empty list, so
+            callers can retry or dead-letter the batch.
 
     Returns:
         A list where each item is a float vector representing the embedding for one document.
@@ -37,14 +137,20 @@ class EmbeddingService:
 			logger.warning("[EmbeddingService] No docs to embed")
 			return []
 
-		texts: List[str] = [doc.page_content for doc in docs]
+		# Linked near-duplicates are embedded as their canonical chunk, normally a cache hit
+		texts: List[str] = [doc.metadata.get(CANONICAL_TEXT_KEY) or doc.page_content for doc in docs]
 		logger.info("[EmbeddingService] Embedding %d documents", len(docs))
 
 		try:
-			vectors: List[List[float]] = self.embedding_model.embed_documents(texts)
+			vectors: List[List[float]] = self._embed_texts(texts)
 			logger.info("[EmbeddingService] Embedded %d documents", len(docs))
 			return vectors
 		except Exception as ex:
+			self._errors_metric.inc()
+			if raise_errors:
+				# Retried by the caller, the traceback is logged once it gives up
+				logger.warning("[EmbeddingService] Failed to embed batch of %d documents: %s", len(docs), ex)
+				raise
 			logger.exception("[EmbeddingService] Failed to embed batch: %s", ex)
 			return []
 
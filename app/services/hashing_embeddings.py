@@ -0,0 +1,79 @@
+import logging
+
+from typing import List, Sequence
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+from app.utils.ngram_hashing import concat_texts, ngram_hashes, normalize_text
+
+logger = logging.getLogger(__name__)
+
+_SIGN_SHIFT = np.uint64(63)
+
+
+class HashingEmbeddings(Embeddings):
+	"""
+  Local, CPU-only embedding model based on hashed character n-grams.
+
+  Every character n-gram of the lowercased, whitespace-normalized text is hashed
+  into one of `dimension` buckets with a hash-derived sign, and the bucket counts
+  are L2-normalized. A whole batch is hashed at once with NumPy: the texts are
+  concatenated into one byte array, rolling hashes are computed for every
+  position and n-grams crossing a text boundary are masked out.
+
+  The output is deterministic and needs no network or model weights, which suits
+  load tests, staging environments and air-gapped re-index runs. Similarity is
+  lexical rather than semantic, so vectors are not comparable with the Mistral ones.
+  """
+
+	@staticmethod
+	def get_model_name(dimension: int, ngram_sizes: Sequence[int]) -> str:
+		"""Name of the vector space of a hashing model with these parameters."""
+		return f"hashing-{'-'.join(map(str, sorted(set(ngram_sizes))))}-{dimension}"
+
+	def __init__(self, dimension: int = 1024, ngram_sizes: Sequence[int] = (3, 4, 5)) -> None:
+		if dimension <= 0:
+			raise ValueError(f"invalid dimension: {dimension}")
+		if not ngram_sizes or min(ngram_sizes) <= 0:
+			raise ValueError(f"invalid ngram sizes: {ngram_sizes}")
+		self.dimension = dimension
+		self.ngram_sizes = tuple(sorted(set(ngram_sizes)))
+		# Identifies the vector space, e.g. as the embedding cache key
+		self.model_name = self.get_model_name(dimension, self.ngram_sizes)
+		logger.info("[HashingEmbeddings] Initialized (%s)", self.model_name)
+
+	def embed_documents(self, texts: List[str]) -> List[List[float]]:
+		"""
+    Embed a batch of texts.
+
+    Args:
+        texts: Texts to embed.
+
+    Returns:
+        One unit vector (or all zeros for texts shorter than the smallest n-gram) per text.
+    """
+		if not texts:
+			return []
+
+		data, owners = concat_texts([normalize_text(text) for text in texts])
+		counts = np.zeros(len(texts) * self.dimension, dtype=np.float32)
+		for size in self.ngram_sizes:
+			hashes = ngram_hashes(data, size)
+			if not len(hashes):
+				continue
+			# Keep only n-grams that start and end inside the same text
+			inside = owners[:len(hashes)] == owners[size - 1:]
+			hashes = hashes[inside]
+			buckets = owners[:len(inside)][inside] * self.dimension + (hashes % np.uint64(self.dimension)).astype(np.int64)
+			signs = 1.0 - 2.0 * (hashes >> _SIGN_SHIFT).astype(np.float32)
+			counts += np.bincount(buckets, weights=signs, minlength=counts.size).astype(np.float32)
+
+		vectors = counts.reshape(len(texts), self.dimension)
+		norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+		np.divide(vectors, norms, out=vectors, where=norms > 0)
+		return vectors.tolist()
+
+	def embed_query(self, text: str) -> List[float]:
+		return self.embed_documents([text])[0]
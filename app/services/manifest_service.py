@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import os
+
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List
+
+from app.config.core import manifest_config, document_service_config
+from app.services.embedding_factory import get_embedding_model_name
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+HASH_READ_SIZE = 1024 * 1024
+
+
+class ManifestService:
+	"""
+  Persistent record of every file that went through the pipeline, used to
+  skip files that have not changed since the last run.
+
+  Each entry stores:
+    - size and mtime (cheap stat-only fast path)
+    - sha256 content hash (only computed when the stat check is inconclusive)
+    - the chunking fingerprint and embedding model the file was ingested with
+
+  Entries observed as changed are staged and only committed by save() once
+  mark_ingested() confirmed the file, i.e. once its last chunk is stored.
+  """
+
+	def __init__(self,
+	             manifest_path: Path = manifest_config.manifest_path,
+	             chunk_size: int = document_service_config.chunk_size,
+	             chunk_overlap: int = document_service_config.chunk_overlap,
+	             embedding_model_name: str | None = None) -> None:
+		self.manifest_path = manifest_path
+		# Vector space of the active embedding backend, files embedded by another one are ingested again
+		self.embedding_model_name = embedding_model_name or get_embedding_model_name()
+		self.fingerprint = self.get_chunk_fingerprint(chunk_size, chunk_overlap)
+		self.entries: Dict[str, Dict[str, Any]] = self._load()
+		self._staged: Dict[str, Dict[str, Any]] = {}
+		self._lock = Lock()
+		logger.info("[ManifestService] Initialized with %d entries (fingerprint=%s, embedding_model=%s)",
+		            len(self.entries), self.fingerprint, self.embedding_model_name)
+
+	@staticmethod
+	def get_chunk_fingerprint(chunk_size: int, chunk_overlap: int) -> str:
+		"""Return a short fingerprint of the chunking configuration."""
+		raw = f"chunk_size={chunk_size};chunk_overlap={chunk_overlap}"
+		return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+	@staticmethod
+	def hash_file(file_path: Path) -> str:
+		"""Return the sha256 hex digest of a file, read in fixed-size blocks."""
+		digest = hashlib.sha256()
+		with open(file_path, "rb") as f:
+			while block := f.read(HASH_READ_SIZE):
+				digest.update(block)
+		return digest.hexdigest()
+
+	def _load(self) -> Dict[str, Dict[str, Any]]:
+		if not self.manifest_path.exists():
+			logger.info("[ManifestService] No manifest found at %s, starting fresh", self.manifest_path)
+			return {}
+		try:
+			with open(self.manifest_path, "r", encoding="utf-8") as f:
+				data = json.load(f)
+			if data.get("version") != MANIFEST_VERSION:
+				logger.warning("[ManifestService] Manifest version mismatch, starting fresh")
+				return {}
+			return data.get("files", {})
+		except Exception as ex:
+			logger.exception("[ManifestService] Failed to read manifest %s: %s", self.manifest_path, ex)
+			return {}
+
+	def is_changed(self, file_path: Path) -> bool:
+		"""
+    Return True if the file is new or modified since it was last ingested.
+
+    The stat-only fast path (size + mtime) decides most files. The content hash is
+    only computed when the stat check fails, so a touched-but-identical file is
+    still reported as unchanged.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        True if the file must go through the pipeline again.
+    """
+		key = str(file_path)
+		stat = file_path.stat()
+		entry = self.entries.get(key)
+
+		observed: Dict[str, Any] = {
+			"size": stat.st_size,
+			"mtime_ns": stat.st_mtime_ns,
+			"fingerprint": self.fingerprint,
+			"embedding_model": self.embedding_model_name,
+		}
+
+		if entry is not None \
+				and entry.get("fingerprint") == self.fingerprint \
+				and entry.get("embedding_model") == self.embedding_model_name \
+				and entry.get("size") == stat.st_size:
+			if entry.get("mtime_ns") == stat.st_mtime_ns:
+				return False
+
+			observed["sha256"] = self.hash_file(file_path)
+			if entry.get("sha256") == observed["sha256"]:
+				# Content is identical, only refresh the stat so the fast path hits next time
+				with self._lock:
+					self._staged[key] = observed
+				logger.debug("[ManifestService] File touched but unchanged: %s", file_path)
+				return False
+
+		if "sha256" not in observed:
+			observed["sha256"] = self.hash_file(file_path)
+
+		with self._lock:
+			self._staged[key] = observed
+		logger.debug("[ManifestService] File new or modified: %s", file_path)
+		return True
+
+	def mark_ingested(self, file_path: Path) -> None:
+		"""Promote the staged entry of a file so that the next save() records it."""
+		key = str(file_path)
+		with self._lock:
+			observed = self._staged.pop(key, None)
+			if observed is not None:
+				self.entries[key] = observed
+
+	def get_entry(self, file_path: Path | str) -> Dict[str, Any] | None:
+		"""Return the committed manifest entry for a file, or None if it was never ingested."""
+		return self.entries.get(str(file_path))
+
+	def get_sources(self) -> List[str]:
+		"""Return the paths of every committed entry."""
+		with self._lock:
+			return list(self.entries)
+
+	def remove(self, file_path: Path | str) -> None:
+		"""Forget a file that no longer exists, the next save() drops its entry."""
+		key = str(file_path)
+		with self._lock:
+			self.entries.pop(key, None)
+			self._staged.pop(key, None)
+
+	def rename(self, old_path: Path | str, new_path: Path) -> None:
+		"""
+    Move the entry of a renamed file to its new path.
+
+    The stat is refreshed from the new path, so the moved file is reported as
+    unchanged by the stat-only fast path.
+    """
+		stat = new_path.stat()
+		with self._lock:
+			entry = self.entries.pop(str(old_path), None)
+			if entry is not None:
+				self.entries[str(new_path)] = {**entry, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+	def save(self) -> None:
+		"""Atomically write the manifest to disk, including refreshed stat-only entries."""
+		with self._lock:
+			# Touched-but-identical files were never sent downstream, commit them as well
+			for key, observed in list(self._staged.items()):
+				entry = self.entries.get(key)
+				if entry is not None and entry.get("sha256") == observed.get("sha256"):
+					self.entries[key] = observed
+					del self._staged[key]
+			payload = {"version": MANIFEST_VERSION, "files": self.entries}
+
+			# Several VectorDB writer threads save, they must not share the temporary file
+			self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+			tmp_path = self.manifest_path.with_suffix(self.manifest_path.suffix + ".tmp")
+			with open(tmp_path, "w", encoding="utf-8") as f:
+				json.dump(payload, f, separators=(",", ":"))
+			os.replace(tmp_path, self.manifest_path)
+		logger.info("[ManifestService] Saved manifest with %d entries to %s", len(self.entries), self.manifest_path)
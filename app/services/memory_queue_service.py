@@ -0,0 +1,174 @@
+import logging
+import time
+
+from collections import deque
+from threading import Condition, Lock
+from typing import Any, Deque, List, TypeVar
+
+from app.config.core import redis_config
+from app.services.queue_protocol import QueueClosedError
+from app.utils import metrics
+
+T = TypeVar('T')
+logger = logging.getLogger(__name__)
+
+# Unique marker object, items are compared by identity so no payload can collide with it
+SENTINEL = object()
+
+
+class InMemoryQueue:
+	"""
+	Bounded in-process queue with the same push/pop semantics as RedisBufferQueue.
+
+	Items are passed by reference, so nothing is serialized and no Redis server is
+	needed. Only usable when every stage of the pipeline runs in the same process.
+	Pushes block while the queue holds max_size items or more (0 = unbounded);
+	sentinels are never blocked. close() wakes blocked producers, which raise
+	QueueClosedError like every later push.
+	"""
+
+	def __init__(self, queue_name: str, max_size: int = 0) -> None:
+		self.queue_name = queue_name
+		self.max_size = max_size
+		self._items: Deque[Any] = deque()
+		self._lock = Lock()
+		self._not_empty = Condition(self._lock)
+		self._not_full = Condition(self._lock)
+		self._producers_done = 0
+		self._closed = False
+		self._pushed_metric = metrics.QUEUE_ITEMS.labels(queue=queue_name, operation="push")
+		self._popped_metric = metrics.QUEUE_ITEMS.labels(queue=queue_name, operation="pop")
+		metrics.QUEUE_DEPTH.labels(queue=queue_name).set_function(self.size)
+		logger.info("[MemoryQueueService] Created in-memory queue %s (max_size=%d)", queue_name, max_size)
+
+	def push_batch(self, items: List[T] | None) -> None:
+		"""
+		Append multiple items at once, waiting while the queue is full.
+		"""
+		if items is None:
+			self.push_sentinels(1)
+			return
+		if not items:
+			return
+		with self._lock:
+			# Re-check the closed flag now and then, a producer must never outlive the pipeline
+			while not self._closed and self.max_size and len(self._items) >= self.max_size:
+				self._not_full.wait(redis_config.pop_timeout)
+			if self._closed:
+				raise QueueClosedError(f"Queue {self.queue_name} is closed, {len(items)} items were not pushed")
+			self._items.extend(items)
+			self._not_empty.notify_all()
+		self._pushed_metric.inc(len(items))
+
+	def push_sentinels(self, count: int) -> None:
+		"""
+		Append `count` sentinels, one for each consumer that must stop.
+		"""
+		with self._lock:
+			self._items.extend([SENTINEL] * count)
+			self._not_empty.notify_all()
+
+	def mark_producer_done(self, producers: int, consumers: int) -> None:
+		"""
+		Record that one of `producers` producers has pushed all of its items.
+
+		The producer that completes the count pushes one sentinel per consumer.
+		"""
+		with self._lock:
+			self._producers_done += 1
+			done = self._producers_done
+			if done >= producers:
+				self._producers_done = 0
+		logger.info("[MemoryQueueService] Producer done on %s (%d/%d)", self.queue_name, done, producers)
+		if done >= producers:
+			self.push_sentinels(consumers)
+
+	def reset_completion(self) -> None:
+		"""
+		Reset the finished-producer counter before a new run starts.
+		"""
+		with self._lock:
+			self._producers_done = 0
+
+	def pop_batch(self,
+	              batch_size: int = 10,
+	              timeout: float | None = None,
+	              linger: float | None = None) -> List[T] | None:
+		"""
+		Pop a batch of items from the queue.
+
+		Blocks for up to `timeout` seconds while the queue is empty and returns as soon
+		as items arrive, or a partial batch once `linger` seconds passed since the first
+		item. Returns an empty list on timeout and None once the sentinel is reached.
+		Items before a sentinel are returned first, the sentinel stays at the head.
+		"""
+		timeout = redis_config.pop_timeout if timeout is None else timeout
+		linger = redis_config.pop_linger if linger is None else linger
+
+		with self._lock:
+			if not self._not_empty.wait_for(lambda: self._items, timeout):
+				return []
+
+			if self._items[0] is SENTINEL:
+				self._items.popleft()
+				self._not_full.notify_all()
+				return None
+
+			batch: List[T] = []
+			deadline = time.monotonic() + linger
+			while len(batch) < batch_size:
+				while self._items and len(batch) < batch_size and self._items[0] is not SENTINEL:
+					batch.append(self._items.popleft())
+				if len(batch) >= batch_size or self._items:
+					# Full batch, or stopped at a sentinel
+					break
+				remaining = deadline - time.monotonic()
+				if remaining <= 0 or not self._not_empty.wait(remaining):
+					break
+
+			self._not_full.notify_all()
+		self._popped_metric.inc(len(batch))
+		return batch
+
+	def check_ready(self) -> None:
+		"""
+		Always ready: the queue lives in this process.
+		"""
+		return None
+
+	def detach_pending(self) -> None:
+		"""
+		Nothing to hand over: popped items are already gone from the queue.
+		"""
+		return None
+
+	def ack(self, pending: None = None) -> None:
+		"""
+		No-op: popped items are already gone from the queue.
+		"""
+		return None
+
+	def size(self) -> int:
+		"""
+		Returns the size of the queue.
+		"""
+		with self._lock:
+			return len(self._items)
+
+	def clear(self) -> None:
+		"""
+		Clear the queue.
+		"""
+		with self._lock:
+			self._items.clear()
+			self._producers_done = 0
+			self._not_full.notify_all()
+
+	def close(self) -> None:
+		"""
+		Wake blocked producers and refuse later pushes, sentinels and pops still go through.
+		"""
+		with self._lock:
+			self._closed = True
+			self._not_full.notify_all()
+		logger.info("[MemoryQueueService] Closed in-memory queue %s", self.queue_name)
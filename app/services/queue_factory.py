@@ -0,0 +1,55 @@
+import logging
+
+from app.config.core import QueueBackend
+from app.services.queue_protocol import QueueProtocol
+from app.utils.serdes.serdes_protocol import SerDesProtocol
+
+logger = logging.getLogger(__name__)
+
+
+def create_queue(backend: str,
+                 queue_url: str,
+                 queue_name: str,
+                 group_name: str,
+                 serdes: SerDesProtocol,
+                 max_size: int = 0) -> QueueProtocol:
+	"""
+	Create a pipeline queue for the configured backend.
+
+	Backends are imported on demand, so the redis client is only loaded when a
+	Redis backend is used.
+
+	Args:
+	    backend: One of QueueBackend
+	    queue_url: Redis connection URL
+	    queue_name: Redis key of the list or stream
+	    group_name: Consumer group of the stage reading this queue (streams only)
+	    serdes: Serializer/deserializer for the queue items (unused by the memory backend)
+	    max_size: Bound of the memory backend, 0 = unbounded
+	"""
+	logger.info("[QueueFactory] Creating %s queue %s", backend, queue_name)
+
+	if backend == QueueBackend.REDIS_LIST:
+		from app.services.queue_service import RedisBufferQueue
+		return RedisBufferQueue(
+			redis_url=queue_url,
+			queue_name=queue_name,
+			serializer=serdes.serialize,
+			deserializer=serdes.deserialize
+		)
+
+	if backend == QueueBackend.REDIS_STREAM:
+		from app.services.stream_queue_service import RedisStreamQueue
+		return RedisStreamQueue(
+			redis_url=queue_url,
+			queue_name=queue_name,
+			group_name=group_name,
+			serializer=serdes.serialize,
+			deserializer=serdes.deserialize
+		)
+
+	if backend == QueueBackend.MEMORY:
+		from app.services.memory_queue_service import InMemoryQueue
+		return InMemoryQueue(queue_name=queue_name, max_size=max_size)
+
+	raise ValueError(f"invalid queue backend: {backend}")
@@ -0,0 +1,53 @@
+from typing import Any, Protocol, TypeVar, List
+
+# Define a generic type for the items carried by the queue
+T = TypeVar('T')
+
+
+class QueueClosedError(RuntimeError):
+	"""Raised by a push to a queue that was closed, e.g. while it waited for room."""
+
+
+class QueueProtocol(Protocol):
+	"""
+	Protocol defining the interface shared by all pipeline queue backends.
+	"""
+	def push_batch(self, items: List[T] | None) -> None:
+		"""Pushes a batch of items, or the completion sentinel when items is None."""
+		...
+
+	def pop_batch(self, batch_size: int = 10, timeout: float | None = None, linger: float | None = None) -> List[T] | None:
+		"""Pops up to batch_size items, returning None once the sentinel is reached."""
+		...
+
+	def mark_producer_done(self, producers: int, consumers: int) -> None:
+		"""Records that one producer finished; the last one pushes one sentinel per consumer."""
+		...
+
+	def reset_completion(self) -> None:
+		"""Resets the finished-producer count before a new run."""
+		...
+
+	def check_ready(self) -> None:
+		"""Raises if the queue backend cannot be reached yet."""
+		...
+
+	def detach_pending(self) -> Any:
+		"""Hands over the batches popped since the last ack, to be acknowledged later with ack(pending)."""
+		...
+
+	def ack(self, pending: Any = None) -> None:
+		"""Acknowledges that the last popped batch, or the detached `pending` batches, were fully processed."""
+		...
+
+	def size(self) -> int:
+		"""Returns the number of items not yet processed."""
+		...
+
+	def clear(self) -> None:
+		"""Removes every item from the queue."""
+		...
+
+	def close(self) -> None:
+		"""Wakes producers waiting for room, which raise QueueClosedError like every later push."""
+		...
@@ -5,6 +5,7 @@ import redis
 from typing import List, TypeVar, Callable
 from redis import Redis
 from app.config.core import redis_config
+from app.utils import metrics
 
 T = TypeVar('T')
 logger = logging.getLogger(__name__)
@@ -17,73 +18,165 @@ class RedisBufferQueue:
 	def __init__(self,
 	             redis_url: str,
 	             queue_name: str,
-	             serializer: Callable[[T], str],
-	             deserializer: Callable[[str], T]) -> None:
+	             serializer: Callable[[T], str | bytes],
+	             deserializer: Callable[[bytes], T]) -> None:
 		self.redis_url = redis_url
 		self.queue_name = queue_name
 		self.serializer = serializer
 		self.deserializer = deserializer
+		# Number of producers that finished, shared by every process using this queue
+		self.completion_key = f"{queue_name}:producers_done"
 		self.redis_client = self.get_redis_client()
+		self._pushed_metric = metrics.QUEUE_ITEMS.labels(queue=queue_name, operation="push")
+		self._popped_metric = metrics.QUEUE_ITEMS.labels(queue=queue_name, operation="pop")
+		# Evaluated at collection time only, so it costs nothing on the hot path
+		metrics.QUEUE_DEPTH.labels(queue=queue_name).set_function(self.size)
 
-	def get_redis_client(self) -> Redis | None:
-		for attempt in range(redis_config.max_retries):
-			try:
-				client = redis.Redis.from_url(
-					self.redis_url,
-					socket_keepalive=True,
-					socket_timeout=5
-				)
-
-				client.ping()
-				logger.info("[QueueService] Redis client initialized and connected successfully.")
-				return client
-			except ConnectionError as e:
-				logger.warning(f"[QueueService] Redis connection attempt {attempt + 1} failed: {e}")
-				if attempt < redis_config.max_retries:
-					time.sleep(redis_config.sleep_timer)
-					return None
-				else:
-					raise
-		return None
+	def get_redis_client(self) -> Redis:
+		"""
+		Create the Redis client. It connects on its first command, readiness is
+		checked separately by check_ready() instead of sleeping between retries here.
+		"""
+		client = redis.Redis.from_url(
+			self.redis_url,
+			socket_keepalive=True,
+			socket_timeout=5
+		)
+		logger.info("[QueueService] Redis client initialized for %s", self.queue_name)
+		return client
+
+	def check_ready(self) -> None:
+		"""
+		Ping Redis, raising if it is not reachable.
+		"""
+		self.redis_client.ping()
 
 	def push_batch(self, items: List[T] | None) -> None:
 		"""
-		Push multiple items to the queue at once.
+		Push multiple items to the queue at once with a single variadic RPUSH.
 		"""
 		if items is None:
-			self.redis_client.rpush(self.queue_name, SENTINEL_BYTES)
+			self.push_sentinels(1)
 			return
-		pipeline = self.redis_client.pipeline()
-		for item in items:
-			pipeline.rpush(self.queue_name, self.serializer(item))
-		pipeline.execute()
+		if not items:
+			return
+		self.redis_client.rpush(self.queue_name, *[self.serializer(item) for item in items])
+		self._pushed_metric.inc(len(items))
+
+	def push_sentinels(self, count: int) -> None:
+		"""
+		Push `count` sentinels, one for each consumer that must stop.
+		"""
+		self.redis_client.rpush(self.queue_name, *[SENTINEL_BYTES] * count)
+
+	def mark_producer_done(self, producers: int, consumers: int) -> None:
+		"""
+		Record that one of `producers` producers has pushed all of its items.
+
+		The producer that completes the count pushes one sentinel per consumer. Since
+		every producer finished pushing before incrementing the counter, all sentinels
+		land after all items, whichever process or host the producers run in.
+		"""
+		done = self.redis_client.incr(self.completion_key)
+		logger.info("[QueueService] Producer done on %s (%d/%d)", self.queue_name, done, producers)
+		if done < producers:
+			return
+		self.redis_client.delete(self.completion_key)
+		self.push_sentinels(consumers)
+
+	def reset_completion(self) -> None:
+		"""
+		Reset the finished-producer counter before a new run starts.
+		"""
+		self.redis_client.delete(self.completion_key)
+
+	def _pop_raw(self, batch_size: int, timeout: float, linger: float) -> List[bytes]:
+		"""
+		Pop up to batch_size raw items, blocking until at least one item arrives.
 
-	def pop_batch(self, batch_size: int = 10) -> List[T] | None:
+		Returns immediately with a full batch if one is available. Otherwise blocks
+		for up to `timeout` seconds for the first item, then keeps collecting items
+		for at most `linger` seconds before returning a partial batch.
+		"""
+		raw_items: List[bytes] = self.redis_client.lpop(self.queue_name, batch_size) or []
+
+		if not raw_items:
+			popped = self.redis_client.blmpop(timeout, 1, self.queue_name, direction="LEFT", count=batch_size)
+			if popped is None:
+				return []
+			raw_items = popped[1]
+
+		deadline = time.monotonic() + linger
+		while len(raw_items) < batch_size and SENTINEL_BYTES not in raw_items:
+			remaining = deadline - time.monotonic()
+			# BLMPOP treats a zero timeout as "block forever"
+			if remaining < 0.001:
+				break
+			popped = self.redis_client.blmpop(remaining, 1, self.queue_name,
+			                                  direction="LEFT", count=batch_size - len(raw_items))
+			if popped is None:
+				break
+			raw_items.extend(popped[1])
+
+		return raw_items
+
+	def _unpack(self, raw_items: List[bytes]) -> List[T] | None:
+		"""
+		Deserialize raw items, consuming at most one sentinel.
+
+		Items before a sentinel are returned first and the sentinel is pushed back
+		to the head of the queue, so the next pop reports completion. Anything popped
+		after the sentinel is pushed back as well.
+		"""
+		if SENTINEL_BYTES in raw_items:
+			index = raw_items.index(SENTINEL_BYTES)
+			leftover = raw_items[index + 1:] if index == 0 else raw_items[index:]
+			if leftover:
+				self.redis_client.lpush(self.queue_name, *reversed(leftover))
+			if index == 0:
+				return None
+			raw_items = raw_items[:index]
+
+		return [self.deserializer(item_bytes) for item_bytes in raw_items]
+
+	def pop_batch(self,
+	              batch_size: int = 10,
+	              timeout: float | None = None,
+	              linger: float | None = None) -> List[T] | None:
 		"""
 		Pop a batch of items from the queue.
+
+		Blocks for up to `timeout` seconds while the queue is empty and returns as soon
+		as items arrive, or a partial batch once `linger` seconds passed since the first
+		item. Returns an empty list on timeout and None once the sentinel is reached.
 		"""
-		batch = []
+		timeout = redis_config.pop_timeout if timeout is None else timeout
+		linger = redis_config.pop_linger if linger is None else linger
 		for attempt in range(redis_config.max_retries):
 			try:
-				pipeline = self.redis_client.pipeline()
-				for _ in range(batch_size):
-					pipeline.lpop(self.queue_name)
-				raw_items = pipeline.execute()
-
-				for item_bytes in raw_items:
-					if item_bytes is None:
-						return batch
-					if item_bytes == SENTINEL_BYTES:
-						return None
-					if item_bytes:
-						batch.append(self.deserializer(item_bytes))
+				batch = self._unpack(self._pop_raw(batch_size, timeout, linger))
+				if batch:
+					self._popped_metric.inc(len(batch))
 				return batch
 
 			except ConnectionError as e:
 				logger.error(f"[QueueService] Connection lost during pop_batch from {self.queue_name}, retry: {e}")
+				metrics.STAGE_ERRORS.labels(stage="queue").inc()
 				self.redis_client = self.get_redis_client()
 
-		return batch
+		return []
+
+	def detach_pending(self) -> None:
+		"""
+		Nothing to hand over: popped items are already gone from the queue.
+		"""
+		return None
+
+	def ack(self, pending: None = None) -> None:
+		"""
+		No-op: LPOP is destructive, popped items are already gone from the queue.
+		"""
+		return None
 
 	def size(self) -> int:
 		"""
@@ -95,4 +188,10 @@ class RedisBufferQueue:
 		"""
 		Clear the queue.
 		"""
-		self.redis_client.delete(self.queue_name)
+		self.redis_client.delete(self.queue_name, self.completion_key)
+
+	def close(self) -> None:
+		"""
+		No-op: pushes never wait for room in Redis.
+		"""
+		return None
@@ -0,0 +1,249 @@
+import logging
+import os
+import socket
+import time
+
+from threading import Lock, get_ident, local
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
+
+from redis.exceptions import ResponseError
+
+from app.config.core import redis_config, redis_stream_config
+from app.services.queue_service import RedisBufferQueue, SENTINEL_BYTES
+
+T = TypeVar('T')
+logger = logging.getLogger(__name__)
+
+PAYLOAD_FIELD = b"d"
+
+
+class RedisStreamQueue(RedisBufferQueue):
+	"""
+	Redis Streams backed queue with the same push/pop interface as RedisBufferQueue.
+
+	Consumers of a queue share one consumer group, so any number of them can run
+	per stage. Popped entries stay pending until ack() is called; entries left
+	pending by a dead consumer are reclaimed with XAUTOCLAIM once they have been
+	idle for claim_idle_ms. Fully acknowledged entries are trimmed from the stream.
+	"""
+
+	def __init__(self,
+	             redis_url: str,
+	             queue_name: str,
+	             group_name: str,
+	             serializer: Callable[[T], str | bytes],
+	             deserializer: Callable[[bytes], T],
+	             claim_idle_ms: int = redis_stream_config.claim_idle_ms,
+	             trim_every: int = redis_stream_config.trim_every) -> None:
+		super().__init__(redis_url, queue_name, serializer, deserializer)
+		self.group_name = group_name
+		self.claim_idle_ms = claim_idle_ms
+		self.trim_every = trim_every
+		self._acked_since_trim = 0
+		self._trim_lock = Lock()
+		# Each consumer thread has its own consumer name, pending ids and reclaim cursor
+		self._local = local()
+		self._ensure_group()
+
+	def _ensure_group(self) -> None:
+		try:
+			self.redis_client.xgroup_create(self.queue_name, self.group_name, id="0", mkstream=True)
+			logger.info("[StreamQueueService] Created consumer group %s on %s", self.group_name, self.queue_name)
+		except ResponseError as e:
+			if "BUSYGROUP" not in str(e):
+				raise
+
+	def _consumer_state(self) -> Any:
+		state = self._local
+		if not hasattr(state, "consumer_name"):
+			state.consumer_name = f"{socket.gethostname()}-{os.getpid()}-{get_ident()}"
+			state.pending = []
+			state.sentinel_seen = False
+			state.claim_cursor = "0-0"
+			state.next_claim_at = 0.0
+		return state
+
+	def push_batch(self, items: List[T] | None) -> None:
+		"""
+		Append multiple entries to the stream in one pipeline round trip.
+		"""
+		if items is None:
+			self.push_sentinels(1)
+			return
+		if not items:
+			return
+		pipeline = self.redis_client.pipeline(transaction=False)
+		for item in items:
+			pipeline.xadd(self.queue_name, {PAYLOAD_FIELD: self.serializer(item)})
+		pipeline.execute()
+		self._pushed_metric.inc(len(items))
+
+	def push_sentinels(self, count: int) -> None:
+		"""
+		Append `count` sentinel entries, one for each consumer that must stop.
+		"""
+		pipeline = self.redis_client.pipeline(transaction=False)
+		for _ in range(count):
+			pipeline.xadd(self.queue_name, {PAYLOAD_FIELD: SENTINEL_BYTES})
+		pipeline.execute()
+
+	def _reclaim(self, state: Any, batch_size: int) -> List[Tuple[bytes, Dict[bytes, bytes]]]:
+		"""Claim entries left pending by consumers that have been idle for too long."""
+		now = time.monotonic()
+		if now < state.next_claim_at:
+			return []
+		state.next_claim_at = now + self.claim_idle_ms / 2000
+
+		response = self.redis_client.xautoclaim(self.queue_name, self.group_name, state.consumer_name,
+		                                        min_idle_time=self.claim_idle_ms,
+		                                        start_id=state.claim_cursor,
+		                                        count=batch_size)
+		state.claim_cursor = response[0]
+		entries = [entry for entry in response[1] if entry[1]]
+		if entries:
+			logger.warning("[StreamQueueService] Reclaimed %d idle entries from %s", len(entries), self.queue_name)
+		return entries
+
+	def _read(self, state: Any, count: int, block_ms: int) -> List[Tuple[bytes, Dict[bytes, bytes]]]:
+		response = self.redis_client.xreadgroup(self.group_name, state.consumer_name,
+		                                        {self.queue_name: ">"}, count=count, block=block_ms)
+		if not response:
+			return []
+		return response[0][1]
+
+	def _pop_entries(self, state: Any, batch_size: int, timeout: float, linger: float) -> List[Tuple[bytes, Dict[bytes, bytes]]]:
+		entries = self._reclaim(state, batch_size)
+
+		if not entries:
+			# XREADGROUP treats BLOCK 0 as "block forever"
+			entries = self._read(state, batch_size, block_ms=max(1, int(timeout * 1000)))
+			if not entries:
+				return []
+
+		deadline = time.monotonic() + linger
+		while len(entries) < batch_size:
+			remaining_ms = int((deadline - time.monotonic()) * 1000)
+			if remaining_ms < 1:
+				break
+			more = self._read(state, batch_size - len(entries), block_ms=remaining_ms)
+			if not more:
+				break
+			entries.extend(more)
+
+		return entries
+
+	def pop_batch(self,
+	              batch_size: int = 10,
+	              timeout: float | None = None,
+	              linger: float | None = None) -> List[T] | None:
+		"""
+		Read a batch of entries for this consumer.
+
+		The entries stay pending until ack() is called. Returns an empty list on
+		timeout and None once this consumer has received a sentinel. Extra sentinels
+		delivered to this consumer are re-added so other consumers receive theirs.
+		"""
+		timeout = redis_config.pop_timeout if timeout is None else timeout
+		linger = redis_config.pop_linger if linger is None else linger
+		state = self._consumer_state()
+
+		if state.sentinel_seen:
+			state.sentinel_seen = False
+			return None
+
+		entries = self._pop_entries(state, batch_size, timeout, linger)
+
+		sentinel_ids: List[bytes] = []
+		data_ids: List[bytes] = []
+		batch: List[T] = []
+		for entry_id, fields in entries:
+			payload = fields[PAYLOAD_FIELD]
+			if payload == SENTINEL_BYTES:
+				sentinel_ids.append(entry_id)
+				continue
+			data_ids.append(entry_id)
+			batch.append(self.deserializer(payload))
+
+		if sentinel_ids:
+			self.redis_client.xack(self.queue_name, self.group_name, *sentinel_ids)
+			if len(sentinel_ids) > 1:
+				self.push_sentinels(len(sentinel_ids) - 1)
+			if not batch:
+				return None
+			state.sentinel_seen = True
+
+		state.pending = data_ids
+		self._popped_metric.inc(len(batch))
+		return batch
+
+	def detach_pending(self) -> List[bytes]:
+		"""
+		Take the entry ids of the last batch popped by the calling consumer, so they
+		can be acknowledged later, from any thread, with ack(pending).
+		"""
+		state = self._consumer_state()
+		pending, state.pending = state.pending, []
+		return pending
+
+	def ack(self, pending: List[bytes] | None = None) -> None:
+		"""
+		Acknowledge the last batch popped by the calling consumer, or the entry ids
+		previously taken with detach_pending().
+		"""
+		if pending is None:
+			pending = self.detach_pending()
+		if not pending:
+			return
+		self.redis_client.xack(self.queue_name, self.group_name, *pending)
+
+		with self._trim_lock:
+			self._acked_since_trim += len(pending)
+			should_trim = self._acked_since_trim >= self.trim_every
+			if should_trim:
+				self._acked_since_trim = 0
+		if should_trim:
+			self.trim()
+
+	def trim(self) -> None:
+		"""
+		Trim entries every consumer group has already acknowledged.
+		"""
+		min_id: bytes | None = None
+		for group in self.redis_client.xinfo_groups(self.queue_name):
+			pending = self.redis_client.xpending(self.queue_name, group["name"])
+			candidate = pending["min"] if pending["pending"] else group["last-delivered-id"]
+			if isinstance(candidate, str):
+				candidate = candidate.encode("utf-8")
+			if min_id is None or self._parse_id(candidate) < self._parse_id(min_id):
+				min_id = candidate
+
+		if min_id is None or min_id == b"0-0":
+			return
+
+		trimmed = self.redis_client.xtrim(self.queue_name, minid=min_id, approximate=True)
+		logger.debug("[StreamQueueService] Trimmed %d entries from %s", trimmed, self.queue_name)
+
+	@staticmethod
+	def _parse_id(entry_id: bytes) -> Tuple[int, int]:
+		milliseconds, sequence = entry_id.split(b"-")
+		return int(milliseconds), int(sequence)
+
+	def size(self) -> int:
+		"""
+		Returns the number of entries not yet acknowledged by the consumer group.
+		"""
+		for group in self.redis_client.xinfo_groups(self.queue_name):
+			name = group["name"]
+			if (name.decode("utf-8") if isinstance(name, bytes) else name) != self.group_name:
+				continue
+			if group.get("lag") is None:
+				break
+			return group["lag"] + group["pending"]
+		return self.redis_client.xlen(self.queue_name)
+
+	def clear(self) -> None:
+		"""
+		Delete the stream and recreate an empty consumer group.
+		"""
+		self.redis_client.delete(self.queue_name, self.completion_key)
+		self._ensure_group()
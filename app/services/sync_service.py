@@ -0,0 +1,132 @@
+import logging
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+from app.services.dedup_service import DedupService
+from app.services.document_service import DocumentService
+from app.services.manifest_service import ManifestService
+from app.services.vectordb_service import VectorDBService
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class SyncService:
+	"""
+  Reconciles the vector collection with the files under the documents directory.
+
+  A sync pass compares the files on disk with the sources known to the collection
+  (the 'source' metadata of the stored chunks) and to the manifest:
+    - a source that disappeared is a rename when a file that is not indexed yet has
+      the same size and sha256 as its manifest entry. Its chunks are moved to the
+      new path with their vectors, so the file is not embedded again
+    - any other source that disappeared was deleted, its chunks are bulk-deleted
+
+  The manifest and the dedup index follow the same renames and deletions. Only
+  sources below the documents directory are considered, so chunks of other
+  corpora sharing the collection are left alone.
+  """
+
+	def __init__(self,
+	             vectordb_service: VectorDBService,
+	             document_service: DocumentService,
+	             manifest: ManifestService | None = None,
+	             dedup: DedupService | None = None) -> None:
+		self.vectordb_service = vectordb_service
+		self.document_service = document_service
+		self.manifest = manifest
+		self.dedup = dedup
+		self._removed_metric = metrics.SYNC_SOURCES.labels(outcome="removed")
+		self._renamed_metric = metrics.SYNC_SOURCES.labels(outcome="renamed")
+		logger.info("[SyncService] Initialized (rename detection %s)", "on" if manifest is not None else "off")
+
+	def _is_managed(self, source: str) -> bool:
+		return Path(source).is_relative_to(self.document_service.documents_path)
+
+	def _match_renames(self, gone: Iterable[str], unindexed: Iterable[str]) -> List[Tuple[str, str]]:
+		"""
+    Pair disappeared sources with new files of identical content.
+
+    Only manifest entries ingested with the current chunking and embedding model
+    are candidates, anything else has to be embedded again anyway. New files are
+    only hashed when their size matches a candidate.
+
+    Returns:
+        (old source, new source) pairs.
+    """
+		if self.manifest is None:
+			return []
+
+		candidates: Dict[Tuple[int, str], List[str]] = {}
+		for source in sorted(gone):
+			entry = self.manifest.get_entry(source)
+			if entry is None or "sha256" not in entry \
+					or entry.get("fingerprint") != self.manifest.fingerprint \
+					or entry.get("embedding_model") != self.manifest.embedding_model_name:
+				continue
+			candidates.setdefault((entry["size"], entry["sha256"]), []).append(source)
+
+		sizes = {size for size, _ in candidates}
+		renames: List[Tuple[str, str]] = []
+		for source in sorted(unindexed):
+			file_path = Path(source)
+			size = file_path.stat().st_size
+			if size not in sizes:
+				continue
+			matches = candidates.get((size, self.manifest.hash_file(file_path)))
+			if matches:
+				renames.append((matches.pop(0), source))
+		return renames
+
+	def sync(self) -> Dict[str, int]:
+		"""
+    Run one sync pass.
+
+    Returns:
+        Counts of renamed and removed sources and of the removed chunks.
+    """
+		current: Set[str] = {str(file_path) for file_path in self.document_service.scan_files()}
+		indexed: Dict[str, int] = self.vectordb_service.get_sources()
+
+		known = {source for source in indexed if self._is_managed(source)}
+		if self.manifest is not None:
+			known.update(source for source in self.manifest.get_sources() if self._is_managed(source))
+
+		gone = known - current
+		summary = {"renamed": 0, "removed": 0, "chunks_removed": 0}
+		if not gone:
+			logger.info("[SyncService] Collection is in sync with %d files", len(current))
+			return summary
+
+		manifest_sources = set(self.manifest.get_sources()) if self.manifest is not None else set()
+		unindexed = [source for source in current if source not in indexed and source not in manifest_sources]
+
+		for old_source, new_source in self._match_renames(gone, unindexed):
+			logger.info("[SyncService] %s was renamed to %s", old_source, new_source)
+			self.vectordb_service.rename_source(old_source, new_source)
+			if self.dedup is not None:
+				self.dedup.rename_source(old_source, new_source)
+			self.manifest.rename(old_source, Path(new_source))
+			gone.discard(old_source)
+			summary["renamed"] += 1
+
+		if gone:
+			summary["chunks_removed"] = self.vectordb_service.delete_sources(
+				[source for source in gone if source in indexed]
+			)
+			if self.dedup is not None:
+				self.dedup.remove_sources(list(gone))
+			if self.manifest is not None:
+				for source in gone:
+					self.manifest.remove(source)
+			summary["removed"] = len(gone)
+
+		if self.manifest is not None:
+			self.manifest.save()
+
+		self._renamed_metric.inc(summary["renamed"])
+		self._removed_metric.inc(summary["removed"])
+		logger.info("[SyncService] Renamed %d and removed %d sources (%d chunks deleted)",
+		            summary["renamed"], summary["removed"], summary["chunks_removed"])
+		return summary
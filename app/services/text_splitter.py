@@ -0,0 +1,218 @@
+import logging
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Generator, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEPARATORS: Tuple[str, ...] = ("\n\n", "\n", " ", "")
+
+
+class _Occurrences:
+	"""Positions of one single-character separator in a whole text, and the long gaps between them."""
+
+	def __init__(self, positions: np.ndarray, chunk_size: int) -> None:
+		# Compact int64 arrays (8 bytes per occurrence) that bisect can search directly
+		self.positions = array("q", positions.astype(np.int64).tobytes())
+		# Occurrences k whose gap to occurrence k + 1 is a piece of chunk_size or more
+		self.long_gaps = array("q", np.flatnonzero(np.diff(positions) >= chunk_size).astype(np.int64).tobytes())
+
+
+class _TextIndex:
+	"""
+  Occurrences of the single-character separators of one text, each found in one pass.
+
+  Single characters cannot straddle a range boundary or overlap, so the occurrences
+  within any range are a slice of these. The text is scanned as an array of code
+  points (one byte per character for ASCII text), so offsets are character offsets.
+  The empty separator stands for every position.
+  """
+
+	def __init__(self, text: str, chunk_size: int) -> None:
+		self.text = text
+		self.chunk_size = chunk_size
+		self._codes: np.ndarray | None = None
+		self._occurrences: Dict[str, _Occurrences] = {}
+
+	def occurrences(self, separator: str) -> _Occurrences:
+		if separator not in self._occurrences:
+			if separator:
+				if self._codes is None:
+					self._codes = np.frombuffer(self.text.encode("ascii"), dtype=np.uint8) if self.text.isascii() \
+						else np.frombuffer(self.text.encode("utf-32-le"), dtype=np.uint32)
+				positions = np.flatnonzero(self._codes == ord(separator))
+			else:
+				positions = np.arange(len(self.text))
+			self._occurrences[separator] = _Occurrences(positions, self.chunk_size)
+		return self._occurrences[separator]
+
+
+class OffsetTextSplitter:
+	"""
+  Recursive character text splitter that works on character offsets.
+
+  Produces the same chunks as LangChain's RecursiveCharacterTextSplitter with its
+  defaults (separators kept at the start of the following piece, len() as the
+  length function, whitespace stripped). With those settings every chunk is a
+  contiguous slice of the input, so the splitter only tracks offsets: each
+  single-character separator is located in one vectorized pass over the text,
+  pieces are merged by binary search over their boundaries, and no chunk strings
+  or Documents are built. Callers slice the text only for the chunks they keep.
+
+  Unlike the LangChain splitter, whose start_index is recovered with text.find()
+  and may point at an earlier identical passage, the offsets are exact.
+  """
+
+	def __init__(self,
+	             chunk_size: int,
+	             chunk_overlap: int,
+	             separators: Sequence[str] = DEFAULT_SEPARATORS) -> None:
+		if chunk_size <= 0:
+			raise ValueError(f"chunk_size must be > 0, got {chunk_size}")
+		if chunk_overlap < 0:
+			raise ValueError(f"chunk_overlap must be >= 0, got {chunk_overlap}")
+		if chunk_overlap > chunk_size:
+			raise ValueError(f"chunk_overlap ({chunk_overlap}) must not be larger than chunk_size ({chunk_size})")
+		self.chunk_size = chunk_size
+		self.chunk_overlap = chunk_overlap
+		self.separators = tuple(separators)
+
+	@staticmethod
+	def _strip(text: str, start: int, end: int) -> Tuple[int, int]:
+		"""Offsets of text[start:end].strip()."""
+		while start < end and text[start].isspace():
+			start += 1
+		while end > start and text[end - 1].isspace():
+			end -= 1
+		return start, end
+
+	@staticmethod
+	def _boundaries(text: str, start: int, end: int, separator: str) -> np.ndarray:
+		"""
+    Cut text[start:end] before every occurrence of a multi-character separator.
+
+    Returns:
+        Sorted piece boundaries from start to end, piece k is bounds[k]:bounds[k + 1].
+    """
+		# str.split scans the range in C, the part lengths give the separator positions
+		parts = text[start:end].split(separator)
+		lengths = np.fromiter(map(len, parts), dtype=np.int64, count=len(parts))
+		cuts = start + np.cumsum(lengths[:-1] + len(separator)) - len(separator)
+		# A separator at the very start would leave an empty first piece
+		if len(cuts) and cuts[0] == start:
+			cuts = cuts[1:]
+		return np.concatenate(([start], cuts, [end]))
+
+	def _merge(self, text: str, bounds: List[int], first: int, last: int) -> Generator[Tuple[int, int], None, None]:
+		"""
+    Merge pieces first..last-1 into chunks of at most chunk_size sharing up to chunk_overlap.
+
+    Pieces are contiguous, so the length of a run of pieces is the difference of its
+    boundaries and every chunk is found with a few binary searches instead of
+    adding and dropping one piece at a time.
+    """
+		current = first
+		while True:
+			# Pieces current..fits-1 make up the chunk, piece `fits` would overflow it
+			fits = bisect_right(bounds, bounds[current] + self.chunk_size, current, last + 1) - 1
+			if fits >= last:
+				start, end = self._strip(text, bounds[current], bounds[last])
+				if end > start:
+					yield start, end
+				return
+
+			start, end = self._strip(text, bounds[current], bounds[fits])
+			if end > start:
+				yield start, end
+			# The next chunk starts at the first piece after which at most chunk_overlap
+			# remains and the overflowing piece fits, dropping everything if nothing does
+			current = min(fits, max(
+				bisect_left(bounds, bounds[fits] - self.chunk_overlap, current, fits),
+				bisect_left(bounds, bounds[fits + 1] - self.chunk_size, current, fits),
+			))
+
+	def _indexed_boundaries(self, start: int, end: int, occurrences: _Occurrences) -> Tuple[List[int], List[int]]:
+		"""Piece boundaries and oversized pieces of text[start:end] from a whole-text occurrence index."""
+		positions = occurrences.positions
+		low = bisect_left(positions, start)
+		high = bisect_left(positions, end)
+		# A separator at the very start would leave an empty first piece
+		if low < high and positions[low] == start:
+			low += 1
+		bounds = [start, *positions[low:high], end]
+
+		oversized = [] if bounds[1] - start < self.chunk_size else [0]
+		# Interior piece k spans occurrences low + k - 1 and low + k, long gaps are indexed once per text
+		gaps = occurrences.long_gaps
+		oversized.extend(gap - low + 1 for gap in gaps[bisect_left(gaps, low):bisect_left(gaps, high - 1)])
+		if len(bounds) > 2 and end - bounds[-2] >= self.chunk_size:
+			oversized.append(len(bounds) - 2)
+		return bounds, oversized
+
+	def _split(self,
+	           text: str,
+	           start: int,
+	           end: int,
+	           level: int,
+	           index: _TextIndex) -> Generator[Tuple[int, int], None, None]:
+		# Use the first separator present in this range, the empty separator always applies
+		next_level = len(self.separators)
+		for candidate in range(level, len(self.separators)):
+			separator = self.separators[candidate]
+			if not separator:
+				level = candidate
+				break
+			if len(separator) == 1:
+				positions = index.occurrences(separator).positions
+				found = bisect_left(positions, start) < bisect_left(positions, end)
+			else:
+				found = text.find(separator, start, end) != -1
+			if found:
+				level, next_level = candidate, candidate + 1
+				break
+		else:
+			level = len(self.separators) - 1
+
+		separator = self.separators[level]
+		if len(separator) <= 1:
+			bounds, oversized = self._indexed_boundaries(start, end, index.occurrences(separator))
+		else:
+			boundaries = self._boundaries(text, start, end, separator)
+			# Pieces of chunk_size or more are split further (or kept whole), all others are merged
+			oversized = np.flatnonzero(np.diff(boundaries) >= self.chunk_size).tolist()
+			bounds = boundaries.tolist()
+
+		first = 0
+		for piece in oversized:
+			if piece > first:
+				yield from self._merge(text, bounds, first, piece)
+			if next_level >= len(self.separators):
+				# Nothing finer to split on, the piece is kept whole (and unstripped)
+				yield bounds[piece], bounds[piece + 1]
+			else:
+				yield from self._split(text, bounds[piece], bounds[piece + 1], next_level, index)
+			first = piece + 1
+
+		if first < len(bounds) - 1:
+			yield from self._merge(text, bounds, first, len(bounds) - 1)
+
+	def split_offsets(self, text: str) -> Generator[Tuple[int, int], None, None]:
+		"""
+    Lazily split text into chunks.
+
+    Args:
+        text: Text to split.
+
+    Returns:
+        A generator of (start, end) offsets, text[start:end] is the chunk.
+    """
+		if not text:
+			return iter(())
+		return self._split(text, 0, len(text), 0, _TextIndex(text, self.chunk_size))
+
+	def split_text(self, text: str) -> List[str]:
+		"""Split text into chunk strings, same as RecursiveCharacterTextSplitter.split_text()."""
+		return [text[start:end] for start, end in self.split_offsets(text)]
@@ -0,0 +1,163 @@
+import fcntl
+import logging
+import os
+
+import numpy as np
+
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Iterator, List
+
+from app.config.core import vector_compression_config
+
+logger = logging.getLogger(__name__)
+
+PROJECTION_VERSION = 1
+
+
+class VectorCompressionService:
+	"""
+  PCA projection applied to embeddings before they are stored.
+
+  The projection (mean and principal components) is fitted once on a sample of
+  the corpus' own embeddings and persisted, so every later write and every query
+  goes through the same transform: a query embedding must be passed through
+  transform_query() before it is searched in a compressed collection. Projected
+  vectors are L2-normalized again, which keeps cosine and L2 rankings comparable
+  to those of the original normalized embeddings.
+
+  Reducing the dimension shrinks the stored vectors and the HNSW index by the
+  same ratio. A collection only holds vectors of one dimension, so compression
+  is enabled on a new collection, never on one filled with full vectors.
+
+  VectorDB workers of several processes may fit at the same time: fitting and
+  saving hold a lock file next to the projection, and a process that finds a
+  projection saved by another one loads it instead of fitting its own.
+  """
+
+	def __init__(self,
+	             projection_path: Path = vector_compression_config.projection_path,
+	             dimension: int = vector_compression_config.pca_dimension,
+	             fit_sample_size: int = vector_compression_config.fit_sample_size) -> None:
+		self.projection_path = projection_path
+		self.dimension = dimension
+		self.fit_sample_size = max(fit_sample_size, dimension)
+		self.mean: np.ndarray | None = None
+		self.components: np.ndarray | None = None
+		self.explained_variance: float | None = None
+		# Several VectorDB workers share the service, only the first one fits
+		self._lock = Lock()
+
+		if projection_path.exists():
+			self._load()
+		logger.info("[VectorCompressionService] Initialized (dimension=%d, fitted=%s)", dimension, self.is_fitted)
+
+	@property
+	def is_fitted(self) -> bool:
+		return self.components is not None
+
+	@property
+	def source_dimension(self) -> int | None:
+		return None if self.mean is None else self.mean.size
+
+	def _load(self) -> None:
+		with np.load(self.projection_path) as projection:
+			version = int(projection["version"])
+			if version != PROJECTION_VERSION:
+				raise ValueError(f"Unsupported projection version {version} in {self.projection_path}")
+			components = projection["components"]
+			if components.shape[0] != self.dimension:
+				raise ValueError(f"Projection {self.projection_path} reduces to {components.shape[0]} dimensions, "
+				                 f"{self.dimension} are configured")
+			self.mean = projection["mean"]
+			self.components = components
+			self.explained_variance = float(projection["explained_variance"])
+		logger.info("[VectorCompressionService] Loaded projection %d -> %d dimensions from %s",
+		            self.source_dimension, self.dimension, self.projection_path)
+
+	def save(self) -> None:
+		"""Atomically persist the fitted projection."""
+		self.projection_path.parent.mkdir(parents=True, exist_ok=True)
+		tmp_path = self.projection_path.with_suffix(".tmp.npz")
+		np.savez(tmp_path, version=PROJECTION_VERSION, mean=self.mean, components=self.components,
+		         explained_variance=self.explained_variance)
+		os.replace(tmp_path, self.projection_path)
+		logger.info("[VectorCompressionService] Saved projection to %s", self.projection_path)
+
+	@contextmanager
+	def _file_lock(self) -> Iterator[None]:
+		"""Hold an exclusive lock shared with every process using projection_path."""
+		self.projection_path.parent.mkdir(parents=True, exist_ok=True)
+		with open(self.projection_path.with_suffix(".lock"), "a") as lock_file:
+			fcntl.flock(lock_file, fcntl.LOCK_EX)
+			try:
+				yield
+			finally:
+				fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+	def check_source_dimension(self, source_dimension: int) -> None:
+		"""Raise ValueError if embeddings of source_dimension cannot go through this projection."""
+		if self.is_fitted and source_dimension != self.source_dimension:
+			raise ValueError(f"The projection {self.projection_path} was fitted on {self.source_dimension} dimension "
+			                 f"embeddings, got {source_dimension}")
+		if source_dimension < self.dimension:
+			raise ValueError(f"A {self.dimension} dimension projection cannot reduce {source_dimension} dimension embeddings")
+
+	def fit(self, vectors: List[Any] | np.ndarray, persist: bool = True) -> None:
+		"""
+    Fit the projection on a sample of embeddings, unless it is fitted already.
+
+    A projection saved meanwhile by another process is loaded instead, so every
+    process writes and queries through the same one.
+
+    Args:
+        vectors: Sample of at least `dimension` embeddings.
+        persist: Save the fitted projection to projection_path.
+    """
+		with self._lock, self._file_lock():
+			if self.is_fitted:
+				return
+			if self.projection_path.exists():
+				self._load()
+				return
+			sample = np.asarray(vectors, dtype=np.float64)
+			if sample.ndim != 2:
+				raise ValueError(f"Fitting a projection needs a (n, dimension) sample, got {sample.shape}")
+			self.check_source_dimension(sample.shape[1])
+			if sample.shape[0] < self.dimension:
+				raise ValueError(f"Fitting a {self.dimension} dimension projection needs at least {self.dimension} "
+				                 f"embeddings, got {sample.shape[0]}")
+
+			mean = sample.mean(axis=0)
+			_, singular_values, right_vectors = np.linalg.svd(sample - mean, full_matrices=False)
+			variance = singular_values ** 2
+			self.mean = mean.astype(np.float32)
+			self.components = right_vectors[:self.dimension].astype(np.float32)
+			self.explained_variance = float(variance[:self.dimension].sum() / variance.sum()) if variance.sum() else 1.0
+			logger.info("[VectorCompressionService] Fitted projection %d -> %d dimensions on %d vectors "
+			            "(%.1f%% of the variance kept)", sample.shape[1], self.dimension, sample.shape[0],
+			            self.explained_variance * 100)
+			if persist:
+				self.save()
+
+	def transform(self, vectors: List[Any] | np.ndarray) -> np.ndarray:
+		"""
+    Project embeddings onto the fitted components.
+
+    Args:
+        vectors: (n, source dimension) embeddings.
+
+    Returns:
+        (n, dimension) float32 L2-normalized vectors.
+    """
+		if not self.is_fitted:
+			raise RuntimeError("The projection is not fitted")
+		projected = (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T
+		norms = np.linalg.norm(projected, axis=-1, keepdims=True)
+		norms[norms == 0] = 1.0
+		return projected / norms
+
+	def transform_query(self, vector: List[float] | np.ndarray) -> List[float]:
+		"""Project one query embedding, the result can be searched in the compressed collection."""
+		return self.transform(np.asarray(vector, dtype=np.float32)[np.newaxis])[0].tolist()
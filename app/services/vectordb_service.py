@@ -1,15 +1,19 @@
 import logging
-import chromadb
-import uuid
+import time
 
 from langchain_core.documents import Document
 from pathlib import Path
-from chromadb.api import ClientAPI
-from chromadb.api.models.Collection import Collection
-from typing import List, Dict, Any
+from threading import Lock
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Set, Tuple
 
-from app.config.core import VectorDBMode, vectordb_service_config
-from app.utils import service_utils
+from app.config.core import VectorDBMode, document_service_config, vectordb_service_config
+from app.services.dedup_service import CANONICAL_SOURCE_KEY, CANONICAL_TEXT_KEY, DROPPED_CHUNKS_KEY, DUPLICATE_OF_KEY
+from app.utils import metrics, service_utils
+
+# chromadb takes most of a second to import, it is only loaded once a client is created
+if TYPE_CHECKING:
+	from chromadb.api import ClientAPI
+	from chromadb.api.models.Collection import Collection
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +32,8 @@ class VectorDBService:
 							 host: str = 'localhost',
 							 port: int = 8000,
 							 ssl: bool = False,
-							 collection_name: str = vectordb_service_config.collection_name):
+							 collection_name: str = vectordb_service_config.collection_name,
+							 documents_path: Path = document_service_config.documents_path):
 
 		logger.info("[VectorDBService] Initializing (mode=%s, collection=%s)",mode, collection_name)
 		self.mode: str = mode
@@ -37,24 +42,31 @@ class VectorDBService:
 		self.host: str = host
 		self.port: int = port
 		self.ssl: bool = ssl
-		self.client: ClientAPI | None = None
+		self.client: "ClientAPI | None" = None
 
 		self.collection_name: str = collection_name
-		self.collection: Collection | None = None
+		self.collection: "Collection | None" = None
+		# Root of the source files, their first directory below it is the chunk category
+		self.documents_path: Path = documents_path
+		# Several VectorDB workers may share this service and connect concurrently
+		self._connection_lock = Lock()
 		logger.info("[VectorDBService] Initialized (lazy)")
 
 	def _initialize_db_connection(self):
-		logger.info("[VectorDBService] Initializing db client and collection")
-		if self.client is not None:
-			return
+		with self._connection_lock:
+			if self.client is not None:
+				return
 
-		self.client = self._create_client()
-		self.collection = self._create_collection(self.collection_name)
+			logger.info("[VectorDBService] Initializing db client and collection")
+			client = self._create_client()
+			self.collection = self._create_collection(client, self.collection_name)
+			self.client = client
 
-	def _create_client(self) -> ClientAPI:
+	def _create_client(self) -> "ClientAPI":
 		"""
     Create either a local ChromaDB client or a remote HTTP client.
     """
+		import chromadb
 
 		if self.mode == VectorDBMode.LOCAL:
 			logger.info("[VectorDBService] Using local persistent ChromaDB at %s", self.persist_directory)
@@ -78,36 +90,203 @@ class VectorDBService:
 			logger.exception("[VectorDBService] Invalid vectordb mode: %s", self.mode)
 			raise ValueError('invalid mode')
 
-	def _create_collection(self, collection_name: str) -> Collection:
+	def _create_collection(self, client: "ClientAPI", collection_name: str) -> "Collection":
 		"""
 		Create collection if missing; otherwise returns existing one.
 		"""
 		try:
 			logger.info("[VectorDBService] Using collection %s", collection_name)
-			return self.client.get_or_create_collection(collection_name)
+			return client.get_or_create_collection(collection_name)
 		except Exception:
 			logger.exception("[VectorDBService] Failed to create or access collection")
 			raise
 
+	def check_ready(self) -> None:
+		"""Connect to the database and open the collection, raising if it is not reachable."""
+		if self.client is None:
+			self._initialize_db_connection()
+		self.client.heartbeat()
+
+	def max_batch_size(self) -> int:
+		"""Largest number of records the client accepts in one write."""
+		if self.client is None:
+			self._initialize_db_connection()
+		return self.client.get_max_batch_size()
+
+	def get_sources(self) -> Dict[str, int]:
+		"""
+    Return the number of stored chunks per source.
+
+    The collection is read page by page, metadatas only, so memory stays bounded
+    by the page size rather than by the vectors.
+    """
+		page_size = self.max_batch_size()
+		sources: Dict[str, int] = {}
+		offset = 0
+		while True:
+			page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+			for metadata in page["metadatas"]:
+				source = (metadata or {}).get('source')
+				if source is not None:
+					sources[source] = sources.get(source, 0) + 1
+			if len(page["ids"]) < page_size:
+				return sources
+			offset += page_size
+
+	def delete_sources(self, sources: Iterable[str]) -> int:
+		"""
+    Bulk-delete every chunk of the given sources.
+
+    Returns:
+        The number of deleted chunks.
+    """
+		page_size = self.max_batch_size()
+		sources = list(sources)
+		deleted = 0
+		# Keep $in filters small, one page of sources at a time
+		for start in range(0, len(sources), page_size):
+			part = sources[start:start + page_size]
+			ids = self.collection.get(where={"source": {"$in": part}}, include=[])["ids"]
+			for id_start in range(0, len(ids), page_size):
+				self.collection.delete(ids=ids[id_start:id_start + page_size])
+			deleted += len(ids)
+		logger.info("[VectorDBService] Deleted %d chunks of %d sources from collection %s",
+		            deleted, len(sources), self.collection_name)
+		return deleted
+
+	def rename_source(self, old_source: str, new_source: str) -> int:
+		"""
+    Move the chunks of a renamed file to its new path without re-embedding them.
+
+    The stored vectors and texts are re-keyed under the ids of the new path, with
+    the source/category metadata rewritten, and duplicates linked to them are
+    pointed at the new ids. The old ids are deleted only once the new ones exist.
+
+    Returns:
+        The number of moved chunks.
+    """
+		page_size = self.max_batch_size()
+		category = service_utils.get_category_from_path(Path(new_source), self.documents_path)
+		stored = self.collection.get(where={"source": old_source}, include=["embeddings", "documents", "metadatas"])
+
+		renamed_ids: Dict[str, str] = {}
+		metadatas: List[Dict[str, Any]] = []
+		for old_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+			renamed_ids[old_id] = service_utils.get_chunk_id(new_source, metadata.get('chunk_index', 0), text)
+			metadata = {**metadata, 'source': new_source}
+			metadata.pop('category', None)
+			if category:
+				metadata['category'] = category
+			metadatas.append(metadata)
+
+		new_ids = list(renamed_ids.values())
+		for start in range(0, len(new_ids), page_size):
+			end = start + page_size
+			self.collection.upsert(
+				ids=new_ids[start:end],
+				embeddings=stored["embeddings"][start:end],
+				documents=stored["documents"][start:end],
+				metadatas=metadatas[start:end],
+			)
+
+		linked = self.collection.get(where={CANONICAL_SOURCE_KEY: old_source}, include=["metadatas"])
+		for start in range(0, len(linked["ids"]), page_size):
+			part = linked["metadatas"][start:start + page_size]
+			self.collection.update(
+				ids=linked["ids"][start:start + page_size],
+				metadatas=[{
+					CANONICAL_SOURCE_KEY: new_source,
+					DUPLICATE_OF_KEY: renamed_ids.get(metadata.get(DUPLICATE_OF_KEY), metadata.get(DUPLICATE_OF_KEY)),
+				} for metadata in part],
+			)
+
+		old_ids = [old_id for old_id, new_id in renamed_ids.items() if old_id != new_id]
+		for start in range(0, len(old_ids), page_size):
+			self.collection.delete(ids=old_ids[start:start + page_size])
+		logger.info("[VectorDBService] Moved %d chunks from %s to %s", len(new_ids), old_source, new_source)
+		return len(new_ids)
+
 	def _get_metadatas(self, documents: List[Document]) -> List[Dict[str, Any]]:
 		logger.info("[VectorDBService] Creating custom metadatas")
 		metadatas = []
 		for doc in documents:
 			metadata: Dict[str, Any] = doc.metadata
+			# Only needed to embed linked duplicates, the canonical chunk stores this text already
+			metadata.pop(CANONICAL_TEXT_KEY, None)
 			source: str = metadata['source']
 			source_file_path: Path = Path(source)
-			category = service_utils.get_category_from_path(source_file_path)
+			category = service_utils.get_category_from_path(source_file_path, self.documents_path)
 			if category:
 				metadata['category'] = category
-				metadatas.append(metadata)
+			# Keep metadatas aligned with ids/embeddings even for uncategorized files
+			metadatas.append(metadata)
 		return metadatas
 
+	def _get_ids(self, documents: List[Document]) -> List[str]:
+		"""Build content-addressed ids from source path, chunk position and content hash."""
+		return [
+			service_utils.get_chunk_id(doc.metadata['source'], doc.metadata.get('chunk_index', 0), doc.page_content)
+			for doc in documents
+		]
+
+	def _diff_chunks(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> Tuple[Set[str], Set[str]]:
+		"""
+    Compare incoming chunks against what is already stored for their sources.
+
+    Args:
+        ids: Content-addressed ids of the incoming chunks
+        metadatas: Metadatas of the incoming chunks (aligned with ids)
+
+    Returns:
+        (unchanged ids already stored, stale ids to delete). A stored chunk is stale when
+        an incoming chunk takes its position with different content, when its position
+        was dropped as a near-duplicate, when it lies past the last chunk of a
+        re-ingested file, or when it predates chunk positions.
+    """
+		incoming_positions: Dict[str, Set[int]] = {}
+		last_positions: Dict[str, int] = {}
+		for metadata in metadatas:
+			source = metadata['source']
+			chunk_index = metadata.get('chunk_index', 0)
+			incoming_positions.setdefault(source, set()).add(chunk_index)
+			if metadata.get('last_chunk'):
+				last_positions[source] = chunk_index
+			# Only tells which positions to delete, it is not stored with the chunk
+			dropped = metadata.pop(DROPPED_CHUNKS_KEY, None)
+			if dropped:
+				incoming_positions[source].update(int(index) for index in dropped.split(","))
+
+		existing = self.collection.get(
+			where={"source": {"$in": list(incoming_positions)}},
+			include=["metadatas"],
+		)
+
+		incoming_ids = set(ids)
+		unchanged: Set[str] = set()
+		stale: Set[str] = set()
+		for existing_id, metadata in zip(existing["ids"], existing["metadatas"]):
+			if existing_id in incoming_ids:
+				unchanged.add(existing_id)
+				continue
+
+			source = metadata.get('source')
+			chunk_index = metadata.get('chunk_index')
+			if chunk_index is None \
+					or chunk_index in incoming_positions[source] \
+					or chunk_index > last_positions.get(source, chunk_index):
+				stale.add(existing_id)
+
+		return unchanged, stale
+
 	def save_embeddings(self,
 											embeddings: List[List[float]],
 											documents: List[Document]) -> None:
 		"""
     Save embeddings + metadata into ChromaDB.
 
+    Chunks are content-addressed, so only new chunks are upserted and chunks
+    left over from a previous version of the same file are deleted in bulk.
+
     Args:
         embeddings: List of float vectors
         documents: Corresponding LangChain Document objects
@@ -119,17 +298,37 @@ class VectorDBService:
 			logger.warning("[VectorDBService] save_embeddings() called with empty inputs")
 			return
 
-		ids = [str(uuid.uuid4()) for _ in documents]
+		ids = self._get_ids(documents)
 		metadatas = self._get_metadatas(documents)
-		documents = [doc.page_content for doc in documents]
 
+		started = time.perf_counter()
 		try:
-			self.collection.add(
-				ids=ids,
-				embeddings=embeddings,
-				documents=documents,
-				metadatas=metadatas,
-			)
-			logger.info("[VectorDBService] Saved %d embeddings to collection %s",len(embeddings), self.collection_name)
+			unchanged, stale = self._diff_chunks(ids, metadatas)
+
+			new_positions: List[int] = []
+			seen: Set[str] = set(unchanged)
+			for position, chunk_id in enumerate(ids):
+				if chunk_id not in seen:
+					seen.add(chunk_id)
+					new_positions.append(position)
+
+			if stale:
+				self.collection.delete(ids=list(stale))
+
+			if new_positions:
+				self.collection.upsert(
+					ids=[ids[i] for i in new_positions],
+					embeddings=[embeddings[i] for i in new_positions],
+					documents=[documents[i].page_content for i in new_positions],
+					metadatas=[metadatas[i] for i in new_positions],
+				)
+			metrics.VECTORDB_WRITE_SECONDS.observe(time.perf_counter() - started)
+			metrics.VECTORDB_CHUNKS.labels(outcome="new").inc(len(new_positions))
+			metrics.VECTORDB_CHUNKS.labels(outcome="unchanged").inc(len(unchanged))
+			metrics.VECTORDB_CHUNKS.labels(outcome="stale").inc(len(stale))
+			logger.info("[VectorDBService] Saved %d new, %d unchanged, %d stale chunks in collection %s",
+			            len(new_positions), len(unchanged), len(stale), self.collection_name)
 		except Exception as ex:
-			logger.exception("[VectorDBService] Failed to save embeddings to ChromaDB", ex)
+			logger.exception("[VectorDBService] Failed to save embeddings to ChromaDB: %s", ex)
+			metrics.STAGE_ERRORS.labels(stage="vectordb_service").inc()
+			raise
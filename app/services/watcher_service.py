@@ -0,0 +1,250 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+from pathlib import Path
+from threading import Condition, Thread
+from typing import Dict, Iterable, List, Tuple
+
+from app.config.core import document_service_config, watcher_config
+
+logger = logging.getLogger(__name__)
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+SELECT_TIMEOUT = 0.5
+
+
+def _load_inotify() -> ctypes.CDLL | None:
+	"""Return libc if it exposes the inotify API, None otherwise."""
+	if not sys.platform.startswith("linux"):
+		return None
+	try:
+		libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+	except OSError:
+		return None
+	if not hasattr(libc, "inotify_init1") or not hasattr(libc, "inotify_add_watch"):
+		return None
+	return libc
+
+
+class WatcherService:
+	"""
+  Watches the documents directory and reports files that were created,
+  modified, moved or deleted.
+
+  Uses inotify on Linux and falls back to periodic stat passes elsewhere.
+  Events are coalesced per path and a path is only reported once it has been
+  quiet for `debounce` seconds, so a burst of writes to one file yields a
+  single change.
+  """
+
+	def __init__(self,
+	             root: Path = document_service_config.documents_path,
+	             allowed_extensions: Iterable[str] = document_service_config.allowed_extensions,
+	             debounce: float = watcher_config.debounce,
+	             poll_interval: float = watcher_config.poll_interval,
+	             use_inotify: bool = watcher_config.use_inotify) -> None:
+		self.root = root
+		self.allowed_extensions = {extension.lower() for extension in allowed_extensions}
+		self.debounce = debounce
+		self.poll_interval = poll_interval
+		self.use_inotify = use_inotify
+		self.backend: str | None = None
+
+		self._pending: Dict[Path, float] = {}
+		self._condition = Condition()
+		self._running = False
+		self._thread: Thread | None = None
+
+		self._libc: ctypes.CDLL | None = None
+		self._fd: int = -1
+		self._watches: Dict[int, Path] = {}
+		self._snapshot: Dict[Path, Tuple[int, int]] = {}
+
+	def start(self) -> None:
+		"""Install the watches and start the watcher thread."""
+		self._running = True
+		if self.use_inotify and self._start_inotify():
+			self.backend = "inotify"
+			target = self._run_inotify
+		else:
+			self.backend = "polling"
+			self._snapshot = self._take_snapshot()
+			target = self._run_polling
+
+		self._thread = Thread(target=target, daemon=True, name="WatcherServiceThread")
+		self._thread.start()
+		logger.info("[WatcherService] Watching %s using %s (debounce=%.2fs)", self.root, self.backend, self.debounce)
+
+	def stop(self) -> None:
+		"""Stop the watcher thread and release the inotify descriptor."""
+		self._running = False
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+		if self._fd >= 0:
+			os.close(self._fd)
+			self._fd = -1
+			self._watches.clear()
+		with self._condition:
+			self._condition.notify_all()
+		logger.info("[WatcherService] Stopped")
+
+	def get_changes(self, timeout: float) -> List[Path]:
+		"""
+    Wait for changed files whose debounce window has elapsed.
+
+    Args:
+        timeout: Maximum number of seconds to wait
+
+    Returns:
+        The settled paths, sorted, or an empty list if none settled before the timeout.
+        Paths may no longer exist if the file was deleted or moved away.
+    """
+		deadline = time.monotonic() + timeout
+		with self._condition:
+			while True:
+				now = time.monotonic()
+				ready = [path for path, last_event in self._pending.items() if now - last_event >= self.debounce]
+				if ready:
+					for path in ready:
+						del self._pending[path]
+					return sorted(ready)
+
+				remaining = deadline - now
+				if remaining <= 0 or not self._running:
+					return []
+				if self._pending:
+					# Wake up as soon as the oldest pending path settles
+					oldest = min(self._pending.values())
+					remaining = min(remaining, self.debounce - (now - oldest))
+				self._condition.wait(remaining)
+
+	def _record(self, path: Path) -> None:
+		if path.suffix.lower() not in self.allowed_extensions:
+			return
+		with self._condition:
+			# Every new event restarts the debounce window of the path
+			self._pending[path] = time.monotonic()
+			self._condition.notify_all()
+
+	def _walk_files(self, root: Path) -> Iterable[Path]:
+		for dir_path, _, file_names in os.walk(root):
+			for file_name in file_names:
+				yield Path(dir_path) / file_name
+
+	# ---------------------------------------------------------------- inotify
+
+	def _start_inotify(self) -> bool:
+		self._libc = _load_inotify()
+		if self._libc is None:
+			logger.warning("[WatcherService] inotify is not available, falling back to polling")
+			return False
+
+		self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		if self._fd < 0:
+			logger.warning("[WatcherService] inotify_init1 failed (%s), falling back to polling",
+			               os.strerror(ctypes.get_errno()))
+			return False
+
+		self._add_watch_tree(self.root)
+		return True
+
+	def _add_watch_tree(self, root: Path) -> None:
+		for dir_path, _, _ in os.walk(root):
+			wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_path), WATCH_MASK)
+			if wd < 0:
+				# Usually ENOSPC: fs.inotify.max_user_watches is too low for the tree
+				logger.error("[WatcherService] Cannot watch %s: %s", dir_path, os.strerror(ctypes.get_errno()))
+				continue
+			self._watches[wd] = Path(dir_path)
+
+	def _run_inotify(self) -> None:
+		while self._running:
+			readable, _, _ = select.select([self._fd], [], [], SELECT_TIMEOUT)
+			if not readable:
+				continue
+			try:
+				data = os.read(self._fd, READ_SIZE)
+			except BlockingIOError:
+				continue
+
+			offset = 0
+			while offset < len(data):
+				wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+				offset += EVENT_HEADER.size
+				name = data[offset:offset + length].rstrip(b"\0")
+				offset += length
+				self._handle_event(wd, mask, name)
+
+	def _handle_event(self, wd: int, mask: int, name: bytes) -> None:
+		if mask & IN_Q_OVERFLOW:
+			# Events were dropped by the kernel, the only safe recovery is a one-off rescan
+			logger.warning("[WatcherService] inotify queue overflowed, rescanning %s", self.root)
+			for path in self._walk_files(self.root):
+				self._record(path)
+			return
+
+		if mask & IN_IGNORED:
+			self._watches.pop(wd, None)
+			return
+
+		directory = self._watches.get(wd)
+		if directory is None or not name:
+			return
+		path = directory / os.fsdecode(name)
+
+		if mask & IN_ISDIR:
+			if mask & (IN_CREATE | IN_MOVED_TO):
+				# Files may land in a new directory before its watch exists, pick them up now
+				self._add_watch_tree(path)
+				for file_path in self._walk_files(path):
+					self._record(file_path)
+			return
+
+		self._record(path)
+
+	# ---------------------------------------------------------------- polling
+
+	def _take_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+		snapshot: Dict[Path, Tuple[int, int]] = {}
+		for path in self._walk_files(self.root):
+			if path.suffix.lower() not in self.allowed_extensions:
+				continue
+			try:
+				stat = path.stat()
+			except FileNotFoundError:
+				continue
+			snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+		return snapshot
+
+	def _run_polling(self) -> None:
+		while self._running:
+			time.sleep(self.poll_interval)
+			snapshot = self._take_snapshot()
+			for path, signature in snapshot.items():
+				if self._snapshot.get(path) != signature:
+					self._record(path)
+			for path in self._snapshot.keys() - snapshot.keys():
+				self._record(path)
+			self._snapshot = snapshot
@@ -0,0 +1,69 @@
+import logging
+import time
+
+from typing import Callable
+
+from app.services.queue_protocol import QueueProtocol
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Backpressure:
+	"""
+	Pauses a producer while the queue it pushes to is too deep.
+
+	The producer is paused once the queue holds high_watermark items or more and
+	resumes as soon as it drained to low_watermark, so it neither stalls on every
+	push nor bounces around a single threshold. While paused the queue depth is
+	polled with a backoff growing from min_poll_interval to max_poll_interval.
+	"""
+
+	def __init__(self,
+	             queue: QueueProtocol,
+	             high_watermark: int,
+	             low_watermark: int,
+	             min_poll_interval: float = 0.05,
+	             max_poll_interval: float = 0.5,
+	             name: str = "queue") -> None:
+		if low_watermark > high_watermark:
+			raise ValueError("low_watermark must not exceed high_watermark")
+		self.queue = queue
+		self.high_watermark = high_watermark
+		self.low_watermark = low_watermark
+		self.min_poll_interval = min_poll_interval
+		self.max_poll_interval = max_poll_interval
+		self.name = name
+		self.paused_seconds = 0.0
+		self._paused_metric = metrics.BACKPRESSURE_SECONDS.labels(queue=name)
+
+	def wait(self, should_continue: Callable[[], bool] = lambda: True) -> bool:
+		"""
+		Block until the producer may push again.
+
+		Args:
+		    should_continue: Polled while paused, waiting stops as soon as it returns False
+
+		Returns:
+		    True if the producer may push, False if should_continue() returned False.
+		"""
+		depth = self.queue.size()
+		if depth < self.high_watermark:
+			return True
+
+		logger.info("[Backpressure] %s holds %d items (high watermark %d), pausing producer",
+		            self.name, depth, self.high_watermark)
+		started = time.monotonic()
+		interval = self.min_poll_interval
+		while depth > self.low_watermark:
+			if not should_continue():
+				return False
+			time.sleep(interval)
+			interval = min(interval * 2, self.max_poll_interval)
+			depth = self.queue.size()
+
+		paused = time.monotonic() - started
+		self.paused_seconds += paused
+		self._paused_metric.inc(paused)
+		logger.info("[Backpressure] %s drained to %d items after %.2fs, resuming producer", self.name, depth, paused)
+		return True
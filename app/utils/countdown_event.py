@@ -0,0 +1,30 @@
+from threading import Event, Lock
+
+
+class CountdownEvent:
+	"""
+	Event-like object that only sets the wrapped event once set() was called `count` times.
+
+	Lets several workers share one completion event: each worker calls set() when it
+	exits and waiters are released once the last one did.
+	"""
+
+	def __init__(self, count: int, event: Event | None = None) -> None:
+		self.remaining = count
+		self.event = event if event is not None else Event()
+		self._lock = Lock()
+		if count <= 0:
+			self.event.set()
+
+	def set(self) -> None:
+		"""Count down by one, setting the wrapped event when the count reaches zero."""
+		with self._lock:
+			self.remaining -= 1
+			if self.remaining <= 0:
+				self.event.set()
+
+	def is_set(self) -> bool:
+		return self.event.is_set()
+
+	def wait(self, timeout: float | None = None) -> bool:
+		return self.event.wait(timeout)
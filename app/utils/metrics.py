@@ -0,0 +1,402 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are kept in a process-wide registry. Recording
+is a lock-protected integer/float update, so it is cheap enough for the hot
+path; gauges backed by a function (e.g. queue depths) are only evaluated when
+metrics are collected. Metrics are exposed on a local HTTP /metrics endpoint
+and through a periodically rewritten JSON snapshot file.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+	if math.isnan(value):
+		return "NaN"
+	if math.isinf(value):
+		return "+Inf" if value > 0 else "-Inf"
+	if float(value).is_integer():
+		return str(int(value))
+	return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+	return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+	if not labels:
+		return ""
+	return "{" + ",".join(f'{name}="{_escape_label_value(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class _CounterChild:
+	def __init__(self) -> None:
+		self.value = 0.0
+		self._lock = threading.Lock()
+
+	def inc(self, amount: float = 1.0) -> None:
+		with self._lock:
+			self.value += amount
+
+
+class _GaugeChild:
+	def __init__(self) -> None:
+		self.value = 0.0
+		self.function: Callable[[], float] | None = None
+		self._lock = threading.Lock()
+
+	def set(self, value: float) -> None:
+		with self._lock:
+			self.value = value
+
+	def inc(self, amount: float = 1.0) -> None:
+		with self._lock:
+			self.value += amount
+
+	def dec(self, amount: float = 1.0) -> None:
+		with self._lock:
+			self.value -= amount
+
+	def set_function(self, function: Callable[[], float]) -> None:
+		"""Evaluate function at collection time instead of storing a value."""
+		self.function = function
+
+	def get(self) -> float:
+		if self.function is None:
+			return self.value
+		try:
+			return float(self.function())
+		except Exception as ex:
+			logger.debug("[Metrics] Gauge function failed: %s", ex)
+			return math.nan
+
+
+class _HistogramChild:
+	def __init__(self, buckets: Sequence[float]) -> None:
+		self.buckets = buckets
+		self.counts = [0] * (len(buckets) + 1)
+		self.total = 0.0
+		self._lock = threading.Lock()
+
+	def observe(self, value: float) -> None:
+		index = bisect_left(self.buckets, value)
+		with self._lock:
+			self.counts[index] += 1
+			self.total += value
+
+	@contextmanager
+	def time(self) -> Iterator[None]:
+		"""Observe the wall-clock duration of the block in seconds."""
+		started = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.observe(time.perf_counter() - started)
+
+
+class _Metric(ABC):
+	TYPE = ""
+
+	def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+		self.name = name
+		self.documentation = documentation
+		self.labelnames = tuple(labelnames)
+		self._children: Dict[Tuple[str, ...], Any] = {}
+		self._lock = threading.Lock()
+		if not self.labelnames:
+			self._unlabelled = self.labels()
+
+	@abstractmethod
+	def _new_child(self) -> Any:
+		"""Create the value holder of one label combination."""
+
+	def labels(self, **labels: str) -> Any:
+		"""Return the child metric for the given label values, creating it on first use."""
+		key = tuple(str(labels[name]) for name in self.labelnames)
+		child = self._children.get(key)
+		if child is None:
+			with self._lock:
+				child = self._children.setdefault(key, self._new_child())
+		return child
+
+	def _items(self) -> List[Tuple[Dict[str, str], Any]]:
+		with self._lock:
+			return [(dict(zip(self.labelnames, key)), child) for key, child in self._children.items()]
+
+	def _header(self) -> List[str]:
+		return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+
+
+class Counter(_Metric):
+	"""Monotonically increasing value, e.g. the number of processed chunks."""
+
+	TYPE = "counter"
+
+	def _new_child(self) -> _CounterChild:
+		return _CounterChild()
+
+	def inc(self, amount: float = 1.0) -> None:
+		self._unlabelled.inc(amount)
+
+	def render(self) -> List[str]:
+		return self._header() + [f"{self.name}{_format_labels(labels)} {_format_value(child.value)}"
+		                         for labels, child in self._items()]
+
+	def snapshot(self) -> List[Dict[str, Any]]:
+		return [{"labels": labels, "value": child.value} for labels, child in self._items()]
+
+
+class Gauge(_Metric):
+	"""Value that can go up and down, e.g. a queue depth."""
+
+	TYPE = "gauge"
+
+	def _new_child(self) -> _GaugeChild:
+		return _GaugeChild()
+
+	def set(self, value: float) -> None:
+		self._unlabelled.set(value)
+
+	def set_function(self, function: Callable[[], float]) -> None:
+		self._unlabelled.set_function(function)
+
+	def render(self) -> List[str]:
+		return self._header() + [f"{self.name}{_format_labels(labels)} {_format_value(child.get())}"
+		                         for labels, child in self._items()]
+
+	def snapshot(self) -> List[Dict[str, Any]]:
+		samples = []
+		for labels, child in self._items():
+			value = child.get()
+			samples.append({"labels": labels, "value": None if math.isnan(value) else value})
+		return samples
+
+
+class Histogram(_Metric):
+	"""Distribution of observed values over fixed buckets, e.g. latencies or batch sizes."""
+
+	TYPE = "histogram"
+
+	def __init__(self,
+	             name: str,
+	             documentation: str,
+	             labelnames: Sequence[str] = (),
+	             buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+		self.buckets = tuple(sorted(buckets))
+		super().__init__(name, documentation, labelnames)
+
+	def _new_child(self) -> _HistogramChild:
+		return _HistogramChild(self.buckets)
+
+	def observe(self, value: float) -> None:
+		self._unlabelled.observe(value)
+
+	def time(self) -> Any:
+		return self._unlabelled.time()
+
+	def render(self) -> List[str]:
+		lines = self._header()
+		for labels, child in self._items():
+			with child._lock:
+				counts = list(child.counts)
+				total = child.total
+			cumulative = 0
+			for bound, count in zip(self.buckets + (math.inf,), counts):
+				cumulative += count
+				bucket_labels = dict(labels, le=_format_value(bound))
+				lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+			lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+			lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+		return lines
+
+	def snapshot(self) -> List[Dict[str, Any]]:
+		snapshot = []
+		for labels, child in self._items():
+			with child._lock:
+				counts = list(child.counts)
+				total = child.total
+			count = sum(counts)
+			snapshot.append({
+				"labels": labels,
+				"count": count,
+				"sum": total,
+				"mean": total / count if count else None,
+				"buckets": dict(zip([_format_value(bound) for bound in self.buckets + (math.inf,)], counts)),
+			})
+		return snapshot
+
+
+class MetricsRegistry:
+	"""Process-wide collection of metrics, rendered together."""
+
+	def __init__(self) -> None:
+		self._metrics: Dict[str, _Metric] = {}
+		self._lock = threading.Lock()
+
+	def _register(self, metric_class: type, name: str, *args, **kwargs) -> Any:
+		with self._lock:
+			metric = self._metrics.get(name)
+			if metric is None:
+				metric = metric_class(name, *args, **kwargs)
+				self._metrics[name] = metric
+			elif not isinstance(metric, metric_class):
+				raise ValueError(f"metric {name} is already registered as a {metric.TYPE}")
+			return metric
+
+	def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+		return self._register(Counter, name, documentation, labelnames)
+
+	def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+		return self._register(Gauge, name, documentation, labelnames)
+
+	def histogram(self,
+	              name: str,
+	              documentation: str,
+	              labelnames: Sequence[str] = (),
+	              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+		return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+	def render(self) -> str:
+		"""Return every metric in the Prometheus text exposition format."""
+		with self._lock:
+			metrics = list(self._metrics.values())
+		lines: List[str] = []
+		for metric in metrics:
+			lines.extend(metric.render())
+		return "\n".join(lines) + "\n"
+
+	def snapshot(self) -> Dict[str, Any]:
+		"""Return every metric as a JSON-serializable dict."""
+		with self._lock:
+			metrics = list(self._metrics.values())
+		return {
+			"timestamp": time.time(),
+			"metrics": {metric.name: {"type": metric.TYPE, "samples": metric.snapshot()} for metric in metrics},
+		}
+
+
+registry = MetricsRegistry()
+
+# Pipeline metrics, shared by every worker, service and queue of the process
+STAGE_ITEMS = registry.counter(
+	"jarvis_stage_items_total", "Chunks processed by a pipeline stage", ("stage",))
+STAGE_BATCH_SIZE = registry.histogram(
+	"jarvis_stage_batch_size", "Chunks per batch handled by a pipeline stage", ("stage",), buckets=BATCH_SIZE_BUCKETS)
+STAGE_BATCH_SECONDS = registry.histogram(
+	"jarvis_stage_batch_seconds", "Time spent processing one batch in a pipeline stage", ("stage",))
+STAGE_ERRORS = registry.counter(
+	"jarvis_stage_errors_total", "Failed operations per pipeline component", ("stage",))
+FILES_PROCESSED = registry.counter(
+	"jarvis_files_processed_total", "Files fully split and pushed by the document stage")
+BACKPRESSURE_SECONDS = registry.counter(
+	"jarvis_backpressure_seconds_total", "Time producers spent paused on a full queue", ("queue",))
+DEDUP_CHUNKS = registry.counter(
+	"jarvis_dedup_chunks_total", "Chunks checked for near-duplicates, by outcome", ("outcome",))
+
+EMBED_REQUEST_SECONDS = registry.histogram(
+	"jarvis_embed_request_seconds", "Latency of embedding model calls")
+EMBED_TEXTS = registry.counter(
+	"jarvis_embed_texts_total", "Texts embedded, by where the vector came from", ("source",))
+EMBED_RETRIES = registry.counter(
+	"jarvis_embed_retries_total", "Embedding requests retried after an error")
+DEAD_LETTERS = registry.counter(
+	"jarvis_dead_letter_chunks_total", "Chunks moved to or replayed from the dead-letter queue", ("operation",))
+
+VECTORDB_WRITE_SECONDS = registry.histogram(
+	"jarvis_vectordb_write_seconds", "Latency of vector database writes (diff, delete and upsert)")
+VECTORDB_CHUNKS = registry.counter(
+	"jarvis_vectordb_chunks_total", "Chunks written to the vector database, by outcome", ("outcome",))
+SYNC_SOURCES = registry.counter(
+	"jarvis_sync_sources_total", "Source files reconciled with the vector database, by outcome", ("outcome",))
+
+QUEUE_ITEMS = registry.counter(
+	"jarvis_queue_items_total", "Items moved through a queue", ("queue", "operation"))
+QUEUE_DEPTH = registry.gauge(
+	"jarvis_queue_depth", "Items waiting in a queue", ("queue",))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+	registry: MetricsRegistry = registry
+
+	def log_message(self, format: str, *args) -> None:
+		logger.debug("[MetricsServer] " + format, *args)
+
+	def do_GET(self) -> None:
+		if self.path.split("?")[0].rstrip("/") != "/metrics":
+			self.send_error(404)
+			return
+		payload = self.registry.render().encode("utf-8")
+		self.send_response(200)
+		self.send_header("Content-Type", CONTENT_TYPE)
+		self.send_header("Content-Length", str(len(payload)))
+		self.end_headers()
+		self.wfile.write(payload)
+
+
+def start_metrics_server(host: str, port: int, metrics_registry: MetricsRegistry = registry) -> ThreadingHTTPServer:
+	"""Serve the registry on http://host:port/metrics from a daemon thread."""
+	handler = type("MetricsHandler", (_MetricsHandler,), {"registry": metrics_registry})
+	server = ThreadingHTTPServer((host, port), handler)
+	server.daemon_threads = True
+	threading.Thread(target=server.serve_forever, daemon=True, name="MetricsServerThread").start()
+	logger.info("[MetricsServer] Serving metrics on http://%s:%d/metrics", *server.server_address[:2])
+	return server
+
+
+class MetricsSnapshotWriter:
+	"""Periodically writes a JSON snapshot of the registry to a file, atomically."""
+
+	def __init__(self,
+	             snapshot_path: Path,
+	             interval: float,
+	             metrics_registry: MetricsRegistry = registry) -> None:
+		self.snapshot_path = snapshot_path
+		self.interval = interval
+		self.registry = metrics_registry
+		self._stop = threading.Event()
+		self.thread = threading.Thread(target=self.run, daemon=True, name="MetricsSnapshotThread")
+
+	def start(self) -> None:
+		self.thread.start()
+		logger.info("[MetricsSnapshotWriter] Writing metrics to %s every %.0fs", self.snapshot_path, self.interval)
+
+	def stop(self) -> None:
+		"""Stop the writer and write a final snapshot."""
+		self._stop.set()
+		if self.thread.is_alive():
+			self.thread.join()
+		self.write()
+
+	def write(self) -> None:
+		self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+		tmp_path = self.snapshot_path.with_suffix(self.snapshot_path.suffix + ".tmp")
+		with open(tmp_path, "w", encoding="utf-8") as f:
+			json.dump(self.registry.snapshot(), f, indent=2)
+		os.replace(tmp_path, self.snapshot_path)
+
+	def run(self) -> None:
+		while not self._stop.wait(self.interval):
+			try:
+				self.write()
+			except Exception as ex:
+				logger.warning("[MetricsSnapshotWriter] Failed to write snapshot: %s", ex)
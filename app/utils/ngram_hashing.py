@@ -0,0 +1,60 @@
+import numpy as np
+
+# Multiplier of the rolling n-gram hash and constants of the 64-bit finalizer (MurmurHash3 fmix64)
+_ROLL_MULTIPLIER = np.uint64(0x100000001B3)
+_MIX_1 = np.uint64(0xFF51AFD7ED558CCD)
+_MIX_2 = np.uint64(0xC4CEB9FE1A85EC53)
+_SHIFT = np.uint64(33)
+
+
+def normalize_text(text: str) -> bytes:
+	"""Lowercase and collapse whitespace, so n-grams ignore case and layout."""
+	return " ".join(text.lower().split()).encode("utf-8")
+
+
+def mix64(hashes: np.ndarray) -> np.ndarray:
+	"""Scramble uint64 hashes in place so that every output bit depends on every input bit."""
+	with np.errstate(over="ignore"):
+		hashes ^= hashes >> _SHIFT
+		hashes *= _MIX_1
+		hashes ^= hashes >> _SHIFT
+		hashes *= _MIX_2
+		hashes ^= hashes >> _SHIFT
+	return hashes
+
+
+def ngram_hashes(data: np.ndarray, size: int) -> np.ndarray:
+	"""
+	Hash every n-gram of a byte sequence.
+
+	Args:
+	    data: Bytes as a uint64 array
+	    size: n-gram length in bytes
+
+	Returns:
+	    One mixed uint64 hash per n-gram start position (len(data) - size + 1 values),
+	    seeded by `size` so n-grams of different lengths do not collide.
+	"""
+	positions = len(data) - size + 1
+	if positions <= 0:
+		return np.empty(0, dtype=np.uint64)
+
+	hashes = np.full(positions, size, dtype=np.uint64)
+	with np.errstate(over="ignore"):
+		for offset in range(size):
+			hashes *= _ROLL_MULTIPLIER
+			hashes += data[offset:offset + positions]
+	return mix64(hashes)
+
+
+def concat_texts(encoded: list[bytes]) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Concatenate encoded texts for batch-wise hashing.
+
+	Returns:
+	    (bytes as a uint64 array, index of the text owning each byte)
+	"""
+	lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+	data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+	owners = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+	return data, owners
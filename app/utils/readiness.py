@@ -0,0 +1,56 @@
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def _wait_for(name: str, check: Callable[[], None], deadline: float, interval: float, max_interval: float) -> None:
+	"""Retry one check with exponential backoff until it passes, re-raising its last error past the deadline."""
+	delay = interval
+	while True:
+		try:
+			check()
+			logger.info("[Readiness] %s is ready", name)
+			return
+		except Exception as ex:
+			if time.monotonic() + delay > deadline:
+				logger.error("[Readiness] %s is not ready: %s", name, ex)
+				raise
+			logger.warning("[Readiness] %s is not ready yet, retrying in %.2fs: %s", name, delay, ex)
+			time.sleep(delay)
+			delay = min(delay * 2, max_interval)
+
+
+def wait_until_ready(checks: Dict[str, Callable[[], None]],
+                     timeout: float,
+                     interval: float = 0.1,
+                     max_interval: float = 2.0) -> None:
+	"""
+	Run readiness checks concurrently and return once all of them passed.
+
+	A check is any callable that raises while its dependency is unavailable. Slow
+	checks (opening a database, connecting to Redis) overlap instead of adding up,
+	and a failing check is retried right away with backoff rather than after a
+	fixed sleep.
+
+	Args:
+	    checks: Check per dependency name
+	    timeout: Seconds to keep retrying before giving up
+	    interval: First retry delay, doubled up to max_interval
+
+	Raises:
+	    The last error of the first check that did not pass within the timeout.
+	"""
+	if not checks:
+		return
+	deadline = time.monotonic() + timeout
+	started = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix="ReadinessCheck") as executor:
+		futures = [executor.submit(_wait_for, name, check, deadline, interval, max_interval)
+		           for name, check in checks.items()]
+		for future in futures:
+			future.result()
+	logger.info("[Readiness] %d dependencies ready in %.2fs", len(checks), time.perf_counter() - started)
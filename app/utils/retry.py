@@ -0,0 +1,25 @@
+import random
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+	"""
+	Exponential backoff with full jitter.
+
+	The delay is drawn uniformly from [0, min(max_delay, base_delay * 2 ** attempt)],
+	so workers throttled at the same moment spread their retries out instead of
+	hitting the provider again in lockstep.
+
+	Args:
+	    attempt: Number of failed attempts so far minus one (0 after the first failure)
+	    base_delay: Upper bound of the first delay in seconds
+	    max_delay: Cap of the upper bound in seconds
+	"""
+	return random.uniform(0.0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def is_throttling_error(error: BaseException) -> bool:
+	"""Return True if an error reports provider throttling (HTTP 429), e.g. from httpx or the Mistral client."""
+	status = getattr(error, "status_code", None)
+	if status is None:
+		status = getattr(getattr(error, "response", None), "status_code", None)
+	return status == 429
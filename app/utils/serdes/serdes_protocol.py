@@ -7,10 +7,10 @@ class SerDesProtocol(Protocol):
     """
     Protocol defining the required interface for all Serializer/Deserializer classes.
     """
-    def serialize(self, item: T) -> str:
-        """Converts an object T to a string (for storage/transmission)."""
+    def serialize(self, item: T) -> str | bytes:
+        """Converts an object T to a string or bytes (for storage/transmission)."""
         ...
 
-    def deserialize(self, data: str) -> T:
-        """Converts a string back to an object T."""
+    def deserialize(self, data: str | bytes) -> T:
+        """Converts a string or bytes back to an object T."""
         ...
\ No newline at end of file
@@ -1,8 +1,14 @@
+import hashlib
+
 from pathlib import Path
 from app.config.core import document_service_config
 
 
 def get_category_from_path(file_path: Path, base_path: Path = document_service_config.documents_path) -> str:
+	# Files outside base_path (e.g. another corpus root) have no category
+	if not file_path.is_relative_to(base_path):
+		return ""
+
 	# Get relative path parts from base_path
 	relative_parts = file_path.relative_to(base_path).parts
 
@@ -11,3 +17,14 @@ def get_category_from_path(file_path: Path, base_path: Path = document_service_c
 		category = relative_parts[0]
 		return category
 	return ""
+
+
+def get_content_hash(text: str) -> str:
+	# Hex sha256 digest of the chunk text
+	return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def get_chunk_id(source: str, chunk_index: int, content: str) -> str:
+	# Content-addressed chunk id: the same chunk of the same file always maps to the same id
+	source_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+	return f"{source_hash}-{chunk_index}-{get_content_hash(content)[:16]}"
@@ -0,0 +1,223 @@
+"""
+Streaming document loaders that read files incrementally instead of loading
+them whole.
+
+Each loader yields the file as a sequence of windows of at most window_size
+characters (a single record larger than the window is yielded on its own).
+Every window is a Document whose metadata holds the source path and the
+character offset of the window in the file, so chunks split from a window can
+be mapped back to exact offsets in the source.
+"""
+import json
+import logging
+
+from pathlib import Path
+from typing import Iterator, Tuple
+
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+from app.config.core import document_service_config
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+
+class StreamingTextLoader(BaseLoader):
+	"""
+  Reads a text file in fixed-size blocks and yields windows cut at the last
+  paragraph, line or word boundary before window_size.
+  """
+
+	# Preferred window boundaries, tried in order
+	SEPARATORS: Tuple[str, ...] = ("\n\n", "\n", " ")
+
+	def __init__(self,
+	             file_path: str | Path,
+	             window_size: int = document_service_config.stream_window_size,
+	             encoding: str = "utf-8") -> None:
+		self.file_path = Path(file_path)
+		self.window_size = window_size
+		self.encoding = encoding
+
+	def _document(self, text: str, offset: int) -> Document:
+		return Document(page_content=text, metadata={"source": str(self.file_path), "window_start": offset})
+
+	def _find_cut(self, buffer: str) -> int:
+		# Only accept boundaries in the second half of the window to keep windows large
+		for separator in self.SEPARATORS:
+			index = buffer.rfind(separator, self.window_size // 2, self.window_size)
+			if index != -1:
+				return index + len(separator)
+		return self.window_size
+
+	def lazy_load(self) -> Iterator[Document]:
+		offset = 0
+		buffer = ""
+		# newline="" keeps \r\n as is, so offsets match the characters of the file
+		with open(self.file_path, "r", encoding=self.encoding, newline="") as f:
+			while True:
+				block = f.read(READ_SIZE)
+				buffer += block
+				while len(buffer) > self.window_size:
+					cut = self._find_cut(buffer)
+					yield self._document(buffer[:cut], offset)
+					offset += cut
+					buffer = buffer[cut:]
+				if not block:
+					break
+
+		if buffer:
+			yield self._document(buffer, offset)
+
+
+class StreamingJSONLinesLoader(StreamingTextLoader):
+	"""
+  Reads a JSON Lines file, cutting windows on line boundaries only so that a
+  record is never split across windows unless it is larger than window_size.
+  """
+
+	SEPARATORS = ("\n",)
+
+
+class StreamingJSONLoader(StreamingTextLoader):
+	"""
+  Incrementally parses a JSON file whose top level is an array or an object.
+
+  Each array item (or object member) is a record. Consecutive records are
+  grouped into windows holding the exact source text between the first and
+  last record, so a record is never split across windows unless it is larger
+  than window_size. Any other top-level value is yielded as a single window.
+  """
+
+	def __init__(self,
+	             file_path: str | Path,
+	             window_size: int = document_service_config.stream_window_size,
+	             encoding: str = "utf-8") -> None:
+		super().__init__(file_path, window_size, encoding)
+		self.decoder = json.JSONDecoder()
+
+	def lazy_load(self) -> Iterator[Document]:
+		with open(self.file_path, "r", encoding=self.encoding, newline="") as f:
+			reader = _JSONReader(f, self.decoder)
+			reader.skip_whitespace()
+			opening = reader.peek()
+
+			if opening not in ("[", "{"):
+				start = reader.position
+				end = reader.decode_value()
+				yield self._document(reader.text(start, end), start)
+				return
+
+			reader.advance(1)
+			closing = "]" if opening == "[" else "}"
+			window_start: int | None = None
+			window_end = 0
+
+			while True:
+				reader.skip_whitespace()
+				if reader.peek() == closing:
+					break
+				if window_start is not None:
+					reader.expect(",")
+					reader.skip_whitespace()
+
+				record_start = reader.position
+				if opening == "{":
+					reader.decode_value()
+					reader.skip_whitespace()
+					reader.expect(":")
+					reader.skip_whitespace()
+				record_end = reader.decode_value()
+
+				if window_start is not None and record_end - window_start > self.window_size:
+					yield self._document(reader.text(window_start, window_end), window_start)
+					window_start = None
+				if window_start is None:
+					window_start = record_start
+					# Text before the new window is no longer needed
+					reader.release(window_start)
+				window_end = record_end
+
+			if window_start is not None:
+				yield self._document(reader.text(window_start, window_end), window_start)
+
+
+class _JSONReader:
+	"""Character buffer over a text file, addressed by absolute offsets."""
+
+	def __init__(self, f, decoder: json.JSONDecoder) -> None:
+		self.f = f
+		self.decoder = decoder
+		self.buffer = ""
+		self.buffer_start = 0
+		self.position = 0
+		self.eof = False
+
+	def _fill(self, size: int = READ_SIZE) -> bool:
+		if self.eof:
+			return False
+		block = self.f.read(size)
+		if not block:
+			self.eof = True
+			return False
+		self.buffer += block
+		return True
+
+	def _index(self, position: int) -> int:
+		return position - self.buffer_start
+
+	def peek(self) -> str:
+		while self._index(self.position) >= len(self.buffer):
+			if not self._fill():
+				raise ValueError(f"Unexpected end of JSON at offset {self.position}")
+		return self.buffer[self._index(self.position)]
+
+	def advance(self, count: int) -> None:
+		self.position += count
+
+	def expect(self, char: str) -> None:
+		found = self.peek()
+		if found != char:
+			raise ValueError(f"Expected {char!r} at offset {self.position}, found {found!r}")
+		self.advance(1)
+
+	def skip_whitespace(self) -> None:
+		while True:
+			index = self._index(self.position)
+			while index < len(self.buffer) and self.buffer[index] in WHITESPACE:
+				index += 1
+			self.position = index + self.buffer_start
+			if index < len(self.buffer) or not self._fill():
+				return
+
+	def decode_value(self) -> int:
+		"""Decode the value at the current position and return its end offset."""
+		read_size = READ_SIZE
+		while True:
+			try:
+				_, end = self.decoder.raw_decode(self.buffer, self._index(self.position))
+			except json.JSONDecodeError:
+				# The value may be cut by the end of the buffer, read more and retry
+				if not self._fill(read_size):
+					raise
+				# Grow reads geometrically so a huge value is not re-parsed once per block
+				read_size *= 2
+				continue
+			# A number at the end of the buffer may continue in the next block
+			if end == len(self.buffer) and not self.eof and self._fill(read_size):
+				continue
+			self.position = end + self.buffer_start
+			return self.position
+
+	def text(self, start: int, end: int) -> str:
+		return self.buffer[self._index(start):self._index(end)]
+
+	def release(self, position: int) -> None:
+		"""Drop buffered text before the given offset."""
+		index = self._index(position)
+		if index > 0:
+			self.buffer = self.buffer[index:]
+			self.buffer_start = position
@@ -0,0 +1,149 @@
+"""
+Local stub of a Mistral-compatible embeddings API, for testing the embedding
+clients offline.
+
+Simulates per-request latency and throttling: requests above the configured
+requests/second limit are answered with 429 and a Retry-After header. Vectors
+are deterministic pseudo-random unit vectors derived from each input text.
+
+Usage:
+    python -m app.utils.stub_embedding_server --port 8765 --latency 0.2 --rps-limit 5
+"""
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, List
+
+logger = logging.getLogger(__name__)
+
+
+def stub_vector(text: str, dimension: int) -> List[float]:
+	"""Return a deterministic unit vector for a text."""
+	seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+	rng = random.Random(seed)
+	vector = [rng.gauss(0.0, 1.0) for _ in range(dimension)]
+	norm = sum(value * value for value in vector) ** 0.5 or 1.0
+	return [value / norm for value in vector]
+
+
+class StubEmbeddingServer(ThreadingHTTPServer):
+	"""Threaded HTTP server holding the stub configuration and rate-limit window."""
+
+	daemon_threads = True
+
+	def __init__(self,
+	             address: tuple,
+	             latency: float = 0.1,
+	             jitter: float = 0.0,
+	             rps_limit: float = 0.0,
+	             retry_after: float = 1.0,
+	             dimension: int = 1024) -> None:
+		super().__init__(address, StubEmbeddingHandler)
+		self.latency = latency
+		self.jitter = jitter
+		self.rps_limit = rps_limit
+		self.retry_after = retry_after
+		self.dimension = dimension
+		self.requests_served = 0
+		self.requests_throttled = 0
+		self._window: Deque[float] = deque()
+		self._lock = threading.Lock()
+
+	def admit(self) -> bool:
+		"""Return False if the request exceeds the requests/second limit."""
+		if self.rps_limit <= 0:
+			return True
+		with self._lock:
+			now = time.monotonic()
+			while self._window and now - self._window[0] >= 1.0:
+				self._window.popleft()
+			if len(self._window) >= self.rps_limit:
+				self.requests_throttled += 1
+				return False
+			self._window.append(now)
+			return True
+
+
+class StubEmbeddingHandler(BaseHTTPRequestHandler):
+
+	server: StubEmbeddingServer
+
+	def log_message(self, format: str, *args) -> None:
+		logger.debug("[StubEmbeddingServer] " + format, *args)
+
+	def _send_json(self, status: int, body: dict, headers: dict | None = None) -> None:
+		payload = json.dumps(body).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(payload)))
+		for name, value in (headers or {}).items():
+			self.send_header(name, value)
+		self.end_headers()
+		self.wfile.write(payload)
+
+	def do_POST(self) -> None:
+		if not self.path.rstrip("/").endswith("/embeddings"):
+			self._send_json(404, {"message": "not found"})
+			return
+
+		length = int(self.headers.get("Content-Length", 0))
+		request = json.loads(self.rfile.read(length) or b"{}")
+		texts = request.get("input", [])
+		if isinstance(texts, str):
+			texts = [texts]
+
+		if not self.server.admit():
+			self._send_json(429, {"message": "rate limit exceeded"},
+			                headers={"Retry-After": f"{self.server.retry_after:g}"})
+			return
+
+		time.sleep(max(0.0, self.server.latency + random.uniform(-self.server.jitter, self.server.jitter)))
+		with self.server._lock:
+			self.server.requests_served += 1
+
+		self._send_json(200, {
+			"object": "list",
+			"model": request.get("model", "stub-embed"),
+			"data": [
+				{"object": "embedding", "index": index, "embedding": stub_vector(text, self.server.dimension)}
+				for index, text in enumerate(texts)
+			],
+			"usage": {"prompt_tokens": 0, "total_tokens": 0},
+		})
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, **kwargs) -> StubEmbeddingServer:
+	"""Start the stub server on a background thread and return it (port 0 picks a free port)."""
+	server = StubEmbeddingServer((host, port), **kwargs)
+	threading.Thread(target=server.serve_forever, daemon=True, name="StubEmbeddingServerThread").start()
+	logger.info("[StubEmbeddingServer] Listening on http://%s:%d", *server.server_address[:2])
+	return server
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Stub Mistral-compatible embeddings server")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--latency", type=float, default=0.1, help="Seconds of simulated latency per request")
+	parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter added to the latency")
+	parser.add_argument("--rps-limit", type=float, default=0.0, help="Requests/second before answering 429 (0 = off)")
+	parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429 responses")
+	parser.add_argument("--dimension", type=int, default=1024)
+	args = parser.parse_args()
+
+	logging.basicConfig(level=logging.INFO)
+	stub = StubEmbeddingServer((args.host, args.port),
+	                           latency=args.latency,
+	                           jitter=args.jitter,
+	                           rps_limit=args.rps_limit,
+	                           retry_after=args.retry_after,
+	                           dimension=args.dimension)
+	logger.info("[StubEmbeddingServer] Listening on http://%s:%d/v1/embeddings", args.host, args.port)
+	stub.serve_forever()
@@ -0,0 +1,13 @@
+import re
+
+# Average characters per token for BPE tokenizers on English prose
+CHARS_PER_TOKEN = 4
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+	# Fast local estimate: one token per CHARS_PER_TOKEN characters, but at least one
+	# token per word or punctuation mark so short-word and symbol-heavy text is not undercounted
+	by_length = -(-len(text) // CHARS_PER_TOKEN)
+	by_words = len(WORD_PATTERN.findall(text))
+	return max(by_length, by_words, 1)
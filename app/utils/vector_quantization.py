@@ -0,0 +1,88 @@
+import numpy as np
+
+from typing import Tuple
+
+from app.config.core import VectorQuantization
+
+# Codes stored in the embedding wire frame, 0 keeps frames written before quantization existed readable
+QUANTIZATION_CODES = {
+	VectorQuantization.FLOAT32: 0,
+	VectorQuantization.FLOAT16: 1,
+	VectorQuantization.INT8: 2,
+}
+QUANTIZATION_BY_CODE = {code: quantization for quantization, code in QUANTIZATION_CODES.items()}
+
+FLOAT32 = np.dtype("<f4")
+FLOAT16 = np.dtype("<f2")
+INT8 = np.dtype("i1")
+INT8_MAX = 127
+
+
+def encoded_size(dimension: int, quantization: str) -> int:
+	"""Bytes taken by one encoded vector of the given dimension."""
+	if quantization == VectorQuantization.FLOAT16:
+		return dimension * FLOAT16.itemsize
+	if quantization == VectorQuantization.INT8:
+		# The scale precedes the codes
+		return FLOAT32.itemsize + dimension * INT8.itemsize
+	return dimension * FLOAT32.itemsize
+
+
+def _int8_scales(vectors: np.ndarray) -> np.ndarray:
+	scales = np.abs(vectors).max(axis=-1, keepdims=True) / INT8_MAX
+	# An all-zero vector quantizes to zeros with any scale
+	scales[scales == 0] = 1.0
+	return scales.astype(FLOAT32)
+
+
+def encode(vector: np.ndarray, quantization: str) -> bytes:
+	"""
+	Encode one vector.
+
+	Args:
+	    vector: Vector of any float dtype.
+	    quantization: float32 (lossless), float16 or int8.
+
+	Returns:
+	    encoded_size(vector.size, quantization) bytes.
+	"""
+	if quantization == VectorQuantization.FLOAT16:
+		return vector.astype(FLOAT16).tobytes()
+	if quantization == VectorQuantization.INT8:
+		vector = vector.astype(FLOAT32)
+		scale = _int8_scales(vector)
+		codes = np.clip(np.rint(vector / scale), -INT8_MAX, INT8_MAX).astype(INT8)
+		return scale.tobytes() + codes.tobytes()
+	return vector.astype(FLOAT32).tobytes()
+
+
+def decode(data: bytes, offset: int, dimension: int, quantization: str) -> Tuple[np.ndarray, int]:
+	"""
+	Decode one vector written by encode().
+
+	Float32 vectors are returned as a read-only view over data, quantized vectors
+	are expanded into a new float32 array.
+
+	Returns:
+	    (float32 vector, number of bytes read)
+	"""
+	if quantization == VectorQuantization.FLOAT16:
+		vector = np.frombuffer(data, dtype=FLOAT16, count=dimension, offset=offset).astype(FLOAT32)
+	elif quantization == VectorQuantization.INT8:
+		scale = np.frombuffer(data, dtype=FLOAT32, count=1, offset=offset)
+		codes = np.frombuffer(data, dtype=INT8, count=dimension, offset=offset + FLOAT32.itemsize)
+		vector = codes.astype(FLOAT32) * scale
+	else:
+		vector = np.frombuffer(data, dtype=FLOAT32, count=dimension, offset=offset)
+	return vector, encoded_size(dimension, quantization)
+
+
+def roundtrip(vectors: np.ndarray, quantization: str) -> np.ndarray:
+	"""Quantize and expand a (n, dimension) matrix at once, i.e. what a consumer of encoded vectors sees."""
+	vectors = np.asarray(vectors, dtype=FLOAT32)
+	if quantization == VectorQuantization.FLOAT16:
+		return vectors.astype(FLOAT16).astype(FLOAT32)
+	if quantization == VectorQuantization.INT8:
+		scales = _int8_scales(vectors)
+		return np.clip(np.rint(vectors / scales), -INT8_MAX, INT8_MAX).astype(INT8).astype(FLOAT32) * scales
+	return vectors
@@ -1,10 +1,19 @@
 import logging
 import time
 
-from threading import Thread
-from app.config.core import document_service_config
+from pathlib import Path
+from threading import Event, Thread
+from typing import Iterable
+
+from app.config.core import document_service_config, document_queue_config
+from app.services.dedup_service import DedupService
 from app.services.document_service import DocumentService
-from app.services.queue_service import RedisBufferQueue
+from app.services.manifest_service import ManifestService
+from app.services.queue_protocol import QueueClosedError, QueueProtocol
+from app.services.sync_service import SyncService
+from app.services.watcher_service import WatcherService
+from app.utils import metrics
+from app.utils.backpressure import Backpressure
 
 logger = logging.getLogger(__name__)
 
@@ -14,22 +23,50 @@ class DocumentWorker:
   Background worker responsible for:
       1. Running DocumentService to create chunks
       2. Pushing these chunks to the Redis 'document_queue'
-      3. Running continuously (future: watcher for new files)
+      3. Skipping files the manifest reports as unchanged since the last run
+      4. Running continuously when given a watcher, ingesting files as they change
+      5. Dropping or linking near-duplicate chunks when given a dedup service
+      6. Removing chunks of deleted files and moving chunks of renamed files
+         when given a sync service, before ingesting and whenever files vanish
+
+  In watch mode no sentinel is sent, so downstream stages keep running until stopped.
+
+  A file's manifest entry is only committed once its last chunk is stored, by the
+  VectorDB workers of the same process. When the VectorDB stage runs elsewhere
+  (confirm_on_push), the entry is committed once the file's chunks are queued.
 
   This worker is always run in its own thread.
   """
 
 	def __init__(self,
-	             doc_queue: RedisBufferQueue,
+	             doc_queue: QueueProtocol,
 	             doc_service: DocumentService,
+	             manifest: ManifestService | None = None,
 	             batch_size: int = document_service_config.batch_size,
-	             sleep_timer: int = document_service_config.sleep_timer):
+	             high_watermark: int = document_queue_config.high_watermark,
+	             low_watermark: int = document_queue_config.low_watermark,
+	             next_stage_workers: int = 1,
+	             complete_event: Event | None = None,
+	             watcher: WatcherService | None = None,
+	             dedup: DedupService | None = None,
+	             sync: SyncService | None = None,
+	             confirm_on_push: bool = False):
 		self.doc_queue = doc_queue
 		self.doc_service = doc_service
+		self.manifest = manifest
+		self.watcher = watcher
+		self.dedup = dedup
+		self.sync = sync
+		self.confirm_on_push = confirm_on_push
 		self.thread = Thread(target=self.run, daemon=True, name="DocumentWorkerThread")
 		self.running = True
 		self.batch_size = batch_size
-		self.sleep_timer = sleep_timer
+		self.backpressure = Backpressure(doc_queue, high_watermark, low_watermark, name="document_queue")
+		self._items_metric = metrics.STAGE_ITEMS.labels(stage="document")
+		self._batch_size_metric = metrics.STAGE_BATCH_SIZE.labels(stage="document")
+		self._batch_seconds_metric = metrics.STAGE_BATCH_SECONDS.labels(stage="document")
+		self.next_stage_workers = next_stage_workers
+		self.complete_event = complete_event
 		logger.info("[DocumentWorker] Initialized")
 
 	def start(self) -> None:
@@ -42,16 +79,92 @@ class DocumentWorker:
 		self.running = False
 		logger.warning("[DocumentWorker] Stop signal sent")
 
+	def ingest(self, files: Iterable[Path] | None = None) -> None:
+		"""
+    Split files and push their chunks to the document queue.
+
+    Args:
+        files: Files to ingest, defaults to every valid file under the documents directory
+    """
+		if self.manifest is not None:
+			candidates = self.doc_service.scan_files() if files is None else files
+			files = [file_path for file_path in candidates if self.manifest.is_changed(file_path)]
+			logger.info("[DocumentWorker] Manifest reports %d new or modified files", len(files))
+
+		def on_file_done(file_path: Path) -> None:
+			metrics.FILES_PROCESSED.inc()
+			if self.manifest is not None and self.confirm_on_push:
+				self.manifest.mark_ingested(file_path)
+
+		started = time.perf_counter()
+		for batch in self.doc_service.load_and_split_batch(batch_size=self.batch_size,
+		                                                   files=files,
+		                                                   on_file_done=on_file_done):
+			if self.dedup is not None:
+				batch = self.dedup.filter_batch(batch)
+				if not batch:
+					continue
+			# Time spent loading and splitting, excluding backpressure pauses
+			split_seconds = time.perf_counter() - started
+			# Only pause while the embedding stage is behind, never on a fixed timer
+			if not self.running or not self.backpressure.wait(lambda: self.running):
+				break
+			logger.info("[DocumentWorker] Pushing batch of %d chunks to document_queue", len(batch))
+			try:
+				self.doc_queue.push_batch(batch)
+			except QueueClosedError as ex:
+				logger.warning("[DocumentWorker] %s, stopping", ex)
+				break
+			self._items_metric.inc(len(batch))
+			self._batch_size_metric.observe(len(batch))
+			self._batch_seconds_metric.observe(split_seconds)
+			started = time.perf_counter()
+
+		if self.running and self.manifest is not None:
+			self.manifest.save()
+
+	def reconcile(self) -> None:
+		"""Run a sync pass, a failed pass is logged and retried on the next occasion."""
+		try:
+			self.sync.sync()
+		except Exception as ex:
+			logger.exception("[DocumentWorker] Sync pass failed: %s", ex)
+			metrics.STAGE_ERRORS.labels(stage="sync").inc()
+
+	def watch(self) -> None:
+		"""Ingest files reported by the watcher until the worker is stopped."""
+		logger.info("[DocumentWorker] Watching for new or modified files")
+		while self.running:
+			changed = self.watcher.get_changes(timeout=1.0)
+			# Sync before ingesting, so the new path of a renamed file is found unchanged
+			if self.sync is not None and any(not file_path.exists() for file_path in changed):
+				self.reconcile()
+			# Deleted or moved-away files are reported as well, only ingest the ones still on disk
+			files = [file_path for file_path in changed if self.doc_service.is_valid_file(file_path)]
+			if not files:
+				continue
+			logger.info("[DocumentWorker] Watcher reported %d changed files", len(files))
+			self.ingest(files)
+
 	def run(self) -> None:
 		"""Main worker loop."""
 		logger.info("[DocumentWorker] Started")
 
-		for batch in self.doc_service.load_and_split_batch(batch_size=self.batch_size):
-			logger.info("[DocumentWorker] Pushing batch of %d chunks to document_queue", len(batch))
-			self.doc_queue.push_batch(batch)
-			logger.info("[DocumentWorker] Worker now idling for %d seconds before pushing new batch", self.sleep_timer)
-			time.sleep(self.sleep_timer)
+		# Start watching before the initial scan so files written during the scan are not missed
+		if self.watcher is not None:
+			self.watcher.start()
+
+		if self.sync is not None:
+			self.reconcile()
+		self.ingest()
+
+		if self.watcher is not None:
+			self.watch()
+			self.watcher.stop()
+		elif self.running:
+			logger.info("[DocumentWorker] All documents are now processed, exiting...")
+			self.doc_queue.mark_producer_done(producers=1, consumers=self.next_stage_workers)
 
-		logger.info("[DocumentWorker] All documents are now processed, exiting...")
-		self.doc_queue.push_batch(None)
-		logger.info("[DocumentWorker] Worker stopped cleanly")
\ No newline at end of file
+		if self.complete_event is not None:
+			self.complete_event.set()
+		logger.info("[DocumentWorker] Worker stopped cleanly")
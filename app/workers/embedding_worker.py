@@ -1,13 +1,18 @@
 import logging
 import time
 
-from threading import Thread
+from threading import Event, Thread
 from typing import List, Dict, Any
 from langchain_core.documents import Document
 
-from app.config.core import embedding_service_config
+from app.config.core import embedding_service_config, embedding_queue_config
+from app.services.batch_packer import TokenBatchPacker
+from app.services.dead_letter_service import DeadLetterService
 from app.services.embedding_service import EmbeddingService
-from app.services.queue_service import RedisBufferQueue
+from app.services.queue_protocol import QueueClosedError, QueueProtocol
+from app.utils import metrics
+from app.utils.backpressure import Backpressure
+from app.utils.retry import backoff_delay, is_throttling_error
 
 logger = logging.getLogger(__name__)
 
@@ -15,21 +20,59 @@ logger = logging.getLogger(__name__)
 class EmbeddingWorker:
 	"""
 	Thin wrapper that repeatedly calls EmbeddingWorkerService.
+
+	Popped chunks are packed into token-budgeted requests, so one failing request
+	does not sink the whole batch. A failing request is retried with jittered
+	exponential backoff, then bisected to isolate the chunks that keep failing,
+	which go to the dead-letter queue with their error. Throttled requests are
+	not bisected, smaller requests would only be throttled as well.
+
+	Several EmbeddingWorkers can consume the same
+	document queue. The last one to finish releases the VectorDB workers through
+	mark_producer_done().
+
+	Documents are only popped while the embedding queue is below its high
+	watermark, so a slow VectorDB stage holds work back in the document queue.
 	"""
 
 	def __init__(self,
-	             document_queue: RedisBufferQueue,
-	             embedding_queue: RedisBufferQueue,
+	             document_queue: QueueProtocol,
+	             embedding_queue: QueueProtocol,
 	             embedding_service: EmbeddingService,
 	             batch_size: int = embedding_service_config.batch_size,
-	             sleep_timer: int = embedding_service_config.sleep_timer) -> None:
+	             worker_id: int = 0,
+	             stage_workers: int = 1,
+	             next_stage_workers: int = 1,
+	             complete_event: Event | None = None,
+	             batch_packer: TokenBatchPacker | None = None,
+	             high_watermark: int = embedding_queue_config.high_watermark,
+	             low_watermark: int = embedding_queue_config.low_watermark,
+	             dead_letter: DeadLetterService | None = None,
+	             max_attempts: int = embedding_service_config.max_attempts,
+	             retry_base_delay: float = embedding_service_config.retry_base_delay,
+	             retry_max_delay: float = embedding_service_config.retry_max_delay,
+	             bisect_attempts: int = embedding_service_config.bisect_attempts) -> None:
 		self.document_queue = document_queue
-		self.embedding_queue: RedisBufferQueue = embedding_queue
+		self.embedding_queue: QueueProtocol = embedding_queue
 		self.embedding_service = embedding_service
-		self.thread = Thread(target=self.run, daemon=True, name="EmbeddingWorkerThread")
+		self.thread = Thread(target=self.run, daemon=True, name=f"EmbeddingWorkerThread-{worker_id}")
 		self.running = True
 		self.batch_size = batch_size
-		self.sleep_timer = sleep_timer
+		self.stage_workers = stage_workers
+		self.next_stage_workers = next_stage_workers
+		self.complete_event = complete_event
+		self.batch_packer = batch_packer if batch_packer is not None else embedding_service.batch_packer
+		self.backpressure = Backpressure(embedding_queue, high_watermark, low_watermark, name="embedding_queue")
+		self.dead_letter = dead_letter
+		self.max_attempts = max(1, max_attempts)
+		self.retry_base_delay = retry_base_delay
+		self.retry_max_delay = retry_max_delay
+		self.bisect_attempts = max(1, bisect_attempts)
+		self._retries_metric = metrics.EMBED_RETRIES
+		self._items_metric = metrics.STAGE_ITEMS.labels(stage="embedding")
+		self._batch_size_metric = metrics.STAGE_BATCH_SIZE.labels(stage="embedding")
+		self._batch_seconds_metric = metrics.STAGE_BATCH_SECONDS.labels(stage="embedding")
+		self._errors_metric = metrics.STAGE_ERRORS.labels(stage="embedding")
 		logger.info("[EmbeddingWorker] Initialized")
 
 	def push_batch(self, vectors: List[List[float]], docs: List[Document]) -> None:
@@ -50,6 +93,64 @@ class EmbeddingWorker:
 		logger.info("[EmbeddingWorker] Pushing batch of %d embeddings to embedding queue",len(batch_payload))
 		self.embedding_queue.push_batch(batch_payload)
 
+	def _sleep(self, seconds: float) -> None:
+		"""Sleep for a backoff delay, returning early once the worker is stopped."""
+		deadline = time.monotonic() + seconds
+		while self.running and (remaining := deadline - time.monotonic()) > 0:
+			time.sleep(min(remaining, 0.5))
+
+	def _embed_with_retries(self, group: List[Document], attempts: int) -> List[List[float]]:
+		"""Embed one request, retrying with backoff and re-raising the last error."""
+		attempt = 0
+		while True:
+			try:
+				return self.embedding_service.embed_batch(group, raise_errors=True)
+			except Exception as ex:
+				# Throttling says nothing about the chunks, it always gets the full retry budget
+				limit = max(attempts, self.max_attempts) if is_throttling_error(ex) else attempts
+				if attempt + 1 >= limit or not self.running:
+					raise
+				delay = backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay)
+				logger.warning("[EmbeddingWorker] Request of %d documents failed (attempt %d/%d), retrying in %.2fs: %s",
+				               len(group), attempt + 1, limit, delay, ex)
+				self._retries_metric.inc()
+				self._sleep(delay)
+				attempt += 1
+
+	def _embed_group(self, group: List[Document], attempts: int) -> bool:
+		"""
+		Embed one request and push its vectors, bisecting it when it keeps failing.
+
+		Returns:
+				False if some chunks were neither embedded nor dead-lettered.
+		"""
+		try:
+			vectors = self._embed_with_retries(group, attempts)
+		except Exception as ex:
+			if len(group) > 1 and self.running and not is_throttling_error(ex):
+				middle = len(group) // 2
+				logger.warning("[EmbeddingWorker] Bisecting failed request of %d documents", len(group))
+				# Evaluate both halves, a failing first half must not skip the second
+				first = self._embed_group(group[:middle], self.bisect_attempts)
+				second = self._embed_group(group[middle:], self.bisect_attempts)
+				return first and second
+
+			self._errors_metric.inc()
+			if self.dead_letter is None:
+				logger.error("[EmbeddingWorker] Embedding failed for %d documents: %s", len(group), ex)
+				return False
+			try:
+				self.dead_letter.push(group, ex, attempts)
+				return True
+			except Exception as dead_letter_error:
+				logger.exception("[EmbeddingWorker] Failed to dead-letter %d documents: %s", len(group), dead_letter_error)
+				return False
+
+		logger.info("[EmbeddingWorker] Embeddings generated, pushing batch of %d embeddings to embedding_queue", len(vectors))
+		self.push_batch(vectors, group)
+		self._items_metric.inc(len(vectors))
+		return True
+
 	def start(self) -> None:
 		"""Starts the worker thread."""
 		logger.info("[EmbeddingWorker] Starting thread")
@@ -65,23 +166,39 @@ class EmbeddingWorker:
 		logger.info("[EmbeddingWorker] Started")
 
 		while self.running:
+			if not self.backpressure.wait(lambda: self.running):
+				break
+
 			docs: List[Document] = self.document_queue.pop_batch(self.batch_size)
 
 			if docs is None:
 				logger.info("[EmbeddingWorker] All documents are now embedded, exiting...")
-				self.embedding_queue.push_batch(None)
+				self.embedding_queue.mark_producer_done(producers=self.stage_workers, consumers=self.next_stage_workers)
 				break
 
+			# pop_batch already blocked waiting for documents, so just poll again
 			if len(docs) == 0:
-				logger.info("[EmbeddingWorker] No documents available. Worker now idling for new documents")
-				time.sleep(self.sleep_timer)
+				logger.debug("[EmbeddingWorker] No documents available, waiting for new documents")
 				continue
 
-			vectors = self.embedding_service.embed_batch(docs)
-			logger.info("[EmbeddingWorker] Embeddings generated, pushing batch of %d embeddings to embedding_queue", len(vectors))
-			self.push_batch(vectors, docs)
+			started = time.perf_counter()
+			self._batch_size_metric.observe(len(docs))
+			failed_groups = 0
+			try:
+				for group in self.batch_packer.pack(docs):
+					if not self._embed_group(group, self.max_attempts):
+						failed_groups += 1
+			except QueueClosedError as ex:
+				# The pipeline is stopping, the batch stays unacknowledged
+				logger.warning("[EmbeddingWorker] %s, stopping", ex)
+				break
+			self._batch_seconds_metric.observe(time.perf_counter() - started)
 
-			logger.info("[EmbeddingWorker] Pushed a batch of embeddings, worker now idling for new documents")
-			time.sleep(self.sleep_timer)
+			# Dead-lettered chunks are kept, only a batch with lost chunks is left unacknowledged
+			# so queues that support redelivery retry it
+			if failed_groups == 0:
+				self.document_queue.ack()
 
+		if self.complete_event is not None:
+			self.complete_event.set()
 		logger.info("[EmbeddingWorker] Worker stopped cleanly")
@@ -1,13 +1,19 @@
 import logging
 import time
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from threading import Thread, Event
 from langchain_core.documents import Document
-from typing import List, Dict, Any
+from pathlib import Path
+from typing import Any, Deque, Dict, List
 
-from app.config.core import vectordb_service_config
-from app.services.queue_service import RedisBufferQueue
+from app.config.core import redis_config, vectordb_service_config
+from app.services.manifest_service import ManifestService
+from app.services.queue_protocol import QueueProtocol
+from app.services.vector_compression_service import VectorCompressionService
 from app.services.vectordb_service import VectorDBService
+from app.utils import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -18,22 +24,60 @@ class VectorDBWorker:
       1. Reading embedded documents from the embedding queue.
       2. Saving embeddings + metadata to ChromaDB.
 
+  Popped batches go into a write-behind buffer that is flushed once it holds
+  write_batch_size chunks (by default the client's max batch size) or once its
+  oldest chunk has waited write_linger seconds. Flushes run on up to `writers`
+  threads, so the next buffer fills while earlier writes are in flight. Queue
+  entries are only acknowledged after the write that contains them succeeded,
+  and the buffer is flushed before the worker exits, also on stop().
+
+  With a compression service, vectors are projected to its reduced dimension
+  right before they are written. If the projection is not fitted yet, the first
+  buffer grows to fit_sample_size chunks and the projection is fitted on it.
+  Embeddings the projection cannot reduce stop the worker on the first batch,
+  and a run that ends with fewer chunks than the projected dimension stops it
+  with the sample still buffered: nothing is written nor acknowledged, so queue
+  backends that support it redeliver the chunks.
+
+  With a manifest, a file is recorded as ingested once the write holding its
+  last chunk succeeded, so a file whose chunks were lost is ingested again by
+  the next run.
+
   Runs as a background daemon thread.
   """
 
 	def __init__(self,
-	             embedding_queue: RedisBufferQueue,
+	             embedding_queue: QueueProtocol,
 	             vectordb_service: VectorDBService,
 	             batch_size: int = vectordb_service_config.batch_size,
-	             sleep_timer: int = vectordb_service_config.sleep_timer,
-	             complete_event: Event = None) -> None:
+	             complete_event: Event = None,
+	             worker_id: int = 0,
+	             write_batch_size: int = vectordb_service_config.write_batch_size,
+	             write_linger: float = vectordb_service_config.write_linger,
+	             writers: int = vectordb_service_config.writers,
+	             compression: VectorCompressionService | None = None,
+	             manifest: ManifestService | None = None) -> None:
 		self.embedding_queue = embedding_queue
 		self.vectordb_service = vectordb_service
-		self.thread = Thread(target=self.run, daemon=True, name="VectorDBWorkerThread")
+		self.thread = Thread(target=self.run, daemon=True, name=f"VectorDBWorkerThread-{worker_id}")
 		self.running = True
 		self.batch_size = batch_size
-		self.sleep_timer = sleep_timer
 		self.complete_event = complete_event
+		self.write_batch_size = write_batch_size
+		self.write_linger = write_linger
+		self.writers = max(1, writers)
+		self.compression = compression
+		self.manifest = manifest
+		self.executor = ThreadPoolExecutor(max_workers=self.writers, thread_name_prefix=f"VectorDBWriter-{worker_id}")
+		self._in_flight: Deque[Future] = deque()
+		self._vectors: List[List[float]] = []
+		self._documents: List[Document] = []
+		self._pending: List[Any] = []
+		self._flush_deadline: float | None = None
+		self._items_metric = metrics.STAGE_ITEMS.labels(stage="vectordb")
+		self._batch_size_metric = metrics.STAGE_BATCH_SIZE.labels(stage="vectordb")
+		self._batch_seconds_metric = metrics.STAGE_BATCH_SECONDS.labels(stage="vectordb")
+		self._errors_metric = metrics.STAGE_ERRORS.labels(stage="vectordb")
 		logger.info("[VectorDBWorker] Initialized")
 
 	def start(self) -> None:
@@ -42,39 +86,117 @@ class VectorDBWorker:
 		self.thread.start()
 
 	def stop(self) -> None:
-		"""Signals the worker loop to stop."""
+		"""Signals the worker loop to stop, buffered embeddings are still written."""
 		self.running = False
 		logger.warning("[VectorDBWorker] Stop signal sent")
 
+	def _write(self, vectors: List[List[float]], documents: List[Document], pending: List[Any]) -> None:
+		"""Write one coalesced batch, then acknowledge the queue entries it came from."""
+		logger.info("[VectorDBWorker] Saving %d embeddings to ChromaDB", len(documents))
+		self._batch_size_metric.observe(len(documents))
+		started = time.perf_counter()
+		try:
+			if self.compression is not None:
+				vectors = list(self.compression.transform(vectors))
+			self.vectordb_service.save_embeddings(vectors, documents)
+		except Exception as ex:
+			# Unacknowledged entries are redelivered by queue backends that support it
+			logger.exception("[VectorDBWorker] Failed to commit embeddings: %s", ex)
+			self._errors_metric.inc()
+			return
+		for popped in pending:
+			self.embedding_queue.ack(popped)
+		if self.manifest is not None:
+			stored_files = [Path(doc.metadata["source"]) for doc in documents if doc.metadata.get("last_chunk")]
+			for file_path in stored_files:
+				self.manifest.mark_ingested(file_path)
+			if stored_files:
+				self.manifest.save()
+		self._batch_seconds_metric.observe(time.perf_counter() - started)
+		self._items_metric.inc(len(documents))
+		logger.info("[VectorDBWorker] Successfully committed %d embeddings.", len(documents))
+
+	def flush(self) -> None:
+		"""Hand the buffer to a writer thread, waiting for the oldest write if all writers are busy."""
+		if not self._documents:
+			return
+		if self.compression is not None and not self.compression.is_fitted:
+			# Raises with the buffer untouched, e.g. when the run ends before the sample is big enough
+			self.compression.fit(self._vectors)
+
+		while len(self._in_flight) >= self.writers:
+			self._in_flight.popleft().result()
+
+		self._in_flight.append(self.executor.submit(self._write, self._vectors, self._documents, self._pending))
+		self._vectors, self._documents, self._pending = [], [], []
+		self._flush_deadline = None
+
+	def drain(self) -> None:
+		"""Flush the buffer and wait until every write finished."""
+		self.flush()
+		while self._in_flight:
+			self._in_flight.popleft().result()
+
 	def run(self) -> None:
 		"""Main worker loop."""
 		logger.info("[VectorDBWorker] Started")
+		try:
+			self._consume()
+		except Exception as ex:
+			# Buffered entries are not acknowledged, queue backends that support it redeliver them
+			logger.exception("[VectorDBWorker] Stopped on error, %d buffered embeddings were not written: %s",
+			                 len(self._documents), ex)
+			self._errors_metric.inc()
+			self.executor.shutdown(wait=True)
+		if self.complete_event is not None:
+			self.complete_event.set()
+
+	def _consume(self) -> None:
+		"""Buffer and write popped embeddings until every producer finished or the worker is stopped."""
+		write_batch_size = self.write_batch_size or self.vectordb_service.max_batch_size()
+		logger.info("[VectorDBWorker] Coalescing writes up to %d chunks or %.2fs", write_batch_size, self.write_linger)
+		fit_buffer_size = write_batch_size
+		if self.compression is not None:
+			fit_buffer_size = max(write_batch_size, min(self.compression.fit_sample_size,
+			                                            self.vectordb_service.max_batch_size()))
 
 		while self.running:
-			batch: List[Dict[str, Any]] = self.embedding_queue.pop_batch(self.batch_size)
+			# Hold the first chunks back until they make a sample to fit the projection on
+			fitting = self.compression is not None and not self.compression.is_fitted
+			buffer_size = fit_buffer_size if fitting else write_batch_size
+			if fitting:
+				self._flush_deadline = None
+
+			# Do not block on the queue past the flush deadline of buffered embeddings,
+			# a zero timeout would make BLMPOP block forever
+			timeout = redis_config.pop_timeout
+			if self._flush_deadline is not None:
+				timeout = max(0.01, min(timeout, self._flush_deadline - time.monotonic()))
+			batch: List[Dict[str, Any]] | None = self.embedding_queue.pop_batch(
+				min(self.batch_size, buffer_size - len(self._documents)), timeout=timeout
+			)
 
 			if batch is None:
-				logger.info("[VectorDBWorker] All embeddings are saved, exiting...")
-				self.complete_event.set()
+				logger.info("[VectorDBWorker] All embeddings are received, exiting...")
 				break
 
-			if len(batch) == 0:
-				logger.info("[VectorDBWorker] No embedding batch available. Worker now idling for new embeddings")
-				time.sleep(self.sleep_timer)
-				continue
-
-			vectors: List[List[float]] = []
-			documents: List[Document] = []
-			for data in batch:
-				vectors.append(data['vector'])
-				documents.append(data['document'])
-
-			logger.info("[VectorDBWorker] Saving %d embeddings to ChromaDB", len(documents))
-			try:
-				self.vectordb_service.save_embeddings(vectors, documents)
-			except Exception as ex:
-				logger.exception("[VectorDBWorker] Failed to commit embeddings", ex)
-				continue
-			logger.info("[VectorDBWorker] Successfully committed %d embeddings.", len(documents))
-
-		logger.info("[VectorDBWorker] Worker stopped cleanly.")
\ No newline at end of file
+			if batch:
+				starts_buffer = not self._documents
+				for data in batch:
+					self._vectors.append(data['vector'])
+					self._documents.append(data['document'])
+				self._pending.append(self.embedding_queue.detach_pending())
+				if self.compression is not None and starts_buffer:
+					# Fail before anything is written if the projection cannot take these embeddings
+					self.compression.check_source_dimension(len(self._vectors[0]))
+			if self._documents and self._flush_deadline is None and not fitting:
+				self._flush_deadline = time.monotonic() + self.write_linger
+
+			if len(self._documents) >= buffer_size \
+					or (self._flush_deadline is not None and time.monotonic() >= self._flush_deadline):
+				self.flush()
+
+		# Write whatever is still buffered, also when stopped, so Pipeline.stop() loses nothing
+		self.drain()
+		self.executor.shutdown(wait=True)
+		logger.info("[VectorDBWorker] Worker stopped cleanly.")
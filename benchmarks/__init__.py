@@ -0,0 +1,9 @@
+"""
+Offline benchmarks for the ETL pipeline.
+
+Every benchmark runs without Mistral, Redis or a Chroma server: the corpus is
+synthetic, embeddings come from a deterministic fake model, queues are
+in-memory (or a local Redis) and Chroma runs as a local PersistentClient.
+Results are written as JSON so runs can be compared across commits with
+benchmarks/compare.py.
+"""
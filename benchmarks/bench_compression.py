@@ -0,0 +1,112 @@
+"""
+Compression benchmark: recall@k against vector size for quantization and PCA.
+
+Every combination of a quantization and a PCA dimension (0 = full vectors) is
+applied to the base vectors in pipeline order: vectors are quantized on the
+embedding queue, then projected by the VectorDB stage with a projection fitted
+on what it received. Queries stay float32 and go through the same projection
+(as VectorCompressionService.transform_query does). Neighbours are found by
+brute force on the compressed vectors and compared with the exact neighbours
+on the original float32 vectors, so the recall loss is the one of the
+compression alone, independent of any ANN index.
+
+Hashed synthetic chunks have little structure for PCA to exploit, measure the
+projection on real embeddings (--vectors-file) before enabling it.
+
+Reported per combination:
+  - queue_bytes_per_vector: size of the vector on the embedding queue, before
+    the projection
+  - stored_bytes_per_vector: size of the vector in the collection, which stores
+    float32 only, so only PCA reduces it
+  - recall_at_k and the PCA fit time and kept variance
+
+Usage:
+    python -m benchmarks.bench_compression --vectors 20000 --pca-dimensions 512,256,128 --output benchmarks/results/compression.json
+    python -m benchmarks.bench_compression --vectors-file embeddings.npy
+"""
+import argparse
+import tempfile
+
+import numpy as np
+
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import Timer, configure_offline_env, print_results, write_results
+from benchmarks.vectors import exact_top_k, load_vectors, normalize, recall_at_k
+
+configure_offline_env()
+
+from app.config.core import VectorQuantization
+from app.services.vector_compression_service import VectorCompressionService
+from app.utils import vector_quantization
+
+
+def bench_combination(base: np.ndarray,
+                      queries: np.ndarray,
+                      truth: np.ndarray,
+                      quantization: str,
+                      pca_dimension: int,
+                      fit_sample_size: int,
+                      workdir: Path) -> Dict[str, Any]:
+	received = vector_quantization.roundtrip(base, quantization)
+	results: Dict[str, Any] = {
+		"dimension": pca_dimension or base.shape[1],
+		"queue_bytes_per_vector": vector_quantization.encoded_size(base.shape[1], quantization),
+		"stored_bytes_per_vector": (pca_dimension or base.shape[1]) * vector_quantization.FLOAT32.itemsize,
+	}
+
+	if pca_dimension:
+		projection = VectorCompressionService(projection_path=workdir / f"pca_{pca_dimension}.npz",
+		                                      dimension=pca_dimension, fit_sample_size=fit_sample_size)
+		with Timer() as timer:
+			projection.fit(received[:projection.fit_sample_size], persist=False)
+		results["fit_seconds"] = round(timer.seconds, 3)
+		results["explained_variance"] = round(projection.explained_variance, 4)
+		received = projection.transform(received)
+		queries = projection.transform(queries)
+
+	found = exact_top_k(normalize(received), queries, truth.shape[1])
+	results["recall_at_k"] = round(recall_at_k(found, truth), 4)
+	return results
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Benchmark recall against size of compressed vectors")
+	parser.add_argument("--vectors", type=int, default=20_000, help="Base vectors (from the file or hashed chunks)")
+	parser.add_argument("--queries", type=int, default=500, help="Held-out vectors used as queries")
+	parser.add_argument("--vectors-file", type=Path, default=None,
+	                    help=".npy file of embeddings to use instead of hashing synthetic chunks")
+	parser.add_argument("--dimension", type=int, default=1024, help="Dimension of the hashing embedder")
+	parser.add_argument("--pca-dimensions", default="512,256,128,64",
+	                    help="Comma separated PCA dimensions, full vectors are always measured")
+	parser.add_argument("--fit-sample-size", type=int, default=2_048, help="Base vectors the projection is fitted on")
+	parser.add_argument("--k", type=int, default=10)
+	parser.add_argument("--seed", type=int, default=42)
+	parser.add_argument("--output", type=Path, default=None, help="Write JSON results to this file")
+	args = parser.parse_args()
+
+	vectors = load_vectors(args.vectors + args.queries, args.dimension, args.vectors_file, args.seed)
+	order = np.random.default_rng(args.seed).permutation(len(vectors))
+	base, queries = vectors[order[args.queries:]], vectors[order[:args.queries]]
+	truth = exact_top_k(base, queries, args.k)
+	print(f"{len(base)} base vectors, {len(queries)} queries, dimension {base.shape[1]}")
+
+	pca_dimensions: List[int] = [0] + [int(value) for value in args.pca_dimensions.split(",") if value.strip()]
+	results: Dict[str, Any] = {}
+	with tempfile.TemporaryDirectory(prefix="jarvis-compression-") as workdir:
+		for pca_dimension in pca_dimensions:
+			for quantization in VectorQuantization:
+				name = f"{quantization.value}_pca{pca_dimension}" if pca_dimension else quantization.value
+				results[name] = bench_combination(base, queries, truth, quantization, pca_dimension,
+				                                  args.fit_sample_size, Path(workdir))
+
+	print_results(results)
+	if args.output is not None:
+		params = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+		write_results(args.output, "compression", params, results)
+		print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,266 @@
+"""
+End-to-end and per-stage pipeline benchmark.
+
+Generates a synthetic corpus, then measures throughput, batch latency and peak
+RSS of each stage in isolation (split, embed, vectordb) and of the whole
+pipeline running on its worker threads. Embeddings come from a deterministic
+fake model (or the local hashing backend), Chroma runs as a local PersistentClient and queues are in-memory
+unless a Redis backend is selected.
+
+Usage:
+    python -m benchmarks.bench_pipeline --files 500 --mean-kb 32 --output benchmarks/results/pipeline.json
+    python -m benchmarks.bench_pipeline --queue redis_list --redis-url redis://localhost:6379/15
+"""
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+import uuid
+
+from pathlib import Path
+from threading import Event
+from typing import Any, Dict, List
+
+from benchmarks.common import (RSSSampler, Timer, configure_offline_env, latency_summary,
+                               peak_rss_lifetime, print_results, write_results)
+from benchmarks.corpus import add_corpus_arguments, generate_corpus
+
+configure_offline_env()
+
+from langchain_core.documents import Document
+
+from app.config.core import QueueBackend
+from app.services.document_service import DocumentService
+from app.services.embedding_service import EmbeddingService
+from app.services.hashing_embeddings import HashingEmbeddings
+from app.services.queue_factory import create_queue
+from app.services.vectordb_service import VectorDBService
+from app.utils import metrics
+from app.utils.serdes.document_serdes import DocumentSerDes
+from app.utils.serdes.embedding_serdes import EmbeddingSerDes
+from benchmarks.fake_embeddings import FakeEmbeddings
+from main import Pipeline
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("split", "embed", "vectordb", "e2e")
+STAGES = ("document", "embedding", "vectordb")
+
+
+def throughput(items: int, seconds: float) -> float | None:
+	return round(items / seconds, 2) if seconds > 0 else None
+
+
+def bench_split(corpus: Path, args: argparse.Namespace) -> tuple[Dict[str, Any], List[List[Document]]]:
+	service = DocumentService(documents_path=corpus, allowed_extensions={".txt"})
+	corpus_bytes = sum(path.stat().st_size for path in corpus.rglob("*.txt"))
+	batches: List[List[Document]] = []
+	latencies: List[float] = []
+
+	with RSSSampler() as rss, Timer() as total:
+		last = time.perf_counter()
+		for batch in service.load_and_split_batch(batch_size=args.batch_size, parallel_workers=args.parallel_workers):
+			latencies.append(time.perf_counter() - last)
+			# load_and_split_batch reuses its batch list, keep a copy for the next phases
+			batches.append(list(batch))
+			last = time.perf_counter()
+
+	chunks = sum(len(batch) for batch in batches)
+	return {
+		"chunks": chunks,
+		"seconds": round(total.seconds, 4),
+		"chunks_per_second": throughput(chunks, total.seconds),
+		"mb_per_second": throughput(corpus_bytes / 2 ** 20, total.seconds),
+		"batch_latency_ms": latency_summary(latencies),
+		**rss.result(),
+	}, batches
+
+
+def make_embedding_service(args: argparse.Namespace) -> EmbeddingService:
+	if args.embedder == "hashing":
+		return EmbeddingService(embedding_model=HashingEmbeddings(dimension=args.dimension))
+	model = FakeEmbeddings(dimension=args.dimension, latency=args.embed_latency)
+	return EmbeddingService(embedding_model=model, model_name="fake-embed")
+
+
+def bench_embed(batches: List[List[Document]], args: argparse.Namespace) -> tuple[Dict[str, Any], List[List[List[float]]]]:
+	service = make_embedding_service(args)
+	vectors: List[List[List[float]]] = []
+	latencies: List[float] = []
+
+	with RSSSampler() as rss, Timer() as total:
+		for batch in batches:
+			with Timer() as timer:
+				vectors.append(service.embed_batch(batch))
+			latencies.append(timer.seconds)
+
+	chunks = sum(len(batch) for batch in batches)
+	return {
+		"chunks": chunks,
+		"seconds": round(total.seconds, 4),
+		"chunks_per_second": throughput(chunks, total.seconds),
+		"batch_latency_ms": latency_summary(latencies),
+		**rss.result(),
+	}, vectors
+
+
+def bench_vectordb(batches: List[List[Document]],
+                   vectors: List[List[List[float]]],
+                   corpus: Path,
+                   workdir: Path) -> Dict[str, Any]:
+	service = VectorDBService(persist_directory=workdir / "db-stage", collection_name="bench_stage",
+	                          documents_path=corpus)
+	latencies: List[float] = []
+
+	with RSSSampler() as rss, Timer() as total:
+		for batch, batch_vectors in zip(batches, vectors):
+			with Timer() as timer:
+				service.save_embeddings(batch_vectors, batch)
+			latencies.append(timer.seconds)
+
+	chunks = sum(len(batch) for batch in batches)
+	return {
+		"chunks": chunks,
+		"stored": service.collection.count() if service.collection is not None else 0,
+		"seconds": round(total.seconds, 4),
+		"chunks_per_second": throughput(chunks, total.seconds),
+		"batch_latency_ms": latency_summary(latencies),
+		**rss.result(),
+	}
+
+
+def _stage_counters() -> Dict[str, Dict[str, float]]:
+	counters = {}
+	for stage in STAGES:
+		batch_seconds = metrics.STAGE_BATCH_SECONDS.labels(stage=stage)
+		counters[stage] = {
+			"items": metrics.STAGE_ITEMS.labels(stage=stage).value,
+			"busy_seconds": batch_seconds.total,
+			"batches": sum(batch_seconds.counts),
+		}
+	return counters
+
+
+def bench_end_to_end(corpus: Path, workdir: Path, args: argparse.Namespace) -> Dict[str, Any]:
+	suffix = uuid.uuid4().hex[:8]
+	backend = QueueBackend(args.queue)
+	queues = [
+		create_queue(backend=backend, queue_url=args.redis_url, queue_name=f"bench_{name}_{suffix}",
+		             group_name=f"bench_{name}_group", serdes=serdes, max_size=args.memory_max_size)
+		for name, serdes in (("documents", DocumentSerDes()), ("embeddings", EmbeddingSerDes()))
+	]
+	document_queue, embedding_queue = queues
+	vectordb_service = VectorDBService(persist_directory=workdir / "db-e2e", collection_name="bench_e2e",
+	                                   documents_path=corpus)
+
+	complete_event = Event()
+	pipeline = Pipeline(
+		document_queue=document_queue,
+		embedding_queue=embedding_queue,
+		document_service=DocumentService(documents_path=corpus, allowed_extensions={".txt"}),
+		embedding_service=make_embedding_service(args),
+		vectordb_service=vectordb_service,
+		complete_event=complete_event,
+		embedding_workers=args.embedding_workers,
+		vectordb_workers=args.vectordb_workers,
+	)
+
+	before = _stage_counters()
+	with RSSSampler() as rss, Timer() as total:
+		pipeline.start()
+		finished = complete_event.wait(args.timeout)
+	pipeline.stop()
+	after = _stage_counters()
+
+	stages: Dict[str, Any] = {}
+	for stage in STAGES:
+		items = after[stage]["items"] - before[stage]["items"]
+		busy = after[stage]["busy_seconds"] - before[stage]["busy_seconds"]
+		batches = after[stage]["batches"] - before[stage]["batches"]
+		stages[stage] = {
+			"items": int(items),
+			"busy_seconds": round(busy, 4),
+			# Throughput of one worker while busy, i.e. the stage capacity per worker
+			"busy_chunks_per_second": throughput(items, busy),
+			"mean_batch_ms": round(busy / batches * 1000, 3) if batches else None,
+		}
+
+	stored = vectordb_service.collection.count() if vectordb_service.collection is not None else 0
+	if backend != QueueBackend.MEMORY:
+		for queue in queues:
+			queue.clear()
+
+	return {
+		"completed": finished,
+		"queue": backend.value,
+		"stored": stored,
+		"seconds": round(total.seconds, 4),
+		"chunks_per_second": throughput(stored, total.seconds),
+		"stages": stages,
+		**rss.result(),
+	}
+
+
+def parse_args() -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+	add_corpus_arguments(parser)
+	parser.add_argument("--corpus", type=Path, default=None, help="Use an existing corpus instead of generating one")
+	parser.add_argument("--phases", default=",".join(PHASES), help="Comma separated phases to run: " + ", ".join(PHASES))
+	parser.add_argument("--batch-size", type=int, default=50)
+	parser.add_argument("--parallel-workers", type=int, default=0, help="DocumentService process pool size")
+	parser.add_argument("--embedder", choices=("fake", "hashing"), default="fake",
+	                    help="fake: seeded random vectors with simulated latency, hashing: the local hashing backend")
+	parser.add_argument("--dimension", type=int, default=1024, help="Dimension of the fake embeddings")
+	parser.add_argument("--embed-latency", type=float, default=0.0, help="Simulated seconds per embedding request")
+	parser.add_argument("--queue", choices=[backend.value for backend in QueueBackend], default=QueueBackend.MEMORY.value)
+	parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+	parser.add_argument("--memory-max-size", type=int, default=10_000)
+	parser.add_argument("--embedding-workers", type=int, default=1)
+	parser.add_argument("--vectordb-workers", type=int, default=1)
+	parser.add_argument("--timeout", type=float, default=3600.0, help="Maximum seconds to wait for the end-to-end run")
+	parser.add_argument("--workdir", type=Path, default=None, help="Keep corpus and databases here instead of a temp dir")
+	parser.add_argument("--output", type=Path, default=None, help="Write JSON results to this file")
+	parser.add_argument("--verbose", action="store_true")
+	return parser.parse_args()
+
+
+def main() -> None:
+	args = parse_args()
+	logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+	phases = [phase.strip() for phase in args.phases.split(",") if phase.strip()]
+
+	workdir = args.workdir or Path(tempfile.mkdtemp(prefix="jarvis-bench-"))
+	results: Dict[str, Any] = {}
+	try:
+		corpus = args.corpus
+		if corpus is None:
+			corpus = workdir / "corpus"
+			shutil.rmtree(corpus, ignore_errors=True)
+			results["corpus"] = generate_corpus(corpus, args.files, args.mean_kb, args.sigma,
+			                                    args.distribution, seed=args.seed)
+
+		batches: List[List[Document]] = []
+		vectors: List[List[List[float]]] = []
+		if {"split", "embed", "vectordb"} & set(phases):
+			results["split"], batches = bench_split(corpus, args)
+		if {"embed", "vectordb"} & set(phases):
+			results["embed"], vectors = bench_embed(batches, args)
+		if "vectordb" in phases:
+			results["vectordb"] = bench_vectordb(batches, vectors, corpus, workdir)
+		if "e2e" in phases:
+			results["e2e"] = bench_end_to_end(corpus, workdir, args)
+		results["peak_rss_mb"] = round(peak_rss_lifetime() / 2 ** 20, 2)
+	finally:
+		if args.workdir is None:
+			shutil.rmtree(workdir, ignore_errors=True)
+
+	params = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+	print_results(results)
+	if args.output is not None:
+		write_results(args.output, "pipeline", params, results)
+		print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,213 @@
+"""
+Retrieval benchmark: query latency, QPS and recall@k of a Chroma collection.
+
+Works on a collection built by VectorDBService, either an existing one
+(--collection, read only) or one built offline by this script from a documents
+directory or a synthetic corpus, chunked with --chunk-size/--chunk-overlap and
+embedded with the hashing embedder. Then:
+  - the stored vectors are read back and queries are drawn from them, moved by
+    --query-noise so a query is not simply its own nearest neighbour
+  - exact neighbours are computed by NumPy brute force in the collection's
+    distance space, which is also timed as a reference
+  - batched query workloads (--batch-sizes) run against the collection as
+    built and against copies rebuilt with alternative HNSW settings (--max-neighbors,
+    --ef-construction), sweeping ef_search on each copy
+
+Copies live in a temporary local database, the source collection is never modified.
+
+Usage:
+    python -m benchmarks.bench_retrieval --files 200 --ef-search 16,64,256 --output benchmarks/results/retrieval.json
+    python -m benchmarks.bench_retrieval --persist-directory db --collection jarvis --max-neighbors 16,32,64
+    python -m benchmarks.bench_retrieval --documents data --chunk-size 1000 --chunk-overlap 100
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import Timer, configure_offline_env, latency_summary, print_results, write_results
+from benchmarks.corpus import add_corpus_arguments, generate_corpus
+from benchmarks.vectors import exact_top_k
+
+configure_offline_env()
+
+from app.config.core import EmbeddingBackend, document_service_config
+from app.services.document_service import DocumentService
+from app.services.embedding_service import EmbeddingService
+from app.services.text_splitter import OffsetTextSplitter
+from app.services.vectordb_service import VectorDBService
+
+
+def parse_ints(value: str) -> List[int]:
+	return [int(part) for part in value.split(",") if part.strip()]
+
+
+def build_collection(documents: Path, workdir: Path, args: argparse.Namespace) -> VectorDBService:
+	"""Chunk, embed and store a documents directory the way the pipeline does, with the hashing embedder."""
+	document_service = DocumentService(documents_path=documents,
+	                                   allowed_extensions=set(document_service_config.allowed_extensions))
+	document_service.splitter = OffsetTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+	embedding_service = EmbeddingService(backend=EmbeddingBackend.HASHING)
+	vectordb_service = VectorDBService(persist_directory=workdir / "source", collection_name="bench_retrieval",
+	                                   documents_path=documents)
+
+	with Timer() as timer:
+		for batch in document_service.load_and_split_batch(batch_size=args.build_batch_size, parallel_workers=0):
+			vectordb_service.save_embeddings(embedding_service.embed_batch(batch), list(batch))
+	print(f"Built collection of {vectordb_service.collection.count()} chunks in {timer.seconds:.1f}s")
+	return vectordb_service
+
+
+def read_vectors(vectordb_service: VectorDBService) -> Tuple[List[str], np.ndarray]:
+	"""Read every stored id and vector, page by page."""
+	page_size = vectordb_service.max_batch_size()
+	ids: List[str] = []
+	pages: List[np.ndarray] = []
+	offset = 0
+	while True:
+		page = vectordb_service.collection.get(include=["embeddings"], limit=page_size, offset=offset)
+		ids.extend(page["ids"])
+		if len(page["ids"]):
+			pages.append(np.asarray(page["embeddings"], dtype=np.float32))
+		if len(page["ids"]) < page_size:
+			return ids, np.concatenate(pages)
+		offset += page_size
+
+
+def make_queries(vectors: np.ndarray, count: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+	"""Sample stored vectors and move each by `noise` times its norm in a random direction."""
+	queries = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+	directions = rng.standard_normal(queries.shape).astype(np.float32)
+	directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+	return queries + noise * np.linalg.norm(queries, axis=1, keepdims=True) * directions
+
+
+def copy_collection(client: Any, name: str, ids: List[str], vectors: np.ndarray, hnsw: Dict[str, Any]) -> Tuple[Any, float]:
+	"""Rebuild the stored vectors into a new collection with other HNSW settings, returning it and the build time."""
+	collection = client.create_collection(name, configuration={"hnsw": hnsw})
+	page_size = client.get_max_batch_size()
+	with Timer() as timer:
+		for start in range(0, len(ids), page_size):
+			collection.add(ids=ids[start:start + page_size], embeddings=vectors[start:start + page_size])
+	return collection, timer.seconds
+
+
+def run_workload(collection: Any,
+                 queries: np.ndarray,
+                 truth: List[List[str]],
+                 k: int,
+                 batch_size: int,
+                 warmup: int) -> Dict[str, Any]:
+	"""Send the queries in batches of batch_size, after `warmup` untimed batches."""
+	for start in range(0, min(warmup * batch_size, len(queries)), batch_size):
+		collection.query(query_embeddings=queries[start:start + batch_size], n_results=k, include=[])
+
+	found: List[List[str]] = []
+	latencies: List[float] = []
+	started = time.perf_counter()
+	for start in range(0, len(queries), batch_size):
+		request_started = time.perf_counter()
+		result = collection.query(query_embeddings=queries[start:start + batch_size], n_results=k, include=[])
+		latencies.append(time.perf_counter() - request_started)
+		found.extend(result["ids"])
+	seconds = time.perf_counter() - started
+
+	hits = sum(len(set(row) & set(expected)) for row, expected in zip(found, truth))
+	return {
+		"qps": round(len(queries) / seconds, 2) if seconds > 0 else None,
+		"latency_ms": latency_summary(latencies),
+		"recall_at_k": round(hits / sum(len(expected) for expected in truth), 4),
+	}
+
+
+def bench_collection(collection: Any, queries: np.ndarray, truth: List[List[str]], args: argparse.Namespace) -> Dict[str, Any]:
+	return {f"batch_{batch_size}": run_workload(collection, queries, truth, args.k, batch_size, args.warmup)
+	        for batch_size in parse_ints(args.batch_sizes)}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Benchmark query latency and recall of a Chroma collection")
+	parser.add_argument("--persist-directory", type=Path, default=None,
+	                    help="Local database of an existing collection (read only)")
+	parser.add_argument("--collection", default=None, help="Existing collection to benchmark instead of building one")
+	parser.add_argument("--documents", type=Path, default=None,
+	                    help="Documents directory to build the collection from (defaults to a synthetic corpus)")
+	parser.add_argument("--chunk-size", type=int, default=document_service_config.chunk_size)
+	parser.add_argument("--chunk-overlap", type=int, default=document_service_config.chunk_overlap)
+	parser.add_argument("--build-batch-size", type=int, default=200, help="Chunks embedded and stored per write")
+	parser.add_argument("--queries", type=int, default=500)
+	parser.add_argument("--query-noise", type=float, default=0.1,
+	                    help="Relative distance between a query and the stored vector it is drawn from")
+	parser.add_argument("--k", type=int, default=10)
+	parser.add_argument("--batch-sizes", default="1,32", help="Comma separated query batch sizes")
+	parser.add_argument("--warmup", type=int, default=5, help="Untimed batches before each workload")
+	parser.add_argument("--ef-search", default="16,64,128,256", help="Comma separated ef_search values of the rebuilt copies")
+	parser.add_argument("--max-neighbors", default="16,32", help="Comma separated HNSW M of the rebuilt copies (empty = none)")
+	parser.add_argument("--ef-construction", type=int, default=None, help="ef_construction of the copies (default: the source's)")
+	add_corpus_arguments(parser)
+	parser.add_argument("--output", type=Path, default=None, help="Write JSON results to this file")
+	args = parser.parse_args()
+
+	import chromadb
+
+	workdir = Path(tempfile.mkdtemp(prefix="jarvis-retrieval-"))
+	try:
+		if args.collection is not None:
+			source = VectorDBService(persist_directory=args.persist_directory or Path("db"), collection_name=args.collection)
+			source.check_ready()
+		else:
+			documents = args.documents
+			if documents is None:
+				documents = workdir / "corpus"
+				generate_corpus(documents, args.files, args.mean_kb, args.sigma, args.distribution, seed=args.seed)
+			source = build_collection(documents, workdir, args)
+
+		hnsw = dict(source.collection.configuration["hnsw"])
+		ids, vectors = read_vectors(source)
+		rng = np.random.default_rng(args.seed)
+		queries = make_queries(vectors, args.queries, args.query_noise, rng)
+
+		with Timer() as exact_timer:
+			exact = exact_top_k(vectors, queries, args.k, hnsw["space"])
+		truth = [[ids[index] for index in row] for row in exact.tolist()]
+
+		results: Dict[str, Any] = {
+			"collection": {"vectors": len(ids), "dimension": vectors.shape[1], "queries": len(queries),
+			               **{key: hnsw[key] for key in ("space", "max_neighbors", "ef_construction", "ef_search")}},
+			"exact": {"qps": round(len(queries) / exact_timer.seconds, 2), "recall_at_k": 1.0},
+			"as_built": bench_collection(source.collection, queries, truth, args),
+		}
+
+		client = chromadb.PersistentClient(path=workdir / "copies")
+		for max_neighbors in parse_ints(args.max_neighbors):
+			name = f"bench_m{max_neighbors}"
+			settings = {"space": hnsw["space"], "max_neighbors": max_neighbors,
+			            "ef_construction": args.ef_construction or hnsw["ef_construction"]}
+			_, build_seconds = copy_collection(client, name, ids, vectors, settings)
+			for ef_search in parse_ints(args.ef_search):
+				client.get_collection(name).modify(configuration={"hnsw": {"ef_search": ef_search}})
+				# A loaded index keeps its ef_search, reopen the database so the new one applies
+				client.clear_system_cache()
+				client = chromadb.PersistentClient(path=workdir / "copies")
+				results[f"m{max_neighbors}_ef{ef_search}"] = {
+					"build_seconds": round(build_seconds, 3),
+					**bench_collection(client.get_collection(name), queries, truth, args),
+				}
+			client.delete_collection(name)
+	finally:
+		shutil.rmtree(workdir, ignore_errors=True)
+
+	print_results(results)
+	if args.output is not None:
+		params = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+		write_results(args.output, "retrieval", params, results)
+		print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
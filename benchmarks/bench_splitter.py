@@ -0,0 +1,114 @@
+"""
+Splitter benchmark: OffsetTextSplitter against LangChain's RecursiveCharacterTextSplitter.
+
+Splits synthetic texts of increasing size with both splitters, checks that
+they produce the same chunks and reports throughput and peak RSS of each.
+"documents" times the full path used by DocumentService (chunk Documents with
+start_index/end_index metadata), "offsets" only the native offset generation.
+
+Usage:
+    python -m benchmarks.bench_splitter --sizes-mb 1,10,50 --output benchmarks/results/splitter.json
+"""
+import argparse
+import random
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import RSSSampler, Timer, configure_offline_env, print_results, write_results
+from benchmarks.corpus import build_vocabulary, generate_text
+
+configure_offline_env()
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.config.core import document_service_config
+from app.services.text_splitter import OffsetTextSplitter
+
+
+def langchain_documents(splitter: RecursiveCharacterTextSplitter, text: str) -> List[Document]:
+	chunks = splitter.split_documents([Document(page_content=text, metadata={"source": "bench.txt"})])
+	for chunk in chunks:
+		chunk.metadata["end_index"] = chunk.metadata["start_index"] + len(chunk.page_content)
+	return chunks
+
+
+def native_documents(splitter: OffsetTextSplitter, text: str) -> List[Document]:
+	return [
+		Document(page_content=text[start:end], metadata={"source": "bench.txt", "start_index": start, "end_index": end})
+		for start, end in splitter.split_offsets(text)
+	]
+
+
+def native_offsets(splitter: OffsetTextSplitter, text: str) -> List[tuple]:
+	return list(splitter.split_offsets(text))
+
+
+def measure(function: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+	"""Best wall time over `repeat` runs and the peak RSS of the first one."""
+	best = float("inf")
+	result = None
+	peak: Dict[str, float] = {}
+	for attempt in range(repeat):
+		with RSSSampler() as rss, Timer() as timer:
+			result = function()
+		best = min(best, timer.seconds)
+		if attempt == 0:
+			peak = rss.result()
+		del result
+	return {"seconds": round(best, 4), **peak}
+
+
+def bench_size(size_mb: float, args: argparse.Namespace, vocabulary: List[str], rng: random.Random) -> Dict[str, Any]:
+	text = generate_text(int(size_mb * 2 ** 20), vocabulary, rng)
+	langchain = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+	                                           add_start_index=True)
+	native = OffsetTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+
+	reference = [chunk.page_content for chunk in langchain_documents(langchain, text)]
+	identical = reference == native.split_text(text)
+	chunks = len(reference)
+	del reference
+
+	results: Dict[str, Any] = {"chunks": chunks, "identical": identical}
+	runs = {
+		"langchain_documents": lambda: langchain_documents(langchain, text),
+		"native_documents": lambda: native_documents(native, text),
+		"native_offsets": lambda: native_offsets(native, text),
+	}
+	for name, function in runs.items():
+		measured = measure(function, args.repeat)
+		measured["mb_per_second"] = round(size_mb / measured["seconds"], 2) if measured["seconds"] else None
+		results[name] = measured
+
+	baseline = results["langchain_documents"]["seconds"]
+	for name in ("native_documents", "native_offsets"):
+		seconds = results[name]["seconds"]
+		results[name]["speedup"] = round(baseline / seconds, 2) if seconds else None
+	return results
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Benchmark the native splitter against LangChain's")
+	parser.add_argument("--sizes-mb", default="1,10", help="Comma separated input sizes in MiB")
+	parser.add_argument("--chunk-size", type=int, default=document_service_config.chunk_size)
+	parser.add_argument("--chunk-overlap", type=int, default=document_service_config.chunk_overlap)
+	parser.add_argument("--repeat", type=int, default=3, help="Runs per splitter, the best time is reported")
+	parser.add_argument("--seed", type=int, default=42)
+	parser.add_argument("--output", type=Path, default=None, help="Write JSON results to this file")
+	args = parser.parse_args()
+
+	rng = random.Random(args.seed)
+	vocabulary = build_vocabulary(5000, rng)
+	results = {f"{size}mb": bench_size(float(size), args, vocabulary, rng) for size in args.sizes_mb.split(",")}
+
+	print_results(results)
+	if args.output is not None:
+		params = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+		write_results(args.output, "splitter", params, results)
+		print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+	main()
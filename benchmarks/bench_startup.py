@@ -0,0 +1,188 @@
+"""
+Startup benchmark: import time of the entry point and time to the first stored chunk.
+
+Every measurement runs in a fresh interpreter, so module caches of this process
+do not hide import costs:
+  - import: wall time of `import main` and the modules it loads. Heavy
+    dependencies (chromadb, the Mistral client, redis, ...) must only be
+    imported by the stage and backend that need them, any of them loaded by
+    `import main` is reported as an eager import
+  - pipeline: a small in-memory run with the hashing embedder, timing process
+    start to import done, to workers started (readiness checks passed), to the
+    first chunk stored and to completion
+
+Usage:
+    python -m benchmarks.bench_startup --repeat 5 --output benchmarks/results/startup.json
+    python -m benchmarks.bench_startup --fail-on-eager
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import OFFLINE_ENV, REPO_ROOT, configure_offline_env, print_results, write_results
+from benchmarks.corpus import generate_corpus
+
+# Must not be imported by `import main`, each belongs to one stage or backend
+LAZY_MODULES = ("chromadb", "langchain_mistralai", "langchain_community", "redis", "httpx", "mistralai")
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}))
+"""
+
+
+def _child_env() -> Dict[str, str]:
+	env = {**OFFLINE_ENV, **os.environ, "PYTHONPATH": str(REPO_ROOT)}
+	env.pop("PYTHONPROFILEIMPORTTIME", None)
+	return env
+
+
+def _run_child(args: List[str]) -> Dict[str, Any]:
+	output = subprocess.run([sys.executable, *args], cwd=REPO_ROOT, env=_child_env(),
+	                        capture_output=True, text=True, check=True).stdout
+	# The child prints its result as the last line, logging may precede it
+	return json.loads(output.strip().splitlines()[-1])
+
+
+def _median_ms(values: List[float]) -> float:
+	return round(statistics.median(values) * 1000, 2)
+
+
+def bench_import(repeat: int) -> Dict[str, Any]:
+	interpreter: List[float] = []
+	main_import: List[float] = []
+	modules: List[str] = []
+	for _ in range(repeat):
+		started = time.perf_counter()
+		subprocess.run([sys.executable, "-c", "pass"], cwd=REPO_ROOT, env=_child_env(), check=True)
+		interpreter.append(time.perf_counter() - started)
+
+		started = time.perf_counter()
+		probe = _run_child(["-c", IMPORT_PROBE])
+		main_import.append(time.perf_counter() - started)
+		modules = probe["modules"]
+
+	eager = sorted({name.split(".")[0] for name in modules} & set(LAZY_MODULES))
+	return {
+		"interpreter_ms": _median_ms(interpreter),
+		"import_main_ms": _median_ms(main_import),
+		# Process wall time minus a bare interpreter start, i.e. what importing main adds
+		"import_main_net_ms": round(_median_ms(main_import) - _median_ms(interpreter), 2),
+		"modules_loaded": len(modules),
+		"eager_imports": len(eager),
+		"eager_modules": ", ".join(eager),
+	}
+
+
+def run_pipeline_child(corpus: Path, workdir: Path) -> None:
+	"""Child side of bench_pipeline_startup, prints the wall-clock time of each milestone."""
+	configure_offline_env()
+	from threading import Event
+
+	from main import Pipeline
+	from app.config.core import EmbeddingBackend, QueueBackend
+	from app.services.document_service import DocumentService
+	from app.services.embedding_service import EmbeddingService
+	from app.services.queue_factory import create_queue
+	from app.services.vectordb_service import VectorDBService
+	from app.utils.serdes.document_serdes import DocumentSerDes
+	from app.utils.serdes.embedding_serdes import EmbeddingSerDes
+
+	events: Dict[str, float] = {"imported": time.time()}
+	vectordb_service = VectorDBService(persist_directory=workdir / "db", collection_name="bench_startup",
+	                                   documents_path=corpus)
+	save_embeddings = vectordb_service.save_embeddings
+
+	def timed_save(*args, **kwargs):
+		save_embeddings(*args, **kwargs)
+		events.setdefault("first_stored", time.time())
+
+	vectordb_service.save_embeddings = timed_save
+
+	complete_event = Event()
+	pipeline = Pipeline(
+		document_queue=create_queue(backend=QueueBackend.MEMORY, queue_url="", queue_name="documents",
+		                            group_name="", serdes=DocumentSerDes()),
+		embedding_queue=create_queue(backend=QueueBackend.MEMORY, queue_url="", queue_name="embeddings",
+		                             group_name="", serdes=EmbeddingSerDes()),
+		document_service=DocumentService(documents_path=corpus, allowed_extensions={".txt"}),
+		embedding_service=EmbeddingService(backend=EmbeddingBackend.HASHING),
+		vectordb_service=vectordb_service,
+		complete_event=complete_event,
+	)
+	pipeline.start()
+	events["started"] = time.time()
+	events["completed"] = time.time() if complete_event.wait(600) else None
+	pipeline.stop()
+	events["stored"] = vectordb_service.collection.count()
+	print(json.dumps(events))
+
+
+def bench_pipeline_startup(repeat: int, files: int, workdir: Path) -> Dict[str, Any]:
+	corpus = workdir / "corpus"
+	generate_corpus(corpus, files=files, mean_kb=4.0, seed=42)
+
+	samples: Dict[str, List[float]] = {"import": [], "workers_started": [], "first_chunk_stored": [], "completed": []}
+	stored = 0
+	for attempt in range(repeat):
+		run_dir = workdir / f"run-{attempt}"
+		spawned = time.time()
+		events = _run_child(["-m", "benchmarks.bench_startup", "--child-pipeline", str(corpus), "--workdir", str(run_dir)])
+		samples["import"].append(events["imported"] - spawned)
+		samples["workers_started"].append(events["started"] - spawned)
+		samples["first_chunk_stored"].append(events.get("first_stored", events["completed"]) - spawned)
+		samples["completed"].append(events["completed"] - spawned)
+		stored = events["stored"]
+		shutil.rmtree(run_dir, ignore_errors=True)
+
+	return {"stored": stored, **{f"{name}_ms": _median_ms(values) for name, values in samples.items()}}
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Benchmark import time and pipeline cold start")
+	parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per measurement, the median is reported")
+	parser.add_argument("--files", type=int, default=20, help="Files in the corpus of the pipeline run")
+	parser.add_argument("--fail-on-eager", action="store_true",
+	                    help="Exit with status 1 if `import main` loads a stage-specific dependency")
+	parser.add_argument("--output", type=Path, default=None, help="Write JSON results to this file")
+	parser.add_argument("--workdir", type=Path, default=None, help=argparse.SUPPRESS)
+	parser.add_argument("--child-pipeline", type=Path, default=None, help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.child_pipeline is not None:
+		run_pipeline_child(args.child_pipeline, args.workdir)
+		return
+
+	workdir = Path(tempfile.mkdtemp(prefix="jarvis-startup-"))
+	try:
+		results = {
+			"import": bench_import(args.repeat),
+			"pipeline": bench_pipeline_startup(args.repeat, args.files, workdir),
+		}
+	finally:
+		shutil.rmtree(workdir, ignore_errors=True)
+
+	print_results(results)
+	if args.output is not None:
+		params = {key: (str(value) if isinstance(value, Path) else value) for key, value in vars(args).items()}
+		write_results(args.output, "startup", params, results)
+		print(f"Results written to {args.output}")
+
+	if args.fail_on_eager and results["import"]["eager_imports"]:
+		print(f"Eagerly imported by main: {results['import']['eager_modules']}", file=sys.stderr)
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,171 @@
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Sequence
+
+# Placeholder settings so the app config loads without a .env file; nothing here is contacted
+OFFLINE_ENV = {
+	"MISTRAL_API_KEY": "offline-benchmark",
+	"MISTRAL_MODEL_EMBED_NAME": "fake-embed",
+	"DOCUMENT_QUEUE_URL": "redis://localhost:6379/0",
+	"EMBEDDING_QUEUE_URL": "redis://localhost:6379/0",
+	"VECTORDB_DIR": "benchmarks/.db",
+	"VECTORDB_HOST": "localhost",
+	"VECTORDB_PORT": "8000",
+	"VECTORDB_COLLECTION_NAME": "benchmark",
+}
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def configure_offline_env() -> None:
+	"""Fill in the settings the app requires, must run before any `app` import."""
+	for name, value in OFFLINE_ENV.items():
+		os.environ.setdefault(name, value)
+	if str(REPO_ROOT) not in sys.path:
+		sys.path.insert(0, str(REPO_ROOT))
+
+
+def _current_rss() -> int:
+	"""Resident set size of this process in bytes, 0 where /proc is unavailable."""
+	try:
+		with open("/proc/self/statm", "r") as f:
+			return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+	except (OSError, ValueError, IndexError):
+		return 0
+
+
+def peak_rss_lifetime() -> int:
+	"""Peak RSS of the whole process in bytes, as reported by getrusage."""
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RSSSampler:
+	"""
+	Samples the RSS on a background thread to report the peak of one phase.
+
+	getrusage only knows the peak of the whole process, which hides the peak of
+	a phase that runs after a hungrier one.
+	"""
+
+	def __init__(self, interval: float = 0.01) -> None:
+		self.interval = interval
+		self.baseline = 0
+		self.peak = 0
+		self._stop = threading.Event()
+		self._thread = threading.Thread(target=self._run, daemon=True, name="RSSSamplerThread")
+
+	def _run(self) -> None:
+		while not self._stop.wait(self.interval):
+			self.peak = max(self.peak, _current_rss())
+
+	def __enter__(self) -> "RSSSampler":
+		self.baseline = self.peak = _current_rss()
+		self._thread.start()
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self._stop.set()
+		self._thread.join()
+		self.peak = max(self.peak, _current_rss())
+
+	def result(self) -> Dict[str, float]:
+		return {
+			"peak_rss_mb": round(self.peak / 2 ** 20, 2),
+			"peak_rss_delta_mb": round((self.peak - self.baseline) / 2 ** 20, 2),
+		}
+
+
+class Timer:
+	"""Wall-clock timer usable as a context manager."""
+
+	def __enter__(self) -> "Timer":
+		self.started = time.perf_counter()
+		self.seconds = 0.0
+		return self
+
+	def __exit__(self, *exc_info) -> None:
+		self.seconds = time.perf_counter() - self.started
+
+
+def percentiles(values: Sequence[float], points: Sequence[int] = (50, 95, 99)) -> Dict[str, float | None]:
+	"""Nearest-rank percentiles of values, in the same unit."""
+	if not values:
+		return {f"p{point}": None for point in points}
+	ordered = sorted(values)
+	result = {}
+	for point in points:
+		rank = max(0, min(len(ordered) - 1, int(round(point / 100 * len(ordered) + 0.5)) - 1))
+		result[f"p{point}"] = ordered[rank]
+	return result
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float | None]:
+	"""Mean and percentiles of latencies, in milliseconds."""
+	summary = {name: (None if value is None else round(value * 1000, 3))
+	           for name, value in percentiles(seconds).items()}
+	summary["mean"] = round(sum(seconds) / len(seconds) * 1000, 3) if seconds else None
+	return summary
+
+
+def git_revision() -> Dict[str, Any]:
+	"""Commit and dirty flag of the working tree, so results can be traced to code."""
+	def run(*args: str) -> str:
+		return subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+
+	try:
+		return {"commit": run("rev-parse", "HEAD"), "dirty": bool(run("status", "--porcelain", "--untracked-files=no"))}
+	except (OSError, subprocess.CalledProcessError):
+		return {"commit": None, "dirty": None}
+
+
+def write_results(output: Path, benchmark: str, params: Dict[str, Any], results: Dict[str, Any]) -> Dict[str, Any]:
+	"""Write benchmark results with enough context to compare them across commits."""
+	document = {
+		"benchmark": benchmark,
+		"created_at": datetime.now(timezone.utc).isoformat(),
+		"git": git_revision(),
+		"environment": {
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"cpu_count": os.cpu_count(),
+		},
+		"params": params,
+		"results": results,
+	}
+	output.parent.mkdir(parents=True, exist_ok=True)
+	with open(output, "w", encoding="utf-8") as f:
+		json.dump(document, f, indent=2, default=str)
+	return document
+
+
+def print_results(results: Dict[str, Any], prefix: str = "") -> None:
+	"""Print nested results as aligned `key: value` lines."""
+	for key, value in results.items():
+		if isinstance(value, dict):
+			print(f"{prefix}{key}:")
+			print_results(value, prefix + "  ")
+		else:
+			print(f"{prefix}{key}: {value}")
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+	"""Flatten nested results into dotted keys."""
+	flat: Dict[str, Any] = {}
+	for key, value in results.items():
+		name = f"{prefix}{key}"
+		if isinstance(value, dict):
+			flat.update(flatten(value, name + "."))
+		else:
+			flat[name] = value
+	return flat
+
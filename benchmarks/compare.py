@@ -0,0 +1,75 @@
+"""
+Compare two benchmark result files, e.g. from two commits.
+
+Prints every numeric metric present in both files with its relative change.
+Metrics whose name says higher is better (throughput, recall, QPS) are flagged
+as regressions when they drop, all others (seconds, latency, RSS, bytes) when
+they grow. Exits with status 1 if any regression exceeds --fail-above percent.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json --fail-above 10
+"""
+import argparse
+import json
+import sys
+
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.common import flatten
+
+HIGHER_IS_BETTER = ("per_second", "qps", "recall", "speedup", "stored", "completed", "hit_rate")
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+	with open(path, "r", encoding="utf-8") as f:
+		document = json.load(f)
+	return flatten(document.get("results", {}))
+
+
+def is_higher_better(name: str) -> bool:
+	return any(token in name for token in HIGHER_IS_BETTER)
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> List[Tuple[str, float, float, float | None, bool]]:
+	"""Return (name, baseline, candidate, change in percent, is regression) per shared numeric metric."""
+	rows = []
+	for name in sorted(baseline.keys() & candidate.keys()):
+		old, new = baseline[name], candidate[name]
+		if isinstance(old, bool) or isinstance(new, bool):
+			continue
+		if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+			continue
+		change = (new - old) / abs(old) * 100 if old else None
+		worse = change is not None and (change < 0 if is_higher_better(name) else change > 0)
+		rows.append((name, old, new, change, worse))
+	return rows
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+	parser.add_argument("baseline", type=Path)
+	parser.add_argument("candidate", type=Path)
+	parser.add_argument("--fail-above", type=float, default=None,
+	                    help="Exit with status 1 if a metric regressed by more than this many percent")
+	parser.add_argument("--filter", default="", help="Only show metrics whose name contains this text")
+	args = parser.parse_args()
+
+	rows = [row for row in compare(load_results(args.baseline), load_results(args.candidate)) if args.filter in row[0]]
+	width = max((len(row[0]) for row in rows), default=10)
+	print(f"{'metric':<{width}}  {'baseline':>14}  {'candidate':>14}  {'change':>9}")
+	failed = []
+	for name, old, new, change, worse in rows:
+		change_text = "n/a" if change is None else f"{change:+.1f}%"
+		marker = "  worse" if worse and abs(change) >= 1 else ""
+		print(f"{name:<{width}}  {old:>14.4g}  {new:>14.4g}  {change_text:>9}{marker}")
+		if worse and args.fail_above is not None and abs(change) > args.fail_above:
+			failed.append(name)
+
+	if failed:
+		print(f"\n{len(failed)} metrics regressed by more than {args.fail_above}%: {', '.join(failed)}")
+		sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,125 @@
+"""
+Synthetic corpus generator.
+
+Writes files of pseudo-English text under category directories, with file
+sizes drawn from a log-normal (default), uniform or fixed distribution. The
+same seed always produces the same corpus.
+
+Usage:
+    python -m benchmarks.corpus --output /tmp/corpus --files 500 --mean-kb 32
+"""
+import argparse
+import json
+import math
+import random
+
+from pathlib import Path
+from typing import Dict, List
+
+CATEGORIES = ("notes", "projects", "articles", "journal", "research")
+DISTRIBUTIONS = ("lognormal", "uniform", "fixed")
+
+_SYLLABLES = ("ka", "lo", "mi", "ren", "sa", "to", "vi", "del", "or", "an", "tri", "qua", "es", "ul", "po", "ne")
+
+
+def build_vocabulary(size: int, rng: random.Random) -> List[str]:
+	"""Return `size` distinct pseudo-words of 1 to 4 syllables."""
+	words = set()
+	while len(words) < size:
+		words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))))
+	return sorted(words)
+
+
+def file_size_bytes(distribution: str, mean_kb: float, sigma: float, rng: random.Random) -> int:
+	"""Draw one file size in bytes from the chosen distribution with the given mean."""
+	mean = mean_kb * 1024
+	if distribution == "fixed":
+		return int(mean)
+	if distribution == "uniform":
+		return int(rng.uniform(0, 2 * mean)) + 1
+	# Log-normal with the requested mean: E[X] = exp(mu + sigma^2 / 2)
+	mu = math.log(mean) - sigma ** 2 / 2
+	return int(rng.lognormvariate(mu, sigma)) + 1
+
+
+def generate_text(size: int, vocabulary: List[str], rng: random.Random) -> str:
+	"""Generate roughly `size` characters of sentences grouped into paragraphs."""
+	# Zipf-like word frequencies, as in natural text
+	weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+	parts: List[str] = []
+	length = 0
+	while length < size:
+		sentence_words = rng.choices(vocabulary, weights=weights, k=rng.randint(6, 24))
+		sentence = " ".join(sentence_words).capitalize() + ". "
+		if rng.random() < 0.15:
+			sentence += "\n\n"
+		parts.append(sentence)
+		length += len(sentence)
+	return "".join(parts)[:size]
+
+
+def generate_corpus(output: Path,
+                    files: int = 200,
+                    mean_kb: float = 16.0,
+                    sigma: float = 1.0,
+                    distribution: str = "lognormal",
+                    extension: str = ".txt",
+                    vocabulary_size: int = 5000,
+                    seed: int = 42) -> Dict[str, float]:
+	"""
+	Generate a synthetic corpus under `output`.
+
+	Args:
+	    output: Root directory, files are written to output/<category>/doc_<n><extension>
+	    files: Number of files
+	    mean_kb: Mean file size in KiB
+	    sigma: Shape of the log-normal distribution (ignored otherwise)
+	    distribution: One of DISTRIBUTIONS
+	    extension: File extension, must be an allowed extension of DocumentService
+	    vocabulary_size: Number of distinct words
+	    seed: Random seed, the same seed yields the same corpus
+
+	Returns:
+	    Summary of the generated corpus.
+	"""
+	if distribution not in DISTRIBUTIONS:
+		raise ValueError(f"invalid distribution: {distribution}")
+
+	rng = random.Random(seed)
+	vocabulary = build_vocabulary(vocabulary_size, rng)
+	sizes: List[int] = []
+	for index in range(files):
+		directory = output / CATEGORIES[index % len(CATEGORIES)]
+		directory.mkdir(parents=True, exist_ok=True)
+		size = file_size_bytes(distribution, mean_kb, sigma, rng)
+		(directory / f"doc_{index:06d}{extension}").write_text(generate_text(size, vocabulary, rng), encoding="utf-8")
+		sizes.append(size)
+
+	sizes.sort()
+	return {
+		"files": files,
+		"total_mb": round(sum(sizes) / 2 ** 20, 3),
+		"min_kb": round(sizes[0] / 1024, 2) if sizes else 0,
+		"median_kb": round(sizes[len(sizes) // 2] / 1024, 2) if sizes else 0,
+		"max_kb": round(sizes[-1] / 1024, 2) if sizes else 0,
+	}
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser) -> None:
+	"""Corpus options shared by the benchmark scripts."""
+	parser.add_argument("--files", type=int, default=200, help="Number of files in the corpus")
+	parser.add_argument("--mean-kb", type=float, default=16.0, help="Mean file size in KiB")
+	parser.add_argument("--sigma", type=float, default=1.0, help="Log-normal shape of the file size distribution")
+	parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="lognormal")
+	parser.add_argument("--seed", type=int, default=42)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Generate a synthetic document corpus")
+	parser.add_argument("--output", type=Path, required=True)
+	parser.add_argument("--extension", default=".txt")
+	add_corpus_arguments(parser)
+	args = parser.parse_args()
+	summary = generate_corpus(args.output, args.files, args.mean_kb, args.sigma, args.distribution,
+	                          args.extension, seed=args.seed)
+	print(json.dumps(summary, indent=2))
@@ -0,0 +1,40 @@
+import hashlib
+import time
+
+from typing import List
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+
+class FakeEmbeddings(Embeddings):
+	"""
+	Deterministic stand-in for the Mistral embedding model.
+
+	Each text maps to a fixed pseudo-random unit vector seeded by its sha256, so
+	runs are reproducible and identical texts get identical vectors. An optional
+	per-request latency (plus per-text cost) simulates the remote API.
+	"""
+
+	def __init__(self, dimension: int = 1024, latency: float = 0.0, per_text_latency: float = 0.0) -> None:
+		self.dimension = dimension
+		self.latency = latency
+		self.per_text_latency = per_text_latency
+		self.requests = 0
+
+	def _vector(self, text: str) -> List[float]:
+		seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+		vector = np.random.default_rng(seed).standard_normal(self.dimension, dtype=np.float32)
+		vector /= np.linalg.norm(vector) or 1.0
+		return vector.tolist()
+
+	def embed_documents(self, texts: List[str]) -> List[List[float]]:
+		self.requests += 1
+		delay = self.latency + self.per_text_latency * len(texts)
+		if delay > 0:
+			time.sleep(delay)
+		return [self._vector(text) for text in texts]
+
+	def embed_query(self, text: str) -> List[float]:
+		return self.embed_documents([text])[0]
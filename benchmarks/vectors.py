@@ -0,0 +1,92 @@
+"""
+Embedding sets and exact nearest neighbours for the vector benchmarks.
+
+Vectors either come from a .npy file (e.g. real embeddings exported from a
+collection) or are computed with the hashing embedder over synthetic chunks,
+which needs no network. Ground truth is a NumPy brute-force search in the
+distance space of the collection.
+"""
+import random
+
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from benchmarks.corpus import build_vocabulary, generate_text
+
+# Queries are scored against the base in blocks, bounding the (queries x base) score matrix
+SCORE_BLOCK_SIZE = 256
+SPACES = ("cosine", "l2", "ip")
+
+
+def synthetic_chunks(count: int, chunk_size: int = 500, vocabulary_size: int = 5000, seed: int = 42) -> List[str]:
+	"""Generate `count` chunk-sized texts from the synthetic corpus vocabulary."""
+	rng = random.Random(seed)
+	vocabulary = build_vocabulary(vocabulary_size, rng)
+	return [generate_text(chunk_size, vocabulary, rng) for _ in range(count)]
+
+
+def load_vectors(count: int, dimension: int = 1024, vectors_path: Path | None = None, seed: int = 42) -> np.ndarray:
+	"""
+	Load or compute `count` L2-normalized float32 embeddings.
+
+	Args:
+	    count: Number of vectors, a file with fewer vectors is used entirely
+	    dimension: Dimension of the hashing embedder (ignored for files)
+	    vectors_path: .npy file of shape (n, dimension) to read instead
+	    seed: Seed of the synthetic chunks
+	"""
+	if vectors_path is not None:
+		vectors = np.load(vectors_path)[:count].astype(np.float32)
+	else:
+		from app.services.hashing_embeddings import HashingEmbeddings
+
+		vectors = np.asarray(HashingEmbeddings(dimension=dimension).embed_documents(synthetic_chunks(count, seed=seed)),
+		                     dtype=np.float32)
+	return normalize(vectors)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+	norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+	norms[norms == 0] = 1.0
+	return (vectors / norms).astype(np.float32)
+
+
+def exact_top_k(base: np.ndarray, queries: np.ndarray, k: int, space: str = "cosine") -> np.ndarray:
+	"""
+	Brute-force k nearest neighbours.
+
+	Args:
+	    base: (n, dimension) vectors
+	    queries: (q, dimension) vectors
+	    k: Neighbours per query
+	    space: Distance of the collection, one of Chroma's hnsw spaces (cosine, l2, ip)
+
+	Returns:
+	    (q, k) indices into base, nearest first.
+	"""
+	if space not in SPACES:
+		raise ValueError(f"invalid space: {space}")
+	if space == "cosine":
+		base, queries = normalize(base), normalize(queries)
+	# Ranking by q.b - |b|^2 / 2 is ranking by the negated squared L2 distance
+	offsets = 0.5 * np.einsum("ij,ij->i", base, base) if space == "l2" else None
+
+	k = min(k, len(base))
+	neighbours = np.empty((len(queries), k), dtype=np.int64)
+	for start in range(0, len(queries), SCORE_BLOCK_SIZE):
+		scores = queries[start:start + SCORE_BLOCK_SIZE] @ base.T
+		if offsets is not None:
+			scores -= offsets
+		top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+		order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+		neighbours[start:start + SCORE_BLOCK_SIZE] = np.take_along_axis(top, order, axis=1)
+	return neighbours
+
+
+def recall_at_k(found: np.ndarray | List[List[int]], truth: np.ndarray) -> float:
+	"""Mean fraction of the true k nearest neighbours present in the k results of each query."""
+	k = truth.shape[1]
+	hits = sum(len(set(row[:k]) & set(expected)) for row, expected in zip(found, truth.tolist()))
+	return hits / truth.size if truth.size else 0.0
@@ -1,21 +1,47 @@
+import argparse
 import logging
-import time
 
 from threading import Event
+from typing import Callable, Dict, Iterable, List
 
 from app.config.settings import settings
 from app.config.core import (document_service_config,
                              vectordb_service_config,
+                             vector_compression_config,
                              document_queue_config,
                              embedding_queue_config,
-                             pipeline_config)
+                             dead_letter_queue_config,
+                             manifest_config,
+                             sync_config,
+                             embedding_cache_config,
+                             dedup_config,
+                             embedding_service_config,
+                             pipeline_config,
+                             watcher_config,
+                             metrics_config,
+                             DedupMode,
+                             PipelineStage,
+                             QueueBackend,
+                             VectorQuantization)
 from app.config.logging_config import configure_logging
 
 from app.services.document_service import DocumentService
+from app.services.dead_letter_service import DeadLetterService
+from app.services.dedup_service import DedupService
+from app.services.embedding_cache_service import EmbeddingCacheService
+from app.services.embedding_factory import get_embedding_model_name
 from app.services.embedding_service import EmbeddingService
-from app.services.queue_service import RedisBufferQueue
+from app.services.manifest_service import ManifestService
+from app.services.sync_service import SyncService
+from app.services.queue_factory import create_queue
+from app.services.queue_protocol import QueueProtocol
+from app.services.vector_compression_service import VectorCompressionService
 from app.services.vectordb_service import VectorDBService
+from app.services.watcher_service import WatcherService
 
+from app.utils.countdown_event import CountdownEvent
+from app.utils.metrics import MetricsSnapshotWriter, start_metrics_server
+from app.utils.readiness import wait_until_ready
 from app.utils.serdes.document_serdes import DocumentSerDes
 from app.utils.serdes.embedding_serdes import EmbeddingSerDes
 
@@ -30,36 +56,114 @@ class Pipeline:
   Coordinates and runs all ETL pipeline workers.
 
   - DocumentWorker: reads files → chunks → pushes into document_queue
-  - EmbeddingWorker: pulls chunks from document_queue → embeds → pushes into embedding_queue
-  - VectorDBWorker: pulls embedded vectors → stores in Vector DB
+  - EmbeddingWorker(s): pull chunks from document_queue → embed → push into embedding_queue
+  - VectorDBWorker(s): pull embedded vectors → store in Vector DB
+
+  Each process runs the workers of its own `stages`, so stages can be scaled out over
+  several processes or hosts. The embedding/vectordb worker counts are totals across
+  all of them and drive the queue completion barriers.
   """
 
 	def __init__(self,
-	             document_queue: RedisBufferQueue,
-	             embedding_queue: RedisBufferQueue,
-	             document_service: DocumentService,
-	             embedding_service: EmbeddingService,
-	             vectordb_service: VectorDBService,
-	             complete_event: Event):
+	             document_queue: QueueProtocol,
+	             embedding_queue: QueueProtocol,
+	             document_service: DocumentService | None,
+	             embedding_service: EmbeddingService | None,
+	             vectordb_service: VectorDBService | None,
+	             complete_event: Event,
+	             manifest: ManifestService | None = None,
+	             watcher: WatcherService | None = None,
+	             dedup: DedupService | None = None,
+	             sync: SyncService | None = None,
+	             dead_letter: DeadLetterService | None = None,
+	             replay_dead_letters: bool = False,
+	             compression: VectorCompressionService | None = None,
+	             stages: Iterable[str] = pipeline_config.stages,
+	             embedding_workers: int = pipeline_config.embedding_workers,
+	             vectordb_workers: int = pipeline_config.vectordb_workers,
+	             local_workers: int | None = None,
+	             readiness_timeout: float = pipeline_config.readiness_timeout):
 		logger.info("[Pipeline] Initializing ETL Pipeline...")
-		self.document_worker = DocumentWorker(document_queue, document_service)
-		self.embedding_worker = EmbeddingWorker(document_queue, embedding_queue, embedding_service)
-		self.vectordb_worker = VectorDBWorker(embedding_queue, vectordb_service, complete_event=complete_event)
-		self.workers = [
-			self.document_worker,
-			self.embedding_worker,
-			self.vectordb_worker
-		]
+		self.stages = set(stages)
+		self.document_queue = document_queue
+		self.embedding_queue = embedding_queue
 		self.complete_event = complete_event
-		logger.info("[Pipeline] ETL Pipeline initialized with 3 workers")
+		self.readiness_timeout = readiness_timeout
+		self.dead_letter = dead_letter
+		self.replay_dead_letters = replay_dead_letters
+
+		# Dependencies that must answer before any worker starts
+		self.readiness_checks: Dict[str, Callable[[], None]] = {
+			"document_queue": document_queue.check_ready,
+			"embedding_queue": embedding_queue.check_ready,
+		}
+		if PipelineStage.VECTORDB in self.stages:
+			self.readiness_checks["vectordb"] = vectordb_service.check_ready
+		elif sync is not None:
+			self.readiness_checks["vectordb"] = sync.vectordb_service.check_ready
+		if dead_letter is not None:
+			self.readiness_checks["dead_letter_queue"] = dead_letter.queue.check_ready
+
+		local_embedding_workers = embedding_workers if local_workers is None else local_workers
+		local_vectordb_workers = vectordb_workers if local_workers is None else local_workers
+		worker_counts = {
+			PipelineStage.DOCUMENT: 1,
+			PipelineStage.EMBEDDING: local_embedding_workers,
+			PipelineStage.VECTORDB: local_vectordb_workers,
+		}
+
+		# complete_event is set once every local worker has exited, i.e. once every stage drained
+		workers_done = CountdownEvent(sum(worker_counts[stage] for stage in self.stages), complete_event)
+
+		self.workers = []
+		if PipelineStage.DOCUMENT in self.stages:
+			self.workers.append(DocumentWorker(document_queue, document_service, manifest=manifest,
+			                                   next_stage_workers=embedding_workers,
+			                                   complete_event=workers_done,
+			                                   watcher=watcher,
+			                                   dedup=dedup,
+			                                   sync=sync,
+			                                   # Without local VectorDB workers no write can be confirmed
+			                                   confirm_on_push=PipelineStage.VECTORDB not in self.stages))
+
+		if PipelineStage.EMBEDDING in self.stages:
+			for worker_id in range(local_embedding_workers):
+				self.workers.append(EmbeddingWorker(document_queue, embedding_queue, embedding_service,
+				                                    worker_id=worker_id,
+				                                    stage_workers=embedding_workers,
+				                                    next_stage_workers=vectordb_workers,
+				                                    complete_event=workers_done,
+				                                    dead_letter=dead_letter))
+
+		if PipelineStage.VECTORDB in self.stages:
+			for worker_id in range(local_vectordb_workers):
+				self.workers.append(VectorDBWorker(embedding_queue, vectordb_service,
+				                                   complete_event=workers_done,
+				                                   worker_id=worker_id,
+				                                   compression=compression,
+				                                   manifest=manifest))
+
+		logger.info("[Pipeline] ETL Pipeline initialized with %d workers for stages %s",
+		            len(self.workers), ", ".join(sorted(self.stages)))
 
 	def start(self) -> None:
-		"""Start all workers."""
+		"""Start all workers once their dependencies are ready."""
+		logger.info("[Pipeline] Waiting for %s...", ", ".join(self.readiness_checks))
+		wait_until_ready(self.readiness_checks, timeout=self.readiness_timeout)
+
+		if self.replay_dead_letters and self.dead_letter is not None:
+			# Replayed chunks are queued ahead of this run's documents and embedded with them
+			self.dead_letter.replay(self.document_queue)
+
 		logger.info("[Pipeline] Starting all workers...")
+		if PipelineStage.DOCUMENT in self.stages:
+			# The document stage starts a new run, so forget producers that finished in a previous one
+			self.document_queue.reset_completion()
+			self.embedding_queue.reset_completion()
+
 		for worker in self.workers:
 			worker.start()
-			logger.info(f"[Pipeline] Started worker: {worker.__class__.__name__}")
-			time.sleep(pipeline_config.worker_delay)
+			logger.info(f"[Pipeline] Started worker: {worker.thread.name}")
 
 		logger.info("[Pipeline] All workers are now running.")
 
@@ -72,40 +176,130 @@ class Pipeline:
 		# 1. Signal all workers to stop
 		for worker in self.workers:
 			worker.stop()
+		# Producers blocked on a full in-memory queue would never see the stop signal
+		self.document_queue.close()
+		self.embedding_queue.close()
 
 		# 2. Join (wait for) all worker threads to finish their current job and exit
 		for worker in self.workers:
+			# Workers never started when a readiness check failed
+			if worker.thread.ident is None:
+				continue
 			worker.thread.join()
-			logger.info(f"[Pipeline] Worker stopped: {worker.__class__.__name__}")
+			logger.info(f"[Pipeline] Worker stopped: {worker.thread.name}")
 
 		logger.info("[Pipeline] All workers have successfully stopped.")
 
+def parse_args() -> argparse.Namespace:
+	parser = argparse.ArgumentParser(description="Jarvis ETL Pipeline")
+	parser.add_argument("--stages", default=",".join(stage.value for stage in pipeline_config.stages),
+	                    help="Comma separated stages run by this process (document, embedding, vectordb)")
+	parser.add_argument("--embedding-workers", type=int, default=pipeline_config.embedding_workers,
+	                    help="Total number of embedding workers across all processes")
+	parser.add_argument("--vectordb-workers", type=int, default=pipeline_config.vectordb_workers,
+	                    help="Total number of vectordb workers across all processes")
+	parser.add_argument("--local-workers", type=int, default=None,
+	                    help="Workers this process runs per consumer stage (defaults to the stage total)")
+	parser.add_argument("--queue-backend", default=pipeline_config.queue_backend.value,
+	                    choices=[backend.value for backend in QueueBackend],
+	                    help="Queue backend between stages (memory requires every stage in this process)")
+	parser.add_argument("--embedding-backend", default=embedding_service_config.backend,
+	                    help="Embedding backend of the embedding stage (mistral, hashing or a registered name)")
+	parser.add_argument("--metrics-port", type=int, default=metrics_config.port,
+	                    help="Port of the local /metrics endpoint, 0 disables it (one per process on a host)")
+	parser.add_argument("--dedup", default=dedup_config.mode if dedup_config.enabled else None,
+	                    choices=[mode.value for mode in DedupMode],
+	                    help="Drop near-duplicate chunks or link them to their canonical chunk (off by default)")
+	parser.add_argument("--sync", action="store_true", default=sync_config.enabled,
+	                    help="Delete chunks of removed files and move chunks of renamed files before ingesting")
+	parser.add_argument("--replay-dlq", action="store_true",
+	                    help="Move chunks from the dead-letter queue back to the document queue before starting")
+	parser.add_argument("--quantization", default=vector_compression_config.quantization.value,
+	                    choices=[quantization.value for quantization in VectorQuantization],
+	                    help="Encoding of the vectors on the embedding queue (float16/int8 are lossy but smaller)")
+	parser.add_argument("--pca-dimension", type=int, default=vector_compression_config.pca_dimension,
+	                    help="Reduce stored vectors to this dimension with a persisted PCA projection (0 = off, "
+	                         "use a new collection)")
+	parser.add_argument("--watch", action="store_true", default=watcher_config.enabled,
+	                    help="Keep running and ingest documents as they are created or modified")
+	return parser.parse_args()
+
 if __name__ == "__main__":
 	logger.info("[Main] Starting Jarvis ETL Pipeline in %s environment.", settings.app_env)
 	configure_logging()
 
+	args = parse_args()
+	stages: List[PipelineStage] = [PipelineStage(stage.strip()) for stage in args.stages.split(",") if stage.strip()]
+	queue_backend = QueueBackend(args.queue_backend)
+	if queue_backend == QueueBackend.MEMORY and set(stages) != set(PipelineStage):
+		raise SystemExit("The memory queue backend requires every stage to run in this process")
+
+	snapshot_writer = None
+	if metrics_config.enabled:
+		if args.metrics_port:
+			start_metrics_server(metrics_config.host, args.metrics_port)
+		snapshot_writer = MetricsSnapshotWriter(metrics_config.snapshot_path, metrics_config.snapshot_interval)
+		snapshot_writer.start()
+
 	pipeline_complete_event = Event()
 
-	doc_queue = RedisBufferQueue(
-		redis_url=document_queue_config.queue_url,
+	doc_queue = create_queue(
+		backend=queue_backend,
+		queue_url=document_queue_config.queue_url,
 		queue_name=document_queue_config.queue_name,
-		serializer=DocumentSerDes().serialize,
-		deserializer=DocumentSerDes().deserialize
+		group_name=document_queue_config.group_name,
+		serdes=DocumentSerDes(),
+		max_size=document_queue_config.memory_max_size
 	)
 
-	embed_queue = RedisBufferQueue(
-		redis_url=embedding_queue_config.queue_url,
+	embed_queue = create_queue(
+		backend=queue_backend,
+		queue_url=embedding_queue_config.queue_url,
 		queue_name=embedding_queue_config.queue_name,
-		serializer=EmbeddingSerDes().serialize,
-		deserializer=EmbeddingSerDes().deserialize
+		group_name=embedding_queue_config.group_name,
+		serdes=EmbeddingSerDes(quantization=args.quantization),
+		max_size=embedding_queue_config.memory_max_size
 	)
 
+	dead_letter = None
+	if dead_letter_queue_config.enabled and (PipelineStage.EMBEDDING in stages or args.replay_dlq):
+		dead_letter = DeadLetterService(create_queue(
+			backend=queue_backend,
+			queue_url=dead_letter_queue_config.queue_url,
+			queue_name=dead_letter_queue_config.queue_name,
+			group_name=dead_letter_queue_config.group_name,
+			serdes=DocumentSerDes(),
+			max_size=dead_letter_queue_config.memory_max_size
+		))
+
 	doc_service = DocumentService(
 		documents_path=document_service_config.documents_path,
 		allowed_extensions=document_service_config.allowed_extensions
-	)
+	) if PipelineStage.DOCUMENT in stages else None
+
+	watcher = WatcherService(
+		root=document_service_config.documents_path,
+		allowed_extensions=document_service_config.allowed_extensions
+	) if args.watch and PipelineStage.DOCUMENT in stages else None
+
+	dedup = DedupService(index_path=dedup_config.index_path, mode=args.dedup) \
+		if args.dedup and PipelineStage.DOCUMENT in stages else None
 
-	embed_service = EmbeddingService()
+	embed_service = None
+	if PipelineStage.EMBEDDING in stages:
+		embed_cache = EmbeddingCacheService(
+			cache_path=embedding_cache_config.cache_path,
+			max_entries=embedding_cache_config.max_entries
+		) if embedding_cache_config.enabled else None
+
+		embed_service = EmbeddingService(cache=embed_cache, backend=args.embedding_backend)
+
+	# Files embedded by another backend are ingested again, a document-only process names the backend's model itself
+	manifest = ManifestService(
+		manifest_path=manifest_config.manifest_path,
+		embedding_model_name=embed_service.model_name if embed_service is not None
+		else get_embedding_model_name(args.embedding_backend)
+	) if manifest_config.enabled and PipelineStage.DOCUMENT in stages else None
 
 	db_service = VectorDBService(
 		mode=vectordb_service_config.mode,
@@ -114,7 +308,30 @@ if __name__ == "__main__":
 		port=vectordb_service_config.port,
 		ssl=vectordb_service_config.ssl,
 		collection_name=vectordb_service_config.collection_name
-	)
+	) if PipelineStage.VECTORDB in stages else None
+
+	compression = VectorCompressionService(
+		projection_path=vector_compression_config.projection_path,
+		dimension=args.pca_dimension,
+		fit_sample_size=vector_compression_config.fit_sample_size
+	) if args.pca_dimension and PipelineStage.VECTORDB in stages else None
+
+	sync = None
+	if args.sync and PipelineStage.DOCUMENT in stages:
+		# A document-only process still needs the collection to reconcile it
+		sync = SyncService(
+			vectordb_service=db_service or VectorDBService(
+				mode=vectordb_service_config.mode,
+				persist_directory=vectordb_service_config.persist_directory,
+				host=vectordb_service_config.host,
+				port=vectordb_service_config.port,
+				ssl=vectordb_service_config.ssl,
+				collection_name=vectordb_service_config.collection_name
+			),
+			document_service=doc_service,
+			manifest=manifest,
+			dedup=dedup
+		)
 
 	jarvis_data_pipeline: Pipeline = Pipeline(
 		complete_event=pipeline_complete_event,
@@ -122,7 +339,18 @@ if __name__ == "__main__":
 		embedding_queue=embed_queue,
 		document_service=doc_service,
 		embedding_service=embed_service,
-		vectordb_service=db_service
+		vectordb_service=db_service,
+		manifest=manifest,
+		watcher=watcher,
+		dedup=dedup,
+		sync=sync,
+		dead_letter=dead_letter,
+		replay_dead_letters=args.replay_dlq,
+		compression=compression,
+		stages=stages,
+		embedding_workers=args.embedding_workers,
+		vectordb_workers=args.vectordb_workers,
+		local_workers=args.local_workers
 	)
 
 	try:
@@ -144,4 +372,7 @@ if __name__ == "__main__":
 		logger.exception(f"[Main] Unexpected error occurred: {e}")
 		jarvis_data_pipeline.stop()
 
+	if snapshot_writer is not None:
+		snapshot_writer.stop()
+
 	logger.info("[Main] ETL Pipeline has shut down.")
\ No newline at end of file
@@ -0,0 +1,12 @@
+import os
+
+# Placeholder settings so the app config loads without a .env file; nothing here is contacted
+for name, value in {
+	"DOCUMENT_QUEUE_URL": "redis://localhost:6379/0",
+	"EMBEDDING_QUEUE_URL": "redis://localhost:6379/0",
+	"VECTORDB_DIR": "db",
+	"VECTORDB_HOST": "localhost",
+	"VECTORDB_PORT": "8000",
+	"VECTORDB_COLLECTION_NAME": "test",
+}.items():
+	os.environ.setdefault(name, value)
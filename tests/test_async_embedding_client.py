@@ -0,0 +1,84 @@
+import asyncio
+import json
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app.services import async_embedding_client
+from app.services.async_embedding_client import AsyncEmbeddingClient, TokenBucket
+
+
+class ThrottlingClient:
+	"""Answers the first `throttled` requests with a 429 and Retry-After, the next ones with embeddings."""
+
+	def __init__(self, throttled: int, retry_after: str) -> None:
+		self.throttled = throttled
+		self.retry_after = retry_after
+		self.sent_at = []
+
+	async def post(self, url: str, json: dict) -> httpx.Response:
+		self.sent_at.append(time.monotonic())
+		request = httpx.Request("POST", url)
+		if len(self.sent_at) <= self.throttled:
+			return httpx.Response(429, headers={"Retry-After": self.retry_after}, request=request)
+		data = [{"index": index, "embedding": [float(index)]} for index in range(len(json["input"]))]
+		return httpx.Response(200, json={"data": data}, request=request)
+
+
+def test_pause_holds_back_every_acquire() -> None:
+	bucket = TokenBucket(rate_per_second=1000, capacity=1000)
+	bucket.pause(0.2)
+	started = time.monotonic()
+	asyncio.run(bucket.acquire(1))
+	assert time.monotonic() - started >= 0.2
+
+
+def test_throttled_request_pauses_the_shared_bucket() -> None:
+	embedder = AsyncEmbeddingClient(api_key="test", requests_per_second=1000, retry_base_delay=0.05, retry_max_delay=0.05)
+	client = ThrottlingClient(throttled=1, retry_after="0.2")
+
+	started = time.monotonic()
+	vectors = asyncio.run(embedder._embed_request(client, asyncio.Semaphore(1), ["a", "b"]))
+
+	assert vectors == [[0.0], [1.0]]
+	assert len(client.sent_at) == 2
+	assert client.sent_at[1] - client.sent_at[0] >= 0.2
+	# Other requests of the client were held back for the Retry-After delay as well
+	assert embedder.request_bucket.paused_until >= started + 0.2
+
+
+def test_calls_share_one_client_and_the_in_flight_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+	in_flight = 0
+	peak = 0
+
+	async def handle(request: httpx.Request) -> httpx.Response:
+		nonlocal in_flight, peak
+		in_flight += 1
+		peak = max(peak, in_flight)
+		await asyncio.sleep(0.02)
+		in_flight -= 1
+		count = len(json.loads(request.content)["input"])
+		return httpx.Response(200, json={"data": [{"index": index, "embedding": [1.0]} for index in range(count)]})
+
+	clients = []
+	client_class = httpx.AsyncClient
+
+	def create_client(**kwargs) -> httpx.AsyncClient:
+		clients.append(client_class(transport=httpx.MockTransport(handle), **kwargs))
+		return clients[-1]
+
+	monkeypatch.setattr(async_embedding_client.httpx, "AsyncClient", create_client)
+	embedder = AsyncEmbeddingClient(api_key="test", max_in_flight=2, requests_per_second=1000, request_batch_size=1)
+	try:
+		# Four worker threads of four requests each
+		with ThreadPoolExecutor(max_workers=4) as executor:
+			results = list(executor.map(embedder.embed_documents, [["a", "b", "c", "d"]] * 4))
+	finally:
+		embedder.close()
+
+	assert results == [[[1.0]] * 4] * 4
+	assert len(clients) == 1
+	assert peak <= 2
@@ -0,0 +1,119 @@
+import random
+
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from app.config.core import DedupMode
+from app.services.dedup_service import CANONICAL_TEXT_KEY, DUPLICATE_OF_KEY, DedupService
+from app.services.document_service import DocumentService
+from app.services.hashing_embeddings import HashingEmbeddings
+from app.services.vectordb_service import VectorDBService
+
+
+def paragraphs(count: int, seed: int) -> List[str]:
+	rng = random.Random(seed)
+	words = [f"word{index}" for index in range(2000)]
+	return [" ".join(rng.choice(words) for _ in range(60)) + "." for _ in range(count)]
+
+
+def ingest(document_service: DocumentService,
+           dedup: DedupService,
+           vectordb_service: VectorDBService,
+           files: List[Path] | None = None) -> None:
+	"""What the document, embedding and vectordb stages do with a batch, without the queues."""
+	embeddings = HashingEmbeddings(dimension=64)
+	for batch in document_service.load_and_split_batch(batch_size=50, files=files, parallel_workers=0):
+		batch = dedup.filter_batch(list(batch))
+		if batch:
+			texts = [doc.metadata.get(CANONICAL_TEXT_KEY) or doc.page_content for doc in batch]
+			vectordb_service.save_embeddings(embeddings.embed_documents(texts), batch)
+
+
+@pytest.fixture
+def documents(tmp_path: Path) -> Path:
+	path = tmp_path / "data"
+	(path / "notes").mkdir(parents=True)
+	return path
+
+
+def stored(vectordb_service: VectorDBService, source: Path) -> dict:
+	result = vectordb_service.collection.get(where={"source": str(source)}, include=["documents", "metadatas"])
+	return {metadata["chunk_index"]: (text, metadata) for text, metadata in zip(result["documents"], result["metadatas"])}
+
+
+@pytest.mark.parametrize("mode", [DedupMode.DROP, DedupMode.LINK])
+def test_edited_file_keeps_every_chunk_when_reingested(tmp_path: Path, documents: Path, mode: str) -> None:
+	file_path = documents / "notes" / "a.txt"
+	original = paragraphs(10, seed=1)
+	file_path.write_text("\n\n".join(original), encoding="utf-8")
+
+	document_service = DocumentService(documents_path=documents, allowed_extensions={".txt"})
+	dedup = DedupService(index_path=tmp_path / "dedup.sqlite3", mode=mode)
+	vectordb_service = VectorDBService(persist_directory=tmp_path / "db", collection_name="dedup_test",
+	                                   documents_path=documents)
+	ingest(document_service, dedup, vectordb_service)
+	assert len(stored(vectordb_service, file_path)) == len(document_service.load_and_split_file(file_path))
+
+	# Prepending a paragraph shifts every chunk by one position
+	file_path.write_text("\n\n".join(paragraphs(1, seed=2) + original), encoding="utf-8")
+	ingest(document_service, dedup, vectordb_service)
+
+	expected = [chunk.page_content for chunk in document_service.load_and_split_file(file_path)]
+	chunks = stored(vectordb_service, file_path)
+	assert [chunks[index][0] for index in sorted(chunks)] == expected
+
+	stored_ids = set(vectordb_service.collection.get(include=[])["ids"])
+	links = [metadata[DUPLICATE_OF_KEY] for _, metadata in chunks.values() if DUPLICATE_OF_KEY in metadata]
+	assert all(link in stored_ids for link in links)
+
+
+def test_copies_of_other_files_are_still_dropped(tmp_path: Path, documents: Path) -> None:
+	text = "\n\n".join(paragraphs(6, seed=3))
+	(documents / "notes" / "a.txt").write_text(text, encoding="utf-8")
+	(documents / "notes" / "b.txt").write_text(text, encoding="utf-8")
+
+	document_service = DocumentService(documents_path=documents, allowed_extensions={".txt"})
+	dedup = DedupService(index_path=tmp_path / "dedup.sqlite3", mode=DedupMode.DROP)
+	vectordb_service = VectorDBService(persist_directory=tmp_path / "db", collection_name="dedup_test",
+	                                   documents_path=documents)
+	ingest(document_service, dedup, vectordb_service)
+
+	chunk_count = len(document_service.load_and_split_file(documents / "notes" / "a.txt"))
+	positions = sorted(set(stored(vectordb_service, documents / "notes" / name)) for name in ("a.txt", "b.txt"))
+	# The copy only keeps its last chunk, which carries the last_chunk flag no other chunk of it could take
+	assert positions == [{chunk_count - 1}, set(range(chunk_count))]
+
+
+@pytest.mark.parametrize("mode", [DedupMode.DROP, DedupMode.LINK])
+def test_edit_into_a_duplicate_replaces_the_old_chunk(tmp_path: Path, documents: Path, mode: str) -> None:
+	# Paragraphs short enough to make one chunk each
+	p0, p1, p2, p3 = (" ".join(paragraph.split()[:40]) for paragraph in paragraphs(4, seed=4))
+	a, b, c = (documents / "notes" / name for name in ("a.txt", "b.txt", "c.txt"))
+	a.write_text("\n\n".join([p0, p1]), encoding="utf-8")
+	b.write_text(p2, encoding="utf-8")
+
+	document_service = DocumentService(documents_path=documents, allowed_extensions={".txt"})
+	dedup = DedupService(index_path=tmp_path / "dedup.sqlite3", mode=mode)
+	vectordb_service = VectorDBService(persist_directory=tmp_path / "db", collection_name="dedup_test",
+	                                   documents_path=documents)
+	ingest(document_service, dedup, vectordb_service)
+
+	# The first chunk of a becomes a near-duplicate of b
+	a.write_text("\n\n".join([p2, p1]), encoding="utf-8")
+	ingest(document_service, dedup, vectordb_service)
+
+	chunks = stored(vectordb_service, a)
+	expected = {0: p2, 1: p1} if mode == DedupMode.LINK else {1: p1}
+	assert {index: text for index, (text, _) in chunks.items()} == expected
+	assert p0 not in vectordb_service.collection.get(include=["documents"])["documents"]
+
+	# The old first chunk of a is gone, a new copy of it must not link to it, also when a is not ingested again
+	c.write_text("\n\n".join([p0, p3]), encoding="utf-8")
+	ingest(document_service, dedup, vectordb_service, files=[c])
+
+	result = vectordb_service.collection.get(include=["documents", "metadatas"])
+	assert p0 in result["documents"]
+	links = [metadata[DUPLICATE_OF_KEY] for metadata in result["metadatas"] if DUPLICATE_OF_KEY in metadata]
+	assert all(link in result["ids"] for link in links)
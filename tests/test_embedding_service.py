@@ -0,0 +1,42 @@
+from typing import List
+
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.services.batch_packer import TokenBatchPacker
+from app.services.embedding_service import EmbeddingService
+from app.services.hashing_embeddings import HashingEmbeddings
+from app.utils.token_utils import estimate_tokens
+
+
+class RecordingEmbeddings(Embeddings):
+	"""Hashing embeddings that record the estimated tokens of every request."""
+
+	def __init__(self) -> None:
+		self.model = HashingEmbeddings(dimension=32)
+		self.requests: List[int] = []
+
+	def embed_documents(self, texts: List[str]) -> List[List[float]]:
+		self.requests.append(sum(estimate_tokens(text) for text in texts))
+		return self.model.embed_documents(texts)
+
+	def embed_query(self, text: str) -> List[float]:
+		return self.model.embed_query(text)
+
+
+def test_oversized_text_is_embedded_within_the_request_budget() -> None:
+	packer = TokenBatchPacker(max_tokens_per_request=1_000, max_items_per_request=16, max_tokens_per_text=400)
+	model = RecordingEmbeddings()
+	service = EmbeddingService(batch_packer=packer, embedding_model=model, model_name="recording")
+
+	# About five times the per-text limit
+	text = " ".join(f"word{index}" for index in range(1_600))
+	assert estimate_tokens(text) > 4 * packer.max_tokens_per_text
+
+	[vector] = service.embed_batch([Document(page_content=text, metadata={"source": "a.txt"})])
+
+	assert len(model.requests) > 1
+	assert max(model.requests) <= packer.max_tokens_per_request
+	assert np.isclose(np.linalg.norm(vector), 1.0)
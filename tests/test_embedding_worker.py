@@ -0,0 +1,102 @@
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.services.batch_packer import TokenBatchPacker
+from app.services.dead_letter_service import (DEAD_LETTER_ATTEMPTS_KEY, DEAD_LETTER_ERROR_KEY,
+                                              DEAD_LETTER_ERROR_TYPE_KEY, DEAD_LETTER_KEYS, DeadLetterService)
+from app.services.embedding_service import EmbeddingService
+from app.services.memory_queue_service import InMemoryQueue
+from app.workers.embedding_worker import EmbeddingWorker
+
+POISON = "poison"
+
+
+class ThrottledError(Exception):
+	status_code = 429
+
+
+class FlakyEmbeddings(Embeddings):
+	"""Fails every request holding a poisoned text, or every request when throttled."""
+
+	def __init__(self, throttled: bool = False) -> None:
+		self.throttled = throttled
+		self.requests: List[int] = []
+
+	def embed_documents(self, texts: List[str]) -> List[List[float]]:
+		self.requests.append(len(texts))
+		if self.throttled:
+			raise ThrottledError("rate limit exceeded")
+		if any(POISON in text for text in texts):
+			raise ValueError("input rejected")
+		return [[float(len(text))] for text in texts]
+
+	def embed_query(self, text: str) -> List[float]:
+		return self.embed_documents([text])[0]
+
+
+def chunks(count: int, poisoned: int | None = None) -> List[Document]:
+	return [Document(page_content=POISON if index == poisoned else f"chunk {index}",
+	                 metadata={"source": "a.txt", "chunk_index": index})
+	        for index in range(count)]
+
+
+def drain(queue: InMemoryQueue) -> List:
+	items = []
+	while (batch := queue.pop_batch(100, timeout=0.1, linger=0)) is not None:
+		items.extend(batch)
+	return items
+
+
+def run_worker(docs: List[Document], model: FlakyEmbeddings) -> tuple[List, List[Document]]:
+	"""Embed docs with one worker, returning the embedding queue and dead-letter queue contents."""
+	document_queue, embedding_queue, dead_letter_queue = (InMemoryQueue(name) for name in ("documents", "embeddings", "dlq"))
+	document_queue.push_batch(docs)
+	document_queue.mark_producer_done(producers=1, consumers=1)
+
+	packer = TokenBatchPacker(max_items_per_request=len(docs))
+	service = EmbeddingService(batch_packer=packer, embedding_model=model, model_name="flaky")
+	worker = EmbeddingWorker(document_queue, embedding_queue, service, batch_size=len(docs),
+	                         dead_letter=DeadLetterService(dead_letter_queue), max_attempts=3,
+	                         retry_base_delay=0.0, retry_max_delay=0.0)
+	worker.run()
+	dead_letter_queue.push_sentinels(1)
+	return drain(embedding_queue), drain(dead_letter_queue)
+
+
+def test_poisoned_chunk_is_isolated_and_dead_lettered() -> None:
+	embedded, dead_lettered = run_worker(chunks(50, poisoned=17), FlakyEmbeddings())
+
+	assert sorted(item["document"].metadata["chunk_index"] for item in embedded) == [i for i in range(50) if i != 17]
+	[failed] = dead_lettered
+	assert failed.page_content == POISON
+	assert failed.metadata["chunk_index"] == 17
+	assert failed.metadata[DEAD_LETTER_ERROR_TYPE_KEY] == "ValueError"
+	assert failed.metadata[DEAD_LETTER_ERROR_KEY] == "input rejected"
+	assert failed.metadata[DEAD_LETTER_ATTEMPTS_KEY] >= 1
+
+
+def test_throttled_requests_are_not_bisected() -> None:
+	model = FlakyEmbeddings(throttled=True)
+	embedded, dead_lettered = run_worker(chunks(50), model)
+
+	# Every attempt sent the whole request, none was split
+	assert model.requests == [50] * 3
+	assert not embedded
+	assert len(dead_lettered) == 50
+	assert {doc.metadata[DEAD_LETTER_ERROR_TYPE_KEY] for doc in dead_lettered} == {"ThrottledError"}
+
+
+def test_replay_restores_the_original_chunks() -> None:
+	dead_letter = DeadLetterService(InMemoryQueue("dlq"))
+	docs = chunks(5)
+	dead_letter.push(docs, ValueError("input rejected"), attempts=2)
+
+	document_queue = InMemoryQueue("documents")
+	assert dead_letter.replay(document_queue) == 5
+	assert dead_letter.size() == 0
+
+	replayed = document_queue.pop_batch(10, timeout=0.1, linger=0)
+	assert [(doc.page_content, doc.metadata) for doc in replayed] == [(doc.page_content, doc.metadata) for doc in docs]
+	assert not any(key in doc.metadata for doc in replayed for key in DEAD_LETTER_KEYS)
@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from app.config.core import EmbeddingBackend
+from app.services.embedding_factory import get_embedding_model_name
+from app.services.embedding_service import EmbeddingService
+from app.services.manifest_service import ManifestService
+
+
+def ingest_all(manifest: ManifestService, files: list[Path]) -> list[Path]:
+	"""What the document stage does with the manifest: send the changed files, then save."""
+	changed = [file_path for file_path in files if manifest.is_changed(file_path)]
+	for file_path in changed:
+		manifest.mark_ingested(file_path)
+	manifest.save()
+	return changed
+
+
+def test_switching_backends_ingests_the_files_again(tmp_path: Path) -> None:
+	files = [tmp_path / f"{name}.txt" for name in ("a", "b")]
+	for file_path in files:
+		file_path.write_text(f"content of {file_path.name}", encoding="utf-8")
+	manifest_path = tmp_path / "manifest.json"
+
+	hashing = get_embedding_model_name(EmbeddingBackend.HASHING)
+	mistral = get_embedding_model_name(EmbeddingBackend.MISTRAL)
+	assert hashing != mistral
+
+	assert ingest_all(ManifestService(manifest_path=manifest_path, embedding_model_name=hashing), files) == files
+	assert ingest_all(ManifestService(manifest_path=manifest_path, embedding_model_name=hashing), files) == []
+	assert ingest_all(ManifestService(manifest_path=manifest_path, embedding_model_name=mistral), files) == files
+	assert ingest_all(ManifestService(manifest_path=manifest_path, embedding_model_name=mistral), files) == []
+
+
+def test_backend_model_name_matches_the_embedding_service() -> None:
+	service = EmbeddingService(backend=EmbeddingBackend.HASHING)
+	assert get_embedding_model_name(EmbeddingBackend.HASHING) == service.model_name
+	assert service.model_name == service.embedding_model.model_name
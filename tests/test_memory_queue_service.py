@@ -0,0 +1,41 @@
+from threading import Thread
+
+import pytest
+
+from app.services.memory_queue_service import InMemoryQueue
+from app.services.queue_protocol import QueueClosedError
+
+
+def test_close_releases_a_blocked_producer() -> None:
+	queue = InMemoryQueue("documents", max_size=2)
+	queue.push_batch([1, 2])
+	errors = []
+
+	def produce() -> None:
+		try:
+			queue.push_batch([3])
+		except QueueClosedError as ex:
+			errors.append(ex)
+
+	producer = Thread(target=produce, daemon=True)
+	producer.start()
+	producer.join(timeout=0.2)
+	assert producer.is_alive()
+
+	queue.close()
+	producer.join(timeout=1.0)
+	assert not producer.is_alive()
+	assert len(errors) == 1
+	assert queue.size() == 2
+
+
+def test_closed_queue_refuses_pushes_but_drains() -> None:
+	queue = InMemoryQueue("documents")
+	queue.push_batch([1, 2])
+	queue.close()
+
+	with pytest.raises(QueueClosedError):
+		queue.push_batch([3])
+	queue.push_sentinels(1)
+	assert queue.pop_batch(10, timeout=0.1, linger=0) == [1, 2]
+	assert queue.pop_batch(10, timeout=0.1, linger=0) is None
@@ -0,0 +1,110 @@
+import json
+import shutil
+import socket
+import subprocess
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+import pytest
+
+from app.services.queue_service import RedisBufferQueue
+from app.services.stream_queue_service import RedisStreamQueue
+
+QueueFactory = Callable[..., RedisStreamQueue]
+
+
+def free_port() -> int:
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		return sock.getsockname()[1]
+
+
+@pytest.fixture
+def redis_url(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[str]:
+	"""A local redis-server when installed, otherwise one fakeredis server shared by every client."""
+	if shutil.which("redis-server"):
+		port = free_port()
+		server = subprocess.Popen(["redis-server", "--port", str(port), "--save", "", "--dir", str(tmp_path)],
+		                          stdout=subprocess.DEVNULL)
+		url = f"redis://127.0.0.1:{port}/0"
+		try:
+			for _ in range(100):
+				try:
+					socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+					break
+				except OSError:
+					time.sleep(0.05)
+			yield url
+		finally:
+			server.terminate()
+			server.wait()
+		return
+
+	fakeredis = pytest.importorskip("fakeredis", reason="needs redis-server or fakeredis")
+	fake_server = fakeredis.FakeServer()
+	monkeypatch.setattr(RedisBufferQueue, "get_redis_client",
+	                    lambda self: fakeredis.FakeRedis(server=fake_server))
+	yield "redis://fake"
+
+
+@pytest.fixture
+def make_queue(redis_url: str) -> QueueFactory:
+	def make(**kwargs) -> RedisStreamQueue:
+		return RedisStreamQueue(redis_url, "stream_test", "stream_test_group", json.dumps, json.loads, **kwargs)
+	return make
+
+
+def in_thread(function: Callable, *args):
+	"""Run a call in a thread of its own, i.e. as another consumer of the group."""
+	with ThreadPoolExecutor(max_workers=1) as executor:
+		return executor.submit(function, *args).result()
+
+
+def test_entries_stay_pending_until_acknowledged(make_queue: QueueFactory) -> None:
+	queue = make_queue()
+	queue.push_batch([1, 2, 3])
+
+	assert queue.pop_batch(10, timeout=0.1, linger=0) == [1, 2, 3]
+	assert queue.size() == 3
+	queue.ack()
+	assert queue.size() == 0
+	assert queue.pop_batch(10, timeout=0.1, linger=0) == []
+
+
+def test_entries_of_an_idle_consumer_are_reclaimed(make_queue: QueueFactory) -> None:
+	queue = make_queue(claim_idle_ms=50)
+	queue.push_batch([1, 2])
+
+	# The first consumer dies without acknowledging its batch
+	assert in_thread(queue.pop_batch, 10, 0.1, 0) == [1, 2]
+	time.sleep(0.1)
+
+	def pop_and_ack() -> List[int]:
+		batch = queue.pop_batch(10, timeout=0.1, linger=0)
+		queue.ack()
+		return batch
+
+	assert in_thread(pop_and_ack) == [1, 2]
+	assert queue.size() == 0
+
+
+def test_sentinels_stop_every_consumer(make_queue: QueueFactory) -> None:
+	queue = make_queue()
+	queue.push_batch(list(range(20)))
+	queue.mark_producer_done(producers=1, consumers=2)
+
+	def consume() -> List[int]:
+		received: List[int] = []
+		while (batch := queue.pop_batch(3, timeout=0.5, linger=0)) is not None:
+			received.extend(batch)
+			queue.ack()
+		return received
+
+	with ThreadPoolExecutor(max_workers=2) as executor:
+		results = [future.result(timeout=10) for future in [executor.submit(consume) for _ in range(2)]]
+
+	assert sorted(results[0] + results[1]) == list(range(20))
+	assert queue.size() == 0
@@ -0,0 +1,94 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from app.config.core import DedupMode
+from app.services.dedup_service import CANONICAL_SOURCE_KEY, CANONICAL_TEXT_KEY, DUPLICATE_OF_KEY, DedupService
+from app.services.document_service import DocumentService
+from app.services.hashing_embeddings import HashingEmbeddings
+from app.services.manifest_service import ManifestService
+from app.services.sync_service import SyncService
+from app.services.vectordb_service import VectorDBService
+from test_dedup_service import paragraphs
+
+
+def write(file_path: Path, texts: List[str]) -> Path:
+	file_path.parent.mkdir(parents=True, exist_ok=True)
+	# Short paragraphs, one chunk each
+	file_path.write_text("\n\n".join(" ".join(text.split()[:40]) for text in texts), encoding="utf-8")
+	return file_path
+
+
+class Corpus:
+	"""A documents directory ingested the way the pipeline does, with manifest and dedup index."""
+
+	def __init__(self, tmp_path: Path) -> None:
+		self.documents = tmp_path / "data"
+		self.documents.mkdir()
+		self.document_service = DocumentService(documents_path=self.documents, allowed_extensions={".txt"})
+		self.manifest = ManifestService(manifest_path=tmp_path / "manifest.json", embedding_model_name="hashing")
+		self.dedup = DedupService(index_path=tmp_path / "dedup.sqlite3", mode=DedupMode.LINK)
+		self.vectordb_service = VectorDBService(persist_directory=tmp_path / "db", collection_name="sync_test",
+		                                        documents_path=self.documents)
+		self.sync_service = SyncService(self.vectordb_service, self.document_service, self.manifest, self.dedup)
+
+	def ingest(self) -> None:
+		embeddings = HashingEmbeddings(dimension=64)
+		files = [file_path for file_path in self.document_service.scan_files() if self.manifest.is_changed(file_path)]
+		for batch in self.document_service.load_and_split_batch(batch_size=50, files=files, parallel_workers=0):
+			batch = self.dedup.filter_batch(list(batch))
+			texts = [doc.metadata.get(CANONICAL_TEXT_KEY) or doc.page_content for doc in batch]
+			self.vectordb_service.save_embeddings(embeddings.embed_documents(texts), batch)
+		for file_path in files:
+			self.manifest.mark_ingested(file_path)
+		self.manifest.save()
+
+	def stored(self, source: Path) -> List[dict]:
+		return self.vectordb_service.collection.get(where={"source": str(source)}, include=["metadatas"])["metadatas"]
+
+
+@pytest.fixture
+def corpus(tmp_path: Path) -> Corpus:
+	return Corpus(tmp_path)
+
+
+def test_renamed_file_is_moved_and_deleted_file_removed(corpus: Corpus) -> None:
+	texts = paragraphs(8, seed=1)
+	renamed = write(corpus.documents / "notes" / "a.txt", texts)
+	deleted = write(corpus.documents / "notes" / "c.txt", paragraphs(6, seed=2))
+	corpus.ingest()
+	# Ingested later, so every chunk of b.txt is linked to a chunk of a.txt
+	copy = write(corpus.documents / "notes" / "b.txt", texts[:3])
+	corpus.ingest()
+	assert [len(corpus.stored(path)) for path in (renamed, deleted, copy)] == [8, 6, 3]
+
+	new_path = corpus.documents / "archive" / "a.txt"
+	new_path.parent.mkdir()
+	renamed.rename(new_path)
+	deleted.unlink()
+
+	summary = corpus.sync_service.sync()
+
+	assert summary == {"renamed": 1, "removed": 1, "chunks_removed": 6}
+	assert not corpus.stored(renamed) and not corpus.stored(deleted)
+	moved = corpus.stored(new_path)
+	assert len(moved) == 8
+	assert {metadata["category"] for metadata in moved} == {"archive"}
+
+	stored_ids = set(corpus.vectordb_service.collection.get(include=[])["ids"])
+	links = corpus.stored(copy)
+	assert all(DUPLICATE_OF_KEY in metadata for metadata in links)
+	assert all(metadata[DUPLICATE_OF_KEY] in stored_ids for metadata in links)
+	assert {metadata[CANONICAL_SOURCE_KEY] for metadata in links} == {str(new_path)}
+
+	assert set(corpus.manifest.get_sources()) == {str(new_path), str(copy)}
+	assert not corpus.manifest.is_changed(new_path)
+
+
+def test_sync_without_changes_touches_nothing(corpus: Corpus) -> None:
+	file_path = write(corpus.documents / "notes" / "a.txt", paragraphs(4, seed=1))
+	corpus.ingest()
+
+	assert corpus.sync_service.sync() == {"renamed": 0, "removed": 0, "chunks_removed": 0}
+	assert len(corpus.stored(file_path)) == 4
@@ -0,0 +1,70 @@
+import random
+
+from pathlib import Path
+
+import pytest
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.services.document_service import DocumentService
+from app.services.text_splitter import OffsetTextSplitter
+
+ASCII_WORDS = ["a", "to", "the", "split", "chunk", "boundary", "x" * 40]
+UNICODE_WORDS = ["été", "naïve", "日本語の文章", "straße", "😀🚀", "Ωμέγα", " nbsp"]
+SEPARATORS = [" ", " ", " ", "\n", "\n\n", "\n\n\n", "  ", " \n "]
+
+
+def random_text(rng: random.Random, words: list[str], length: int) -> str:
+	parts = []
+	size = 0
+	while size < length:
+		parts.extend((rng.choice(words), rng.choice(SEPARATORS)))
+		size += len(parts[-2]) + len(parts[-1])
+	return "".join(parts)
+
+
+@pytest.mark.parametrize("words", [ASCII_WORDS, ASCII_WORDS + UNICODE_WORDS], ids=["ascii", "non-ascii"])
+def test_same_chunks_and_exact_offsets_as_langchain(words: list[str]) -> None:
+	rng = random.Random(0)
+	for _ in range(300):
+		chunk_size = rng.randint(5, 300)
+		chunk_overlap = rng.randint(0, chunk_size // 2)
+		text = random_text(rng, words, rng.randint(0, 3_000))
+
+		reference = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+		                                           add_start_index=True).create_documents([text])
+		splitter = OffsetTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+		offsets = list(splitter.split_offsets(text))
+
+		assert splitter.split_text(text) == [doc.page_content for doc in reference], (chunk_size, chunk_overlap, text)
+		previous_end = 0
+		for (start, end), doc in zip(offsets, reference):
+			# end_index is start_index + the chunk length, as DocumentService records it
+			assert text[start:end] == doc.page_content
+			assert start >= previous_end - chunk_overlap
+			previous_end = end
+			# LangChain recovers start_index with text.find(), only unambiguous for passages found once
+			if text.find(doc.page_content) == text.rfind(doc.page_content):
+				assert start == doc.metadata["start_index"]
+
+
+def test_offsets_point_at_repeated_passages() -> None:
+	# The LangChain splitter finds the start of a repeated passage with text.find(), which can land on an earlier copy
+	text = "\n\n".join(["same paragraph again"] * 5)
+	splitter = OffsetTextSplitter(chunk_size=25, chunk_overlap=0)
+	offsets = list(splitter.split_offsets(text))
+
+	assert [text[start:end] for start, end in offsets] == ["same paragraph again"] * 5
+	assert [start for start, _ in offsets] == [index * 22 for index in range(5)]
+
+
+def test_document_chunks_record_their_offsets_in_the_file(tmp_path: Path) -> None:
+	# Longer than one streaming window, so offsets of later windows are covered too
+	text = random_text(random.Random(1), ASCII_WORDS + UNICODE_WORDS, 600_000)
+	file_path = tmp_path / "a.txt"
+	file_path.write_text(text, encoding="utf-8")
+
+	chunks = DocumentService(documents_path=tmp_path, allowed_extensions={".txt"}).load_and_split_file(file_path)
+
+	assert chunks
+	assert all(text[chunk.metadata["start_index"]:chunk.metadata["end_index"]] == chunk.page_content for chunk in chunks)
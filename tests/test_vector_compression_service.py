@@ -0,0 +1,18 @@
+from pathlib import Path
+
+import numpy as np
+
+from app.services.vector_compression_service import VectorCompressionService
+
+
+def test_projection_saved_by_another_process_is_loaded(tmp_path: Path) -> None:
+	rng = np.random.default_rng(0)
+	projection_path = tmp_path / "projection.npz"
+	first = VectorCompressionService(projection_path=projection_path, dimension=4, fit_sample_size=4)
+	second = VectorCompressionService(projection_path=projection_path, dimension=4, fit_sample_size=4)
+
+	first.fit(rng.standard_normal((20, 16)))
+	second.fit(rng.standard_normal((20, 16)))
+
+	np.testing.assert_array_equal(first.components, second.components)
+	np.testing.assert_array_equal(first.mean, second.mean)
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from langchain_core.documents import Document
+
+from app.services.manifest_service import ManifestService
+from app.services.memory_queue_service import InMemoryQueue
+from app.services.vector_compression_service import VectorCompressionService
+from app.services.vectordb_service import VectorDBService
+from app.workers.vectordb_worker import VectorDBWorker
+
+
+def run_worker(tmp_path: Path,
+               vectors: np.ndarray,
+               dimension: int | None = None,
+               manifest: ManifestService | None = None,
+               source: str = "a.txt") -> tuple[VectorDBWorker, VectorDBService]:
+	"""Run one worker over the chunks of one file until the queue signals completion."""
+	queue = InMemoryQueue("embeddings")
+	queue.push_batch([{"vector": vector.tolist(),
+	                   "document": Document(page_content=f"chunk {index}",
+	                                        metadata={"source": source, "chunk_index": index,
+	                                                  "last_chunk": index == len(vectors) - 1})}
+	                  for index, vector in enumerate(vectors)])
+	queue.mark_producer_done(producers=1, consumers=1)
+
+	vectordb_service = VectorDBService(persist_directory=tmp_path / "db", collection_name="worker_test")
+	compression = VectorCompressionService(projection_path=tmp_path / "projection.npz", dimension=dimension,
+	                                       fit_sample_size=dimension) if dimension else None
+	worker = VectorDBWorker(queue, vectordb_service, write_linger=0.01, compression=compression, manifest=manifest)
+	worker.run()
+	return worker, vectordb_service
+
+
+@pytest.mark.parametrize("count,source_dimension", [(4, 32), (20, 8)], ids=["sample too small", "dimension too small"])
+def test_unfittable_embeddings_stay_buffered(tmp_path: Path, count: int, source_dimension: int) -> None:
+	vectors = np.random.default_rng(0).standard_normal((count, source_dimension)).astype(np.float32)
+	worker, vectordb_service = run_worker(tmp_path, vectors, dimension=16)
+
+	assert vectordb_service.collection.count() == 0
+	assert len(worker._documents) == count
+
+
+def test_fitted_embeddings_are_written(tmp_path: Path) -> None:
+	vectors = np.random.default_rng(0).standard_normal((20, 32)).astype(np.float32)
+	worker, vectordb_service = run_worker(tmp_path, vectors, dimension=16)
+
+	assert vectordb_service.collection.count() == 20
+	assert not worker._documents
+	assert len(vectordb_service.collection.get(limit=1, include=["embeddings"])["embeddings"][0]) == 16
+
+
+@pytest.mark.parametrize("fails", [False, True], ids=["stored", "write failed"])
+def test_manifest_records_a_file_once_its_last_chunk_is_stored(tmp_path: Path,
+                                                                monkeypatch: pytest.MonkeyPatch,
+                                                                fails: bool) -> None:
+	file_path = tmp_path / "a.txt"
+	file_path.write_text("content", encoding="utf-8")
+	manifest = ManifestService(manifest_path=tmp_path / "manifest.json", embedding_model_name="test")
+	assert manifest.is_changed(file_path)
+
+	if fails:
+		def fail(self, embeddings, documents) -> None:
+			raise RuntimeError("collection unavailable")
+		monkeypatch.setattr(VectorDBService, "save_embeddings", fail)
+	vectors = np.random.default_rng(0).standard_normal((5, 8)).astype(np.float32)
+	run_worker(tmp_path, vectors, manifest=manifest, source=str(file_path))
+
+	# The next run skips the file only if it was stored
+	reloaded = ManifestService(manifest_path=tmp_path / "manifest.json", embedding_model_name="test")
+	assert reloaded.is_changed(file_path) == fails